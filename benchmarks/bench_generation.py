@@ -0,0 +1,282 @@
+"""Micro-benchmarks for palette generation, theme rendering and writing.
+
+Drives generate_hex_palette, render_theme (the per-template render used by
+generate_theme_file), the full generate_theme_file, audit_theme (the contrast
+audit run on every generation), generate_profiles (one pass over several named
+profiles on a thread pool, as the integration runs it; rendering holds the
+GIL, so profiles/N grows linearly with N) and reading and applying user
+overrides, against a stub hass.config.path pointing at a temporary directory.
+
+Each case is timed in several rounds and records the median time per call,
+the spread of the rounds and the tracemalloc peak of a single call. Results
+are compared with benchmarks/baseline.json and the run fails when a case is
+slower or allocates more than the baseline allows. A case only counts as
+slower when it exceeds both the relative threshold and the noise of the two
+runs, so an unchanged tree passes on a busy machine.
+
+Usage (from the repository root, with homeassistant installed):
+
+    python benchmarks/bench_generation.py
+    python benchmarks/bench_generation.py --update-baseline
+    python benchmarks/bench_generation.py --filter render --json results.json
+"""
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from custom_components.frosted_glass_manager import (  # noqa: E402
+    audit_theme,
+    generate_hex_palette,
+    generate_profiles,
+    generate_theme_file,
+    preview_theme,
+    render_theme,
+    resolve_options,
+)
+from custom_components.frosted_glass_manager.overrides import ThemeOverrides, parse_overrides  # noqa: E402
+from custom_components.frosted_glass_manager.const import (  # noqa: E402
+    CONF_LIGHT_PRIMARY,
+    CONF_LIGHT_BG,
+    CONF_DARK_PRIMARY,
+    CONF_DARK_BG,
+    CONF_EXTERNAL_CSS,
+    RENDER_WORKERS,
+)
+from custom_components.frosted_glass_manager.templates import THEME_OUTPUTS  # noqa: E402
+
+# A typical themes/frosted_overrides.yaml: a few keys and a CSS snippet
+OVERRIDES = """\
+- light:
+    primary-text-color: "#1B1B1F"
+    ha-card-border-radius: 14px
+  dark:
+    primary-text-color: "#F1F1F4"
+    card-mod-card: |
+      ha-card { border-width: 2px; }
+- profiles: [Bench]
+  tiers: [lite]
+  dark:
+    ha-card-border-radius: 12px
+"""
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Representative seeds: default blurple, saturated, near-black, near-white, grey
+COLOR_SETS = {
+    "default": {},
+    "red": {CONF_LIGHT_PRIMARY: [200, 30, 40], CONF_DARK_PRIMARY: [230, 80, 90]},
+    "green": {CONF_LIGHT_PRIMARY: [20, 180, 60], CONF_DARK_PRIMARY: [90, 220, 120]},
+    "dark": {CONF_LIGHT_PRIMARY: [10, 12, 20], CONF_DARK_PRIMARY: [5, 5, 5]},
+    "light": {CONF_LIGHT_PRIMARY: [250, 248, 240], CONF_DARK_PRIMARY: [255, 255, 255]},
+    "grey": {
+        CONF_LIGHT_PRIMARY: [128, 128, 128],
+        CONF_DARK_PRIMARY: [90, 90, 90],
+        CONF_LIGHT_BG: "/local/backgrounds/light.jpg",
+        CONF_DARK_BG: "/local/backgrounds/dark.jpg",
+    },
+}
+
+TUNING = {
+    "light": {"glass_tint": "0.2", "header_alpha": "0.3", "text_alpha": "0.9"},
+    "dark": {"glass_tint": "0.4", "header_alpha": "0.2", "text_alpha": "0.9"},
+}
+
+# Profiles per pass for the generate_profiles cases
+PROFILE_COUNTS = (1, 4, 8)
+
+DEFAULT_THRESHOLDS = {"time": 0.5, "alloc": 0.25}
+# Timing rounds per case, and how many spreads (robust standard deviations) a
+# median may move before it counts as slower
+REPEAT = 15
+NOISE_SPREADS = 4
+
+
+def make_stub(config_dir, options):
+    """Return a (hass, entry) pair good enough for generate_theme_file."""
+    hass = types.SimpleNamespace(
+        config=types.SimpleNamespace(path=lambda *parts: os.path.join(config_dir, *parts)),
+        data={},
+    )
+    entry = types.SimpleNamespace(entry_id="benchmark", data={}, options=options)
+    return hass, entry
+
+
+def build_cases(config_dir, executor):
+    """Return {case name: zero-argument callable}."""
+    cases = {}
+
+    for name, options in COLOR_SETS.items():
+        resolved = resolve_options(options)
+        light_palette = generate_hex_palette(resolved[CONF_LIGHT_PRIMARY])
+        dark_palette = generate_hex_palette(resolved[CONF_DARK_PRIMARY])
+
+        cases[f"palette/{name}"] = lambda r=resolved: (
+            generate_hex_palette(r[CONF_LIGHT_PRIMARY]),
+            generate_hex_palette(r[CONF_DARK_PRIMARY]),
+        )
+
+        for template, filename in THEME_OUTPUTS:
+            tier = "lite" if "Lite" in filename else "full"
+            cases[f"render/{tier}/{name}"] = (
+                lambda t=template, f=filename, r=resolved, lp=light_palette, dp=dark_palette:
+                render_theme(t, f, r, lp, dp)
+            )
+            cases[f"render/{tier}/{name}+tuning"] = (
+                lambda t=template, f=filename, r=resolved, lp=light_palette, dp=dark_palette:
+                render_theme(t, f, r, lp, dp, TUNING)
+            )
+
+        cases[f"preview/{name}"] = lambda o=options: preview_theme(o)
+        cases[f"contrast/{name}"] = lambda o=options: audit_theme(o, tuning=TUNING)
+
+        hass, entry = make_stub(config_dir, options)
+        cases[f"generate/{name}"] = lambda h=hass, e=entry: generate_theme_file(h, e)
+        hass, entry = make_stub(config_dir, {**options, CONF_EXTERNAL_CSS: True})
+        cases[f"generate/{name}+stylesheets"] = lambda h=hass, e=entry: generate_theme_file(h, e)
+
+    hass, _ = make_stub(config_dir, {})
+    color_sets = list(COLOR_SETS.values())
+    for count in PROFILE_COUNTS:
+        profiles = {
+            f"profile{index}": (f"Bench {index}", color_sets[index % len(color_sets)], None)
+            for index in range(count)
+        }
+        cases[f"profiles/{count}"] = lambda h=hass, p=profiles: generate_profiles(h, p, executor)
+
+    overrides = ThemeOverrides(os.path.join(config_dir, "themes", "frosted_overrides.yaml"))
+    overrides.rules, _ = parse_overrides(OVERRIDES)
+    cases["overrides/parse"] = lambda: parse_overrides(OVERRIDES)
+    cases["overrides/generate"] = lambda h=hass, v=overrides: generate_profiles(
+        h, {"overrides": ("Bench", {}, None)}, None, None, None, v
+    )
+
+    return cases
+
+
+def calls_per_round(func, round_time):
+    """Return how many calls of func take at least round_time seconds (a power of two)."""
+    func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= round_time or number >= 1 << 20:
+            return number
+        number *= 2
+
+
+def measure(cases, min_time=0.2, repeat=REPEAT):
+    """
+    Return {case name: (median seconds per call, spread of the rounds in seconds, tracemalloc peak bytes of one call)}.
+
+    The rounds of all cases are interleaved, so a slow spell of the machine
+    costs every case a round or two instead of all rounds of some cases.
+    """
+    numbers = {name: calls_per_round(func, min_time / repeat) for name, func in cases.items()}
+    rounds = {name: [] for name in cases}
+    for _ in range(repeat):
+        for name, func in cases.items():
+            number = numbers[name]
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            rounds[name].append((time.perf_counter() - start) / number)
+
+    measured = {}
+    for name, func in cases.items():
+        median = statistics.median(rounds[name])
+        # Median absolute deviation, scaled to a standard deviation for normal noise
+        spread = 1.4826 * statistics.median(abs(seconds - median) for seconds in rounds[name])
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        measured[name] = (median, spread, peak)
+    return measured
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {"thresholds": dict(DEFAULT_THRESHOLDS), "results": {}}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results, baseline):
+    """Return a list of regression messages."""
+    thresholds = {**DEFAULT_THRESHOLDS, **baseline.get("thresholds", {})}
+    regressions = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        noise = NOISE_SPREADS * math.hypot(result.get("spread_us", 0.0), base.get("spread_us", 0.0))
+        allowed = base["time_us"] + max(base["time_us"] * thresholds["time"], noise)
+        if result["time_us"] > allowed:
+            regressions.append(
+                f"{name}: time {result['time_us']:.1f}us > baseline {base['time_us']:.1f}us "
+                f"(+{thresholds['time']:.0%} or +{noise:.1f}us noise allowed)"
+            )
+        if result["peak_bytes"] > base["peak_bytes"] * (1 + thresholds["alloc"]):
+            regressions.append(
+                f"{name}: peak {result['peak_bytes']}B > baseline {base['peak_bytes']}B "
+                f"(+{thresholds['alloc']:.0%} allowed)"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run cases containing this text")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each case")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline()
+    results = {}
+    with tempfile.TemporaryDirectory() as config_dir, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=RENDER_WORKERS) as executor:
+        cases = {name: func for name, func in build_cases(config_dir, executor).items() if args.filter in name}
+        for name, (seconds, spread, peak) in measure(cases, args.min_time).items():
+            results[name] = {"time_us": round(seconds * 1e6, 2), "spread_us": round(spread * 1e6, 2), "peak_bytes": peak}
+
+            base = baseline["results"].get(name)
+            delta = f"{(seconds * 1e6 / base['time_us'] - 1):+7.1%}" if base else "    new"
+            print(f"{name:40s} {seconds * 1e6:10.1f} us ±{spread * 1e6:7.1f} {delta} {peak:10d} B")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline["results"].update(results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline updated: {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(results, baseline)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
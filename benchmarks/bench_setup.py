@@ -0,0 +1,369 @@
+"""End-to-end setup latency of the integration against a Home Assistant stand-in.
+
+Runs async_setup, async_setup_entry, an options update through the registered
+update listener, and async_unload_entry against a minimal in-process stand-in
+for HomeAssistant (executor, config.path, bus, http views and a recording
+services.async_call). With --profiles N, N named profiles are set up, updated
+and unloaded together, as Home Assistant does at startup. With --boot, the
+profiles are set up while Home Assistant is still starting and a "started"
+phase fires homeassistant_started; the options update is left out, so every
+run after the first starts with valid themes on disk. For every phase it
+reports:
+
+- wall time
+- hops to Home Assistant's shared executor and the time spent inside those
+  jobs (passes run on the integration's own worker and are not counted)
+- event-loop blocking time (lag seen by a 1 ms heartbeat) and the longest stall
+- frontend reloads issued (frontend.reload_themes calls)
+
+Usage (from the repository root, with homeassistant installed):
+
+    python benchmarks/bench_setup.py
+    python benchmarks/bench_setup.py --runs 20 --json setup.json
+    python benchmarks/bench_setup.py --profiles 8
+    python benchmarks/bench_setup.py --boot
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STARTED  # noqa: E402
+
+import custom_components.frosted_glass_manager as integration  # noqa: E402
+from custom_components.frosted_glass_manager.const import (  # noqa: E402
+    CONF_LIGHT_PRIMARY,
+    CONF_DARK_PRIMARY,
+    CONF_PROFILE_NAME,
+    DEFAULT_PROFILE_NAME,
+    DOMAIN,
+)
+
+HEARTBEAT = 0.001
+# Heartbeat lag below this is scheduler noise, not blocking
+BLOCKING_NOISE = 0.002
+
+
+class PhaseRecorder:
+    """Counters collected while one phase runs."""
+
+    def __init__(self):
+        self.executor_jobs = 0
+        self.executor_seconds = 0.0
+        self.service_calls = []
+        self.blocked_seconds = 0.0
+        self.longest_block = 0.0
+
+    @property
+    def reloads(self):
+        return sum(1 for call in self.service_calls if call[:2] == ("frontend", "reload_themes"))
+
+
+class StandInBus:
+    """Event bus stand-in: records fired events, supports listeners."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._listeners = {}
+        self.fired = []
+
+    def async_listen(self, event_type, listener, *args, **kwargs):
+        self._listeners.setdefault(event_type, []).append(listener)
+        return lambda: self._listeners.get(event_type, []).remove(listener)
+
+    def async_listen_once(self, event_type, listener, *args, **kwargs):
+        return self.async_listen(event_type, listener)
+
+    def async_fire(self, event_type, event_data=None, *args, **kwargs):
+        self.fired.append((event_type, event_data))
+        event = types.SimpleNamespace(event_type=event_type, data=event_data or {})
+        for listener in list(self._listeners.get(event_type, [])):
+            result = listener(event)
+            if asyncio.iscoroutine(result):
+                self._hass.async_create_task(result)
+
+
+class StandInHttp:
+    """HTTP server stand-in: records registered views."""
+
+    def __init__(self):
+        self.views = []
+
+    def register_view(self, view):
+        self.views.append(view)
+
+
+class StandInServices:
+    """Service registry stand-in that records every call."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._services = {}
+
+    def async_register(self, domain, service, handler, *args, **kwargs):
+        self._services[(domain, service)] = handler
+
+    def has_service(self, domain, service):
+        return (domain, service) in self._services
+
+    def async_remove(self, domain, service):
+        self._services.pop((domain, service), None)
+
+    async def async_call(self, domain, service, service_data=None, *args, **kwargs):
+        self._hass.recorder.service_calls.append((domain, service, service_data or {}))
+        await asyncio.sleep(0)
+
+
+class StandInConfigEntries:
+    """Config entry manager stand-in: records platform forwards."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self.entries = []
+        self.forwarded = []
+
+    def async_entries(self, domain=None, *args, **kwargs):
+        return [entry for entry in self.entries if domain in (None, entry.domain)]
+
+    def async_get_entry(self, entry_id):
+        return next((entry for entry in self.entries if entry.entry_id == entry_id), None)
+
+    async def async_forward_entry_setups(self, entry, platforms):
+        self.forwarded.extend(platforms)
+
+    async def async_unload_platforms(self, entry, platforms):
+        return True
+
+    def async_update_entry(self, entry, *, options=None, **kwargs):
+        if options is not None:
+            entry.options = options
+            for listener in entry.update_listeners:
+                self._hass.async_create_task(listener(self._hass, entry))
+        return True
+
+
+class StandInHass:
+    """The parts of HomeAssistant the integration touches."""
+
+    def __init__(self, config_dir, running=True):
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = None
+        self.data = {}
+        self.state = types.SimpleNamespace(value="RUNNING" if running else "NOT_RUNNING")
+        self.is_running = running
+        self.is_stopping = False
+        self.config = types.SimpleNamespace(
+            config_dir=config_dir,
+            path=lambda *parts: os.path.join(config_dir, *parts),
+        )
+        self.http = StandInHttp()
+        self.bus = StandInBus(self)
+        self.services = StandInServices(self)
+        self.config_entries = StandInConfigEntries(self)
+        self.recorder = PhaseRecorder()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        self._tasks = set()
+
+    async def async_add_executor_job(self, target, *args):
+        self.recorder.executor_jobs += 1
+
+        def timed():
+            start = time.perf_counter()
+            try:
+                return target(*args)
+            finally:
+                self.recorder.executor_seconds += time.perf_counter() - start
+
+        return await self.loop.run_in_executor(self._executor, timed)
+
+    def async_create_task(self, coro, *args, **kwargs):
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async_create_background_task = async_create_task
+
+    def async_run_hass_job(self, job, *args, **kwargs):
+        target = getattr(job, "target", job)
+        result = target(*args)
+        if asyncio.iscoroutine(result):
+            return self.async_create_task(result)
+        return result
+
+    async def async_block_till_done(self):
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class StandInEntry:
+    """A config entry with the attributes async_setup_entry uses."""
+
+    def __init__(self, options, index=0):
+        name = DEFAULT_PROFILE_NAME if index == 0 else f"Benchmark {index}"
+        self.entry_id = f"benchmark{index}"
+        self.domain = DOMAIN
+        self.title = f"Frosted Glass {name}"
+        self.data = {CONF_PROFILE_NAME: name}
+        self.options = options
+        self.state = types.SimpleNamespace(value="loaded")
+        self.update_listeners = []
+        self._on_unload = []
+
+    def add_update_listener(self, listener):
+        self.update_listeners.append(listener)
+        return lambda: self.update_listeners.remove(listener)
+
+    def async_on_unload(self, func):
+        self._on_unload.append(func)
+
+    def async_create_background_task(self, hass, coro, *args, **kwargs):
+        return hass.async_create_task(coro)
+
+    def run_unload_callbacks(self):
+        while self._on_unload:
+            self._on_unload.pop()()
+
+
+async def heartbeat(recorder_getter, stop):
+    """Measure event-loop lag: anything beyond the expected sleep is blocking."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lag = time.perf_counter() - start - HEARTBEAT
+        if lag > BLOCKING_NOISE:
+            recorder = recorder_getter()
+            recorder.blocked_seconds += lag
+            recorder.longest_block = max(recorder.longest_block, lag)
+
+
+async def run_phase(hass, coro_factory):
+    """Run one phase under a fresh recorder and wait for its spawned tasks."""
+    hass.recorder = PhaseRecorder()
+    start = time.perf_counter()
+    result = await coro_factory()
+    await hass.async_block_till_done()
+    wall = time.perf_counter() - start
+    recorder = hass.recorder
+    return result, {
+        "wall_ms": wall * 1000,
+        "executor_hops": recorder.executor_jobs,
+        "executor_ms": recorder.executor_seconds * 1000,
+        "blocked_ms": recorder.blocked_seconds * 1000,
+        "longest_block_ms": recorder.longest_block * 1000,
+        "reloads": recorder.reloads,
+    }
+
+
+async def run_once(config_dir, profiles=1, boot=False):
+    """Set up, update and unload the integration once; return phase metrics."""
+    hass = StandInHass(config_dir, running=not boot)
+    entries = [StandInEntry({}, index) for index in range(profiles)]
+    hass.config_entries.entries.extend(entries)
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(lambda: hass.recorder, stop))
+    await asyncio.sleep(HEARTBEAT * 2)
+
+    phases = {}
+    try:
+        _, phases["setup"] = await run_phase(
+            hass,
+            lambda: _setup(hass, entries),
+        )
+
+        if boot:
+            _, phases["started"] = await run_phase(hass, lambda: _started(hass))
+        else:
+            new_options = {CONF_LIGHT_PRIMARY: [200, 30, 40], CONF_DARK_PRIMARY: [230, 80, 90]}
+            _, phases["options_update"] = await run_phase(
+                hass,
+                lambda: _update_options(hass, entries, new_options),
+            )
+
+        _, phases["unload"] = await run_phase(
+            hass,
+            lambda: _unload(hass, entries),
+        )
+    finally:
+        hass.bus.async_fire("homeassistant_stop")
+        stop.set()
+        await monitor
+        hass.shutdown()
+
+    return phases
+
+
+async def _setup(hass, entries):
+    await integration.async_setup(hass, {})
+    return await asyncio.gather(*(integration.async_setup_entry(hass, entry) for entry in entries))
+
+
+async def _started(hass):
+    hass.state = types.SimpleNamespace(value="RUNNING")
+    hass.is_running = True
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_STARTED)
+
+
+async def _update_options(hass, entries, options):
+    for entry in entries:
+        hass.config_entries.async_update_entry(entry, options=options)
+
+
+async def _unload(hass, entries):
+    results = await asyncio.gather(*(integration.async_unload_entry(hass, entry) for entry in entries))
+    for entry in entries:
+        entry.run_unload_callbacks()
+    return results
+
+
+def summarize(runs):
+    """Median of every metric over all runs, per phase."""
+    summary = {}
+    for phase in runs[0]:
+        summary[phase] = {
+            metric: round(statistics.median(run[phase][metric] for run in runs), 3)
+            for metric in runs[0][phase]
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="number of setup/update/unload cycles")
+    parser.add_argument("--profiles", type=int, default=1, help="number of profiles set up together")
+    parser.add_argument("--boot", action="store_true", help="set up while Home Assistant is starting")
+    parser.add_argument("--json", dest="json_path", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    runs = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        for _ in range(args.runs):
+            runs.append(asyncio.run(run_once(config_dir, args.profiles, args.boot)))
+
+    summary = summarize(runs)
+    header = f"{'phase':16s}" + "".join(f"{metric:>18s}" for metric in next(iter(summary.values())))
+    print(header)
+    for phase, metrics in summary.items():
+        print(f"{phase:16s}" + "".join(f"{value:18.3f}" for value in metrics.values()))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "profiles": args.profiles, "median": summary}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
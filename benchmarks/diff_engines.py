@@ -0,0 +1,188 @@
+"""Differential equivalence harness: reference replace chain vs compiled engine.
+
+Generates random cases (RGB seeds, background URLs, glass tuning and, in a
+share of the cases, adversarial palettes) and renders every registered template
+(templates.THEME_OUTPUTS) with both render_theme_reference (the original chain of
+str.replace calls) and render_theme (the single-pass compiled engine).
+
+Every divergence is reported. Divergences explained by a known
+chained-replacement collision are listed as such. A collision happens when a
+value written by an earlier replacement contains text that a later replacement
+searches for, so the chain rewrites it again and the engine does not. Any
+other divergence fails the run. Both implementations are timed side by side.
+
+Usage (from the repository root, with homeassistant installed):
+
+    python benchmarks/diff_engines.py
+    python benchmarks/diff_engines.py --cases 5000 --seed 7 --verbose
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from custom_components.frosted_glass_manager import (  # noqa: E402
+    generate_hex_palette,
+    render_theme,
+    render_theme_reference,
+    resolve_options,
+)
+from custom_components.frosted_glass_manager.const import (  # noqa: E402
+    CONF_LIGHT_PRIMARY,
+    CONF_LIGHT_BG,
+    CONF_DARK_PRIMARY,
+    CONF_DARK_BG,
+    DEFAULT_PALETTE,
+    GLASS_TUNING_SLOTS,
+)
+from custom_components.frosted_glass_manager.templates import THEME_OUTPUTS  # noqa: E402
+
+URL_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789-_./"
+SPECIAL_SEEDS = ([0, 0, 0], [255, 255, 255], [128, 128, 128], [106, 116, 211], [255, 0, 0], [1, 2, 3])
+
+
+def random_rgb(rng):
+    if rng.random() < 0.1:
+        return list(rng.choice(SPECIAL_SEEDS))
+    return [rng.randint(0, 255) for _ in range(3)]
+
+
+def random_url(rng, collide):
+    """Random background URL; with collide, embed text a later replacement searches for."""
+    kind = rng.random()
+    path = "".join(rng.choice(URL_ALPHABET) for _ in range(rng.randint(4, 40)))
+    if kind < 0.2:
+        url = f"/local/{path}.jpg"
+    elif kind < 0.3:
+        url = f"http://homeassistant.local:8123/local/{path}.png"
+    else:
+        url = f"https://cdn.example.com/{path}.jpg?v={rng.randint(0, 99999)}"
+    if collide:
+        url += "#" + rng.choice(list(DEFAULT_PALETTE.values()))[1:]
+    return url
+
+
+def random_tuning(rng):
+    if rng.random() < 0.5:
+        return None
+    return {
+        mode: {name: f"{rng.random():.2f}".rstrip("0") for name in ("glass_tint", "header_alpha", "text_alpha")}
+        for mode in rng.sample(["light", "dark"], rng.randint(1, 2))
+    }
+
+
+def adversarial_palette(rng, palette):
+    """Make a later chain step match a value written by an earlier one."""
+    levels = list(DEFAULT_PALETTE)
+    i = rng.randrange(len(levels) - 1)
+    j = rng.randrange(i + 1, len(levels))
+    palette = dict(palette)
+    palette[levels[i]] = DEFAULT_PALETTE[levels[j]]
+    return palette
+
+
+def known_collisions(resolved, light_palette, dark_palette, tuning):
+    """Return descriptions of the chained-replacement collisions a case triggers."""
+    collisions = []
+    levels = list(DEFAULT_PALETTE)
+    for mode, palette, background in (
+        ("light", light_palette, resolved[CONF_LIGHT_BG]),
+        ("dark", dark_palette, resolved[CONF_DARK_BG]),
+    ):
+        later_texts = [old_text for old_text, _ in GLASS_TUNING_SLOTS[mode]] + list(DEFAULT_PALETTE.values())
+        for text in later_texts:
+            if text in background:
+                collisions.append(f"{mode}: background URL contains {text!r}")
+        for i, level in enumerate(levels):
+            new_hex = palette.get(level, DEFAULT_PALETTE[level])
+            for later in levels[i + 1:]:
+                if new_hex == DEFAULT_PALETTE[later]:
+                    collisions.append(f"{mode}: palette {level} -> {new_hex} is rewritten as palette {later}")
+    return collisions
+
+
+def first_difference(a, b, context=40):
+    index = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+    return index, a[max(0, index - context):index + context], b[max(0, index - context):index + context]
+
+
+def make_case(rng):
+    collide_light = rng.random() < 0.05
+    collide_dark = rng.random() < 0.05
+    options = {
+        CONF_LIGHT_PRIMARY: random_rgb(rng),
+        CONF_DARK_PRIMARY: random_rgb(rng),
+        CONF_LIGHT_BG: random_url(rng, collide_light),
+        CONF_DARK_BG: random_url(rng, collide_dark),
+    }
+    resolved = resolve_options(options)
+    light_palette = generate_hex_palette(resolved[CONF_LIGHT_PRIMARY])
+    dark_palette = generate_hex_palette(resolved[CONF_DARK_PRIMARY])
+    if rng.random() < 0.05:
+        light_palette = adversarial_palette(rng, light_palette)
+    if rng.random() < 0.05:
+        dark_palette = adversarial_palette(rng, dark_palette)
+    return resolved, light_palette, dark_palette, random_tuning(rng)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=2000, help="number of random cases")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--verbose", action="store_true", help="print every divergence with context")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    timings = {"reference": 0.0, "engine": 0.0}
+    identical = 0
+    explained = []
+    unexplained = []
+
+    for case_index in range(args.cases):
+        resolved, light_palette, dark_palette, tuning = make_case(rng)
+        for template, filename in THEME_OUTPUTS:
+            start = time.perf_counter()
+            expected = render_theme_reference(template, filename, resolved, light_palette, dark_palette, tuning)
+            timings["reference"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            actual = render_theme(template, filename, resolved, light_palette, dark_palette, tuning)
+            timings["engine"] += time.perf_counter() - start
+
+            if expected == actual:
+                identical += 1
+                continue
+
+            collisions = known_collisions(resolved, light_palette, dark_palette, tuning)
+            record = (case_index, filename, resolved, tuning, collisions, first_difference(expected or "", actual or ""))
+            (explained if collisions else unexplained).append(record)
+
+    renders = args.cases * len(THEME_OUTPUTS)
+    print(f"cases: {args.cases} ({renders} renders), identical: {identical}")
+    print(f"known collisions: {len(explained)}, unexplained divergences: {len(unexplained)}")
+    for label, seconds in timings.items():
+        print(f"{label:10s} {seconds * 1000:10.1f} ms total {seconds / renders * 1e6:10.1f} us/render")
+    print(f"speedup    {timings['reference'] / timings['engine']:10.2f}x")
+
+    for label, records in (("COLLISION", explained), ("DIVERGENCE", unexplained)):
+        for case_index, filename, resolved, tuning, collisions, (index, expected, actual) in records:
+            if label == "COLLISION" and not args.verbose:
+                print(f"{label} case {case_index} {filename}: {'; '.join(collisions)}")
+                continue
+            print(f"{label} case {case_index} {filename} at offset {index}")
+            print(f"  options:   {resolved}")
+            print(f"  tuning:    {tuning}")
+            for collision in collisions:
+                print(f"  collision: {collision}")
+            print(f"  reference: {expected!r}")
+            print(f"  engine:    {actual!r}")
+
+    return 1 if unexplained else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""Background image analysis for the Frosted Glass Theme Manager."""
+import colorsys
+import io
+import logging
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    BACKGROUND_FETCH_TIMEOUT,
+    BACKGROUND_MAX_BYTES,
+    BACKGROUND_SAMPLE_SIZE,
+    BACKGROUND_STORAGE_KEY,
+    BACKGROUND_STORAGE_VERSION,
+    DEFAULT_GLASS_TUNING,
+    GLASS_TUNING_LIMITS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Rec. 709 luma weights, used as a Pillow conversion matrix (R, G, B, offset)
+LUMA_MATRIX = (0.2126, 0.7152, 0.0722, 0)
+
+
+def analyze_image_bytes(data):
+    """
+    Compute luminance and contrast statistics of an encoded image.
+
+    The image is decoded at reduced size (JPEG draft mode) and downsampled
+    before Pillow's C-level statistics run over the whole pixel buffer.
+    Returns None when Pillow is not available or the image cannot be decoded.
+    """
+    try:
+        from PIL import Image, ImageFilter, ImageStat
+    except ImportError:
+        _LOGGER.warning("Frosted Glass Manager: Pillow is not installed, background analysis disabled.")
+        return None
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("RGB", (BACKGROUND_SAMPLE_SIZE * 2, BACKGROUND_SAMPLE_SIZE * 2))
+            rgb = img.convert("RGB")
+    except Exception as e:
+        _LOGGER.warning(f"Frosted Glass Manager: Could not decode background image: {e}")
+        return None
+
+    rgb.thumbnail((BACKGROUND_SAMPLE_SIZE, BACKGROUND_SAMPLE_SIZE))
+    luma = rgb.convert("L", LUMA_MATRIX)
+    luma_stat = ImageStat.Stat(luma)
+    edge_stat = ImageStat.Stat(luma.filter(ImageFilter.FIND_EDGES))
+
+    return {
+        "luminance": round(luma_stat.mean[0] / 255.0, 4),
+        "contrast": round(luma_stat.stddev[0] / 255.0, 4),
+        "detail": round(edge_stat.mean[0] / 255.0, 4),
+        "mean_rgb": [int(round(c)) for c in ImageStat.Stat(rgb).mean],
+    }
+
+
+def dominant_color(data):
+    """
+    Return the dominant [r, g, b] of an encoded image (e.g. album art), or None.
+
+    The image is reduced to a small palette; colorful entries win over large
+    near-black or near-white areas.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        _LOGGER.warning("Frosted Glass Manager: Pillow is not installed, album art colors disabled.")
+        return None
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("RGB", (BACKGROUND_SAMPLE_SIZE * 2, BACKGROUND_SAMPLE_SIZE * 2))
+            rgb = img.convert("RGB")
+    except Exception as e:
+        _LOGGER.warning(f"Frosted Glass Manager: Could not decode image: {e}")
+        return None
+
+    rgb.thumbnail((BACKGROUND_SAMPLE_SIZE, BACKGROUND_SAMPLE_SIZE))
+    quantized = rgb.quantize(colors=8)
+    palette = quantized.getpalette()
+
+    best, best_score = None, -1.0
+    for count, index in quantized.getcolors():
+        color = palette[index * 3:index * 3 + 3]
+        _, lightness, saturation = colorsys.rgb_to_hls(*(c / 255.0 for c in color))
+        if not 0.1 < lightness < 0.9:
+            continue
+        score = count * (0.2 + saturation)
+        if score > best_score:
+            best, best_score = color, score
+    return best
+
+
+def _clamp(value, low=0.0, high=1.0):
+    return max(low, min(high, value))
+
+
+def _format_alpha(value):
+    """Format an alpha value the way the templates write them (0.1, 0.08)."""
+    return f"{value:.2f}".rstrip("0")
+
+
+def compute_glass_tuning(stats, mode):
+    """
+    Compute glass tint, header and text alphas for one mode.
+
+    Busy (high contrast / high detail) backgrounds and backgrounds whose
+    brightness works against the mode's text color get a more opaque glass
+    and header, and slightly more opaque secondary text.
+    """
+    busy = _clamp((stats["contrast"] - 0.12) / 0.18) * 0.6 + _clamp(stats["detail"] / 0.15) * 0.4
+    if mode == "light":
+        mismatch = _clamp((0.6 - stats["luminance"]) / 0.4)
+    else:
+        mismatch = _clamp((stats["luminance"] - 0.35) / 0.4)
+    need = _clamp(busy * 0.6 + mismatch * 0.4)
+
+    tuning = {}
+    for name, base in DEFAULT_GLASS_TUNING[mode].items():
+        top = GLASS_TUNING_LIMITS[mode][name]
+        tuning[name] = _format_alpha(base + need * (top - base))
+    return tuning
+
+
+class BackgroundAnalyzer:
+    """Fetch, analyze and cache background images by URL."""
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the analyzer."""
+        self._hass = hass
+        self._store = Store(hass, BACKGROUND_STORAGE_VERSION, BACKGROUND_STORAGE_KEY)
+        self._cache = {}
+        self._hits = 0
+        self._misses = 0
+
+    async def async_load(self):
+        """Load cached analysis results from storage."""
+        data = await self._store.async_load()
+        if isinstance(data, dict):
+            self._cache = data
+
+    def get_cached(self, url):
+        """Return cached statistics for a URL, or None. Not counted as a cache lookup."""
+        return self._cache.get(url)
+
+    def lookup(self, url):
+        """Return cached statistics for a URL that is about to be analyzed, counting a hit or a miss."""
+        stats = self._cache.get(url)
+        if stats is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return stats
+
+    def cache_info(self):
+        """Return hit/miss counters and the number of cached backgrounds."""
+        return {"hits": self._hits, "misses": self._misses, "size": len(self._cache)}
+
+    def get_tuning(self, light_url, dark_url):
+        """Return the glass tuning per mode for the cached backgrounds. Not counted as cache lookups."""
+        tuning = {}
+        for mode, url in (("light", light_url), ("dark", dark_url)):
+            stats = self._cache.get(url)
+            if stats:
+                tuning[mode] = compute_glass_tuning(stats, mode)
+        return tuning
+
+    def get_backdrops(self, light_url, dark_url):
+        """Return the mean color per mode of the cached backgrounds, for the contrast audit."""
+        backdrops = {}
+        for mode, url in (("light", light_url), ("dark", dark_url)):
+            stats = self._cache.get(url)
+            if stats:
+                backdrops[mode] = stats["mean_rgb"]
+        return backdrops
+
+    async def async_analyze(self, url):
+        """Analyze a background URL, using the cache when possible (see lookup for the counters)."""
+        if url in self._cache:
+            return self._cache[url]
+
+        data = await self.async_fetch(url)
+        if data is None:
+            return None
+        if len(data) > BACKGROUND_MAX_BYTES:
+            _LOGGER.warning(f"Frosted Glass Manager: Background {url} is too large to analyze.")
+            return None
+
+        stats = await self._hass.async_add_executor_job(analyze_image_bytes, data)
+        if stats is None:
+            return None
+
+        self._cache[url] = stats
+        self._store.async_delay_save(lambda: self._cache, 10)
+        _LOGGER.debug(f"Frosted Glass Manager: Background {url} analyzed: {stats}")
+        return stats
+
+    async def async_fetch(self, url):
+        """Read image bytes from /local/ or over HTTP(S)."""
+        if url.startswith("/local/"):
+            path = self._hass.config.path("www", url[len("/local/"):].split("?")[0])
+            return await self._hass.async_add_executor_job(_read_local_file, path)
+
+        if not url.startswith(("http://", "https://")):
+            _LOGGER.debug(f"Frosted Glass Manager: Skipping analysis of unsupported background URL {url}")
+            return None
+
+        session = async_get_clientsession(self._hass)
+        try:
+            async with session.get(
+                url, timeout=aiohttp.ClientTimeout(total=BACKGROUND_FETCH_TIMEOUT)
+            ) as resp:
+                resp.raise_for_status()
+                if resp.content_length and resp.content_length > BACKGROUND_MAX_BYTES:
+                    _LOGGER.warning(f"Frosted Glass Manager: Background {url} is too large to analyze.")
+                    return None
+                data = bytearray()
+                async for chunk in resp.content.iter_chunked(65536):
+                    data += chunk
+                    if len(data) > BACKGROUND_MAX_BYTES:
+                        break
+                return bytes(data)
+        except Exception as e:
+            _LOGGER.warning(f"Frosted Glass Manager: Error fetching background {url}: {e}")
+            return None
+
+
+def _read_local_file(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(BACKGROUND_MAX_BYTES + 1)
+    except OSError as e:
+        _LOGGER.warning(f"Frosted Glass Manager: Error reading background {path}: {e}")
+        return None
@@ -1,10 +1,13 @@
 """Config flow for Frosted Glass Theme Manager integration."""
+import re
+
 import voluptuous as vol
 import logging
 
 from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.helpers import selector
+from homeassistant.util import dt as dt_util, slugify
 
 from .const import (
     DOMAIN,
@@ -13,11 +16,41 @@ from .const import (
     CONF_DARK_PRIMARY,
     CONF_DARK_BG,
     CONF_RESET,
+    CONF_AUTO_TUNE,
+    CONF_PROFILE_NAME,
+    CONF_AUTO_SWITCH,
+    CONF_FOLLOW_ENTITY,
+    CONF_PRUNE_CARD_CSS,
+    CONF_DASHBOARD_THEMES,
+    CONF_ON_DEMAND,
+    CONF_EXTERNAL_CSS,
+    CONF_WAIT_FOR_THEMES,
+    CONF_FRAME_TELEMETRY,
+    CONF_AUTO_TIER,
+    CONF_TARGET_FPS,
+    CONF_RESTORE,
+    CONF_DAY_START,
+    CONF_DUSK_START,
+    CONF_NIGHT_START,
+    AUTO_SWITCH_OFF,
+    AUTO_SWITCH_SUN,
+    AUTO_SWITCH_SCHEDULE,
+    DEFAULT_DAY_START,
+    DEFAULT_DUSK_START,
+    DEFAULT_NIGHT_START,
+    DEFAULT_TARGET_FPS,
+    TIME_VARIANTS,
+    CONF_PRESET,
+    PRESET_CLOSEST,
+    DEFAULT_PROFILE_NAME,
+    PROFILE_NAME_PATTERN,
     DEFAULT_LIGHT_RGB,
     DEFAULT_DARK_RGB,
     DEFAULT_LIGHT_BG_URL,
     DEFAULT_DARK_BG_URL,
 )
+from .generator import get_profile_name, profile_outputs, profile_variants, resolve_options
+from .presets import PRESETS, PRESETS_BY_ID, closest_preset
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,14 +60,43 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
     async def async_step_user(self, user_input=None):
-        """Handle the initial step."""
-        if self._async_current_entries():
-            return self.async_abort(reason="single_instance_allowed")
+        """Create a named profile."""
+        errors = {}
+        existing = self._async_current_entries()
 
         if user_input is not None:
-            return self.async_create_entry(title="Frosted Glass Manager", data={})
+            name = " ".join(user_input[CONF_PROFILE_NAME].split())
+            # Profiles are identified by their name, older entries have none
+            taken = {slugify(get_profile_name(entry)) for entry in existing}
+            used_files = {
+                output_filename
+                for entry in existing
+                for _, variant_name, _ in profile_variants(get_profile_name(entry), entry.options)
+                for _, output_filename, _ in profile_outputs(variant_name)
+            }
+
+            if not re.match(PROFILE_NAME_PATTERN, name):
+                errors[CONF_PROFILE_NAME] = "invalid_name"
+            elif slugify(name) in taken:
+                return self.async_abort(reason="already_configured")
+            elif any(output_filename in used_files for _, output_filename, _ in profile_outputs(name)):
+                errors[CONF_PROFILE_NAME] = "name_conflict"
+            else:
+                await self.async_set_unique_id(slugify(name))
+                self._abort_if_unique_id_configured()
+                return self.async_create_entry(
+                    title=f"Frosted Glass {name}",
+                    data={CONF_PROFILE_NAME: name},
+                )
 
-        return self.async_show_form(step_id="user")
+        default_name = "" if existing else DEFAULT_PROFILE_NAME
+        return self.async_show_form(
+            step_id="user",
+            data_schema=vol.Schema(
+                {vol.Required(CONF_PROFILE_NAME, default=default_name): selector.TextSelector()}
+            ),
+            errors=errors,
+        )
 
     @staticmethod
     @callback
@@ -50,10 +112,21 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         """Initialize options flow."""
         # OPRAVA: Premenujeme premennú, aby sme nekolidovali s internou property HA
         self._config_entry = config_entry
+        self._options = {}
 
     async def async_step_init(self, user_input=None):
         """Manage the options."""
+        manager = self.hass.data[DOMAIN]
         if user_input is not None:
+            # A restored version is written back as it was; its options are taken over unchanged
+            version_id = user_input.pop(CONF_RESTORE, "")
+            if version_id:
+                version = await manager.async_restore(self._config_entry.entry_id, int(version_id), update_options=False)
+                if version is not None:
+                    return self.async_create_entry(title="", data=version["options"])
+
+            preset_id = user_input.pop(CONF_PRESET, "")
+
             # === OPRAVA RESET LOGIKY ===
             if user_input.get(CONF_RESET):
                 
@@ -67,9 +140,39 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 user_input[CONF_LIGHT_BG] = DEFAULT_LIGHT_BG_URL
                 user_input[CONF_DARK_PRIMARY] = str_to_list(DEFAULT_DARK_RGB)
                 user_input[CONF_DARK_BG] = DEFAULT_DARK_BG_URL
+                user_input[CONF_AUTO_TUNE] = False
+                user_input[CONF_PRUNE_CARD_CSS] = False
+                user_input[CONF_DASHBOARD_THEMES] = False
+                user_input[CONF_ON_DEMAND] = False
+                user_input[CONF_EXTERNAL_CSS] = False
+                user_input[CONF_WAIT_FOR_THEMES] = False
+                user_input[CONF_FRAME_TELEMETRY] = False
+                user_input[CONF_AUTO_TIER] = False
+                user_input[CONF_TARGET_FPS] = DEFAULT_TARGET_FPS
+                user_input[CONF_AUTO_SWITCH] = AUTO_SWITCH_OFF
+                user_input.pop(CONF_FOLLOW_ENTITY, None)
                 
                 user_input[CONF_RESET] = False
 
+            # A preset only sets the seed colors; the themes are rendered from them like any others
+            elif preset_id:
+                if preset_id == PRESET_CLOSEST:
+                    resolved = resolve_options(user_input)
+                    preset = closest_preset(resolved[CONF_LIGHT_PRIMARY], resolved[CONF_DARK_PRIMARY])
+                else:
+                    preset = PRESETS_BY_ID.get(preset_id)
+                if preset is not None:
+                    user_input[CONF_LIGHT_PRIMARY] = [int(x) for x in preset["light"].split(", ")]
+                    user_input[CONF_DARK_PRIMARY] = [int(x) for x in preset["dark"].split(", ")]
+
+            # Keep the variant settings while switching is off
+            for key in self._variant_keys():
+                if key in self._config_entry.options:
+                    user_input.setdefault(key, self._config_entry.options[key])
+
+            if user_input.get(CONF_AUTO_SWITCH, AUTO_SWITCH_OFF) != AUTO_SWITCH_OFF:
+                self._options = user_input
+                return await self.async_step_variants()
             return self.async_create_entry(title="", data=user_input)
 
         def ensure_rgb_list(rgb_val, default_str):
@@ -87,10 +190,34 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         val_light_bg = self._config_entry.options.get(CONF_LIGHT_BG, DEFAULT_LIGHT_BG_URL)
         val_dark_prim = self._config_entry.options.get(CONF_DARK_PRIMARY, DEFAULT_DARK_RGB)
         val_dark_bg = self._config_entry.options.get(CONF_DARK_BG, DEFAULT_DARK_BG_URL)
+        val_auto_tune = self._config_entry.options.get(CONF_AUTO_TUNE, False)
+        val_prune = self._config_entry.options.get(CONF_PRUNE_CARD_CSS, False)
+        val_dashboards = self._config_entry.options.get(CONF_DASHBOARD_THEMES, False)
+        val_on_demand = self._config_entry.options.get(CONF_ON_DEMAND, False)
+        val_external_css = self._config_entry.options.get(CONF_EXTERNAL_CSS, False)
+        val_wait = self._config_entry.options.get(CONF_WAIT_FOR_THEMES, False)
+        val_telemetry = self._config_entry.options.get(CONF_FRAME_TELEMETRY, False)
+        val_auto_tier = self._config_entry.options.get(CONF_AUTO_TIER, False)
+        val_target_fps = self._config_entry.options.get(CONF_TARGET_FPS, DEFAULT_TARGET_FPS)
+        val_auto_switch = self._config_entry.options.get(CONF_AUTO_SWITCH, AUTO_SWITCH_OFF)
+        val_follow = self._config_entry.options.get(CONF_FOLLOW_ENTITY)
 
         schema = vol.Schema(
             {
                 vol.Optional(CONF_RESET, default=False): bool,
+
+                vol.Optional(CONF_PRESET, default=""): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[
+                            selector.SelectOptionDict(value="", label="Custom colors (below)"),
+                            selector.SelectOptionDict(value=PRESET_CLOSEST, label="Closest preset to the colors below"),
+                        ] + [
+                            selector.SelectOptionDict(value=preset["id"], label=preset["name"])
+                            for preset in PRESETS
+                        ],
+                        mode=selector.SelectSelectorMode.DROPDOWN,
+                    )
+                ),
                 
                 vol.Required(
                     CONF_LIGHT_PRIMARY,
@@ -111,10 +238,105 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_DARK_BG,
                     default=val_dark_bg
                 ): selector.TextSelector(),
+
+                vol.Optional(CONF_AUTO_TUNE, default=val_auto_tune): bool,
+
+                vol.Optional(CONF_PRUNE_CARD_CSS, default=val_prune): bool,
+
+                vol.Optional(CONF_DASHBOARD_THEMES, default=val_dashboards): bool,
+
+                vol.Optional(CONF_ON_DEMAND, default=val_on_demand): bool,
+
+                vol.Optional(CONF_EXTERNAL_CSS, default=val_external_css): bool,
+
+                vol.Optional(CONF_WAIT_FOR_THEMES, default=val_wait): bool,
+
+                vol.Optional(CONF_FRAME_TELEMETRY, default=val_telemetry): bool,
+
+                vol.Optional(CONF_AUTO_TIER, default=val_auto_tier): bool,
+
+                vol.Optional(CONF_TARGET_FPS, default=val_target_fps): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=15, max=120, step=1, unit_of_measurement="fps", mode=selector.NumberSelectorMode.BOX
+                    )
+                ),
+
+                vol.Optional(CONF_AUTO_SWITCH, default=val_auto_switch): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[AUTO_SWITCH_OFF, AUTO_SWITCH_SUN, AUTO_SWITCH_SCHEDULE],
+                        translation_key=CONF_AUTO_SWITCH,
+                    )
+                ),
+
+                vol.Optional(CONF_FOLLOW_ENTITY, description={"suggested_value": val_follow}): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain=["light", "media_player"])
+                ),
             }
         )
 
+        # The latest version is the current one
+        versions = (await manager.async_run_job(manager.history.versions, self._config_entry.entry_id))[1:]
+        if versions:
+            schema = schema.extend(
+                {
+                    vol.Optional(CONF_RESTORE, default=""): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=[selector.SelectOptionDict(value="", label="Keep the current version")] + [
+                                selector.SelectOptionDict(value=str(version["id"]), label=self._version_label(version))
+                                for version in versions
+                            ],
+                            mode=selector.SelectSelectorMode.DROPDOWN,
+                        )
+                    ),
+                }
+            )
+
         return self.async_show_form(
             step_id="init",
             data_schema=schema
         )
+
+    @staticmethod
+    def _version_label(version):
+        resolved = resolve_options(version["options"])
+        when = dt_util.as_local(dt_util.utc_from_timestamp(version["time"]))
+        return (
+            f"#{version['id']} · {when:%Y-%m-%d %H:%M} · "
+            f"light {resolved[CONF_LIGHT_PRIMARY]} / dark {resolved[CONF_DARK_PRIMARY]}"
+        )
+
+    @staticmethod
+    def _variant_keys():
+        keys = [CONF_DAY_START, CONF_DUSK_START, CONF_NIGHT_START]
+        for _, primary_key, background_key, _ in TIME_VARIANTS.values():
+            keys += [primary_key, background_key]
+        return keys
+
+    async def async_step_variants(self, user_input=None):
+        """Colors, backgrounds and times of the dusk and night variants."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data={**self._options, **user_input})
+
+        def rgb_list(value):
+            if isinstance(value, str):
+                return [int(x) for x in value.split(", ")]
+            return list(value)
+
+        fields = {}
+        for _, primary_key, background_key, default_rgb in TIME_VARIANTS.values():
+            fields[vol.Required(primary_key, default=rgb_list(self._options.get(primary_key, default_rgb)))] = (
+                selector.ColorRGBSelector()
+            )
+            fields[vol.Optional(background_key, default=self._options.get(background_key, ""))] = (
+                selector.TextSelector()
+            )
+
+        if self._options[CONF_AUTO_SWITCH] == AUTO_SWITCH_SCHEDULE:
+            for key, default in (
+                (CONF_DAY_START, DEFAULT_DAY_START),
+                (CONF_DUSK_START, DEFAULT_DUSK_START),
+                (CONF_NIGHT_START, DEFAULT_NIGHT_START),
+            ):
+                fields[vol.Required(key, default=self._options.get(key, default))] = selector.TimeSelector()
+
+        return self.async_show_form(step_id="variants", data_schema=vol.Schema(fields))
@@ -0,0 +1,137 @@
+"""WCAG contrast audit of the foreground/background pairs of a theme.
+
+The values of the variables in CONTRAST_PAIRS are compiled into one short
+template per mode, so an audit renders two strings instead of a whole theme.
+Translucent backgrounds are composited bottom to top over the background
+image's mean color, translucent text over the result; then the pairs of a
+mode are measured together, with relative luminance looked up per channel
+instead of computed, and the result is kept for the same colors.
+"""
+import functools
+import re
+
+from .const import CONTRAST_PAGE_BACKGROUND, CONTRAST_PAIRS
+from .engine import declaration_value
+
+# Every variable an audit reads
+CONTRAST_VARIABLES = frozenset(
+    [CONTRAST_PAGE_BACKGROUND]
+    + [foreground for foreground, _, _ in CONTRAST_PAIRS]
+    + [layer for _, layers, _ in CONTRAST_PAIRS for layer in layers]
+)
+
+COLOR_PATTERN = re.compile(
+    r"rgba?\(\s*(\d{1,3})\s*,\s*(\d{1,3})\s*,\s*(\d{1,3})\s*(?:,\s*([\d.]+)\s*)?\)|#([0-9a-fA-F]{6}|[0-9a-fA-F]{3})"
+)
+
+
+def _channel_luminance(weight):
+    """Contribution of each 8-bit sRGB value of a channel to relative luminance."""
+    table = []
+    for value in range(256):
+        c = value / 255
+        table.append(weight * (c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4))
+    return tuple(table)
+
+
+LUMINANCE_R = _channel_luminance(0.2126)
+LUMINANCE_G = _channel_luminance(0.7152)
+LUMINANCE_B = _channel_luminance(0.0722)
+
+
+@functools.lru_cache(maxsize=512)
+def parse_color(text):
+    """Return (r, g, b, alpha) of an rgb(), rgba() or hex color, or None for anything else."""
+    if text == "transparent":
+        return (0, 0, 0, 0.0)
+    match = COLOR_PATTERN.fullmatch(text)
+    if match is None:
+        return None
+    hex_digits = match.group(5)
+    if hex_digits is not None:
+        if len(hex_digits) == 3:
+            hex_digits = "".join(digit * 2 for digit in hex_digits)
+        return (int(hex_digits[0:2], 16), int(hex_digits[2:4], 16), int(hex_digits[4:6], 16), 1.0)
+    alpha = float(match.group(4)) if match.group(4) is not None else 1.0
+    return (min(int(match.group(1)), 255), min(int(match.group(2)), 255), min(int(match.group(3)), 255), min(alpha, 1.0))
+
+
+def _over(color, backdrop):
+    """Composite a translucent color over an opaque (r, g, b) backdrop."""
+    alpha = color[3]
+    return (
+        color[0] * alpha + backdrop[0] * (1 - alpha),
+        color[1] * alpha + backdrop[1] * (1 - alpha),
+        color[2] * alpha + backdrop[2] * (1 - alpha),
+    )
+
+
+def audit_contrast(declarations, values, backdrops=None):
+    """
+    Measure every pair of CONTRAST_PAIRS in both modes.
+
+    declarations come from compile_declarations(template, CONTRAST_VARIABLES)
+    and values are the template's slot values; backdrops maps a mode to the
+    mean [r, g, b] of its background image. Returns [{mode, foreground,
+    background, ratio, required}]; pairs with a color that is not a plain
+    rgb/hex value are left out.
+    """
+    findings = []
+    for mode, (names, compiled) in declarations.items():
+        image = (backdrops or {}).get(mode)
+        findings.extend(
+            {"mode": mode, "foreground": foreground, "background": background, "ratio": ratio, "required": required}
+            for foreground, background, ratio, required in _measure(
+                names, compiled.render(values), tuple(image) if image else None
+            )
+        )
+    return findings
+
+
+@functools.lru_cache(maxsize=64)
+def _measure(names, rendered, image):
+    """
+    Return (foreground, background, ratio, required) of the pairs of one mode.
+
+    rendered holds the declarations of names, one per line. Cached: the Full and
+    Lite themes, and unchanged modes of a regenerated profile, share their colors.
+    """
+    colors = dict(zip(names, (parse_color(declaration_value(line)) for line in rendered.split("\n"))))
+    page = colors.get(CONTRAST_PAGE_BACKGROUND)
+    base = image or (page and _over(page, (255, 255, 255)))
+    if not base:
+        return ()
+    composited = {}
+    pairs = []
+    foregrounds = []
+    backgrounds = []
+    for foreground, layers, required in CONTRAST_PAIRS:
+        color = colors.get(foreground)
+        if color is None:
+            continue
+        backdrop = composited.get(layers)
+        if backdrop is None:
+            backdrop = base
+            for layer in layers:
+                if colors.get(layer) is not None:
+                    backdrop = _over(colors[layer], backdrop)
+            composited[layers] = backdrop
+        pairs.append((foreground, layers[-1], required))
+        foregrounds.append(_over(color, backdrop))
+        backgrounds.append(backdrop)
+
+    # Browsers composite in 8 bits, so every channel is a table lookup
+    luminances = [
+        LUMINANCE_R[round(r)] + LUMINANCE_G[round(g)] + LUMINANCE_B[round(b)]
+        for r, g, b in foregrounds + backgrounds
+    ]
+    count = len(pairs)
+    return tuple(
+        (foreground, background, round((max(fg, bg) + 0.05) / (min(fg, bg) + 0.05), 2), required)
+        for (foreground, background, required), fg, bg in zip(pairs, luminances[:count], luminances[count:])
+    )
+
+
+def contrast_failures(findings):
+    """Return the pairs below their required ratio, lowest first."""
+    return sorted((finding for finding in findings if finding["ratio"] < finding["required"]), key=lambda f: f["ratio"])
@@ -0,0 +1,123 @@
+"""Card usage of the storage-mode Lovelace dashboards.
+
+Each dashboard config is hashed; only dashboards whose file changed since the
+last scan are parsed again, and only those whose set of unused card rules
+changed need their specialized themes rendered again.
+"""
+import hashlib
+import json
+import logging
+import os
+
+from .const import (
+    CARD_TYPE_RULES,
+    DEFAULT_DASHBOARD,
+    LOVELACE_DASHBOARDS_STORAGE,
+    LOVELACE_STORAGE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def dashboard_card_types(config):
+    """Return every card type used anywhere in a dashboard config (stacks, conditions, sections...)."""
+    types = set()
+    stack = [config]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if isinstance(node.get("type"), str):
+                types.add(node["type"])
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return types
+
+
+def unused_rule_tokens(card_types):
+    """Return the selector tokens of the card-specific rules a dashboard does not need."""
+    return frozenset(
+        token for card_type, tokens in CARD_TYPE_RULES.items() if card_type not in card_types for token in tokens
+    )
+
+
+def dashboard_profile_name(profile_name, url_path):
+    """Name the dashboard theme of a profile after the dashboard."""
+    return f"{profile_name} ({url_path})"
+
+
+class DashboardIndex:
+    """The analyzed storage-mode dashboards, keyed by URL path."""
+
+    def __init__(self, config_dir):
+        """Initialize an empty index for a config directory."""
+        self.config_dir = config_dir
+        # url_path -> config file digest / unused rule tokens
+        self._digests = {}
+        self.tokens = {}
+        self.scans = 0
+        self.analyzed = 0
+
+    def _storage_path(self, key):
+        return os.path.join(self.config_dir, ".storage", key)
+
+    def _storage_keys(self):
+        """Return {url_path: storage key} of the storage-mode dashboards."""
+        keys = {DEFAULT_DASHBOARD: LOVELACE_STORAGE}
+        try:
+            with open(self._storage_path(LOVELACE_DASHBOARDS_STORAGE), encoding="utf-8") as f:
+                items = json.load(f).get("data", {}).get("items", [])
+        except (OSError, ValueError, AttributeError):
+            items = []
+        for item in items:
+            if item.get("mode", "storage") == "storage" and item.get("url_path") and item.get("id"):
+                keys[item["url_path"]] = f"{LOVELACE_STORAGE}.{item['id']}"
+        return keys
+
+    def _analyze(self, data):
+        """Return the unused rule tokens of a dashboard file, or None if it cannot be analyzed."""
+        try:
+            config = json.loads(data)["data"]["config"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        # Strategy dashboards generate their cards in the browser
+        if not isinstance(config, dict) or "strategy" in config:
+            return None
+        return unused_rule_tokens(dashboard_card_types(config))
+
+    def scan(self):
+        """
+        Re-analyze the dashboards whose config changed. Runs in the executor.
+
+        Returns (url paths whose unused rules changed, url paths no longer analyzable).
+        """
+        self.scans += 1
+        analyzable = set(self.tokens)
+        changed = set()
+        saved = set()
+        for url_path, key in self._storage_keys().items():
+            try:
+                with open(self._storage_path(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                # Never saved: the auto-generated dashboard
+                continue
+            saved.add(url_path)
+            digest = hashlib.sha1(data).hexdigest()
+            if self._digests.get(url_path) == digest:
+                continue
+
+            self.analyzed += 1
+            tokens = self._analyze(data)
+            # Also for a dashboard that cannot be analyzed (e.g. a strategy), so it is only parsed again once changed
+            self._digests[url_path] = digest
+            if tokens is None:
+                self.tokens.pop(url_path, None)
+            elif self.tokens.get(url_path) != tokens:
+                self.tokens[url_path] = tokens
+                changed.add(url_path)
+
+        for url_path in set(self._digests) - saved:
+            del self._digests[url_path]
+            self.tokens.pop(url_path, None)
+        return changed, analyzable - set(self.tokens)
@@ -0,0 +1,207 @@
+"""Diagnostics support for Frosted Glass Theme Manager."""
+import time
+import tracemalloc
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .generator import (
+    generate_hex_palette,
+    get_profile_name,
+    palette_cache_info,
+    profile_outputs,
+    profile_renders,
+    resolve_options,
+)
+from .const import (
+    DOMAIN,
+    CONF_LIGHT_PRIMARY,
+    CONF_LIGHT_BG,
+    CONF_DARK_PRIMARY,
+    CONF_DARK_BG,
+    CONF_DUSK_BG,
+    CONF_NIGHT_BG,
+    CONF_PRUNE_CARD_CSS,
+    DEFAULT_PALETTE,
+)
+from .engine import (
+    MODES,
+    SLOT_BACKGROUND,
+    SLOT_PALETTE,
+    SLOT_PRIMARY,
+    SLOT_THEME_NAME,
+    SLOT_TUNING,
+    compile_template,
+)
+
+# Background image URLs and paths, browser names and override values, which may be private
+TO_REDACT = {CONF_LIGHT_BG, CONF_DARK_BG, CONF_DUSK_BG, CONF_NIGHT_BG, "name", "value"}
+
+# Slot kinds as named in the statistics
+SLOT_NAMES = {
+    SLOT_PRIMARY: "primary_rgb",
+    SLOT_BACKGROUND: "background_url",
+    SLOT_TUNING: "glass_tuning",
+    SLOT_THEME_NAME: "theme_name",
+}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return diagnostics for a config entry."""
+    manager = hass.data[DOMAIN]
+    resolved = resolve_options(entry.options)
+    tuning = manager.get_glass_tuning(entry)
+    analyzer = manager.analyzer
+    prune = manager.unused_cards if entry.options.get(CONF_PRUNE_CARD_CSS, False) else None
+    profiles = manager.rendered_profiles(entry)
+
+    # On the worker, like the passes, so the compiled templates are shared and not compiled on the loop
+    render, templates = await manager.async_run_job(
+        measure_profile, profiles, manager.unused_cards, manager.theme_overrides
+    )
+
+    return {
+        "profile": {
+            "name": get_profile_name(entry),
+            "themes": {
+                output_filename: theme_name
+                for profile in profiles.values()
+                for _, output_filename, theme_name in profile_outputs(profile[0])
+            },
+            "loaded_profiles": len(manager.entries),
+            "render_passes": manager.passes,
+            "variant_switching": (
+                {"mode": switcher.mode, "active": switcher.active, "switches": switcher.switches}
+                if (switcher := manager.switchers.get(entry.entry_id)) is not None
+                else None
+            ),
+            "pruned_card_rules": sorted(prune) if prune else [],
+            "dashboard_themes": {
+                url_path: sorted(manager.dashboards.tokens.get(url_path, ()))
+                for url_path in sorted(manager.dashboard_themes.get(entry.entry_id, ()))
+            },
+            "placeholders": sorted(
+                name for name, owner in manager.placeholders.items() if owner == entry.entry_id
+            ),
+            "history": [
+                {"id": version["id"], "time": version["time"], "files": len(version["files"])}
+                for version in await manager.async_run_job(manager.history.versions, entry.entry_id)
+            ],
+            "startup": manager.startup.get(entry.entry_id),
+            "dashboard_scans": {"scans": manager.dashboards.scans, "analyzed": manager.dashboards.analyzed},
+            "color_following": (
+                {
+                    "entity_id": follower.entity_id,
+                    "applied": follower.applied,
+                    "updates": follower.updates,
+                    "skipped": follower.skipped,
+                }
+                if (follower := manager.followers.get(entry.entry_id)) is not None
+                else None
+            ),
+            "overrides": {
+                "watching": manager.overrides_watcher is not None and manager.overrides_watcher.active,
+                "rules": len(manager.theme_overrides.rules),
+                "errors": manager.theme_overrides.errors,
+                "changes": async_redact_data(
+                    {
+                        tier: [{"mode": mode, "key": name, "value": value} for mode, name, value in changes]
+                        for tier, changes in manager.theme_overrides.profile_changes(get_profile_name(entry)).items()
+                    },
+                    TO_REDACT,
+                ),
+            },
+            "frame_telemetry": {
+                "module": manager.async_telemetry_enabled(),
+                # Browsers are identified by a random id kept in their local storage
+                "browsers": async_redact_data(
+                    {
+                        device_id: device
+                        for device_id, device in manager.telemetry.devices.items()
+                        if device["entry_id"] == entry.entry_id
+                    },
+                    TO_REDACT,
+                ),
+            },
+        },
+        "options": async_redact_data(entry.options, TO_REDACT),
+        "resolved_options": async_redact_data(resolved, TO_REDACT),
+        "palettes": {
+            "light": generate_hex_palette(resolved[CONF_LIGHT_PRIMARY]),
+            "dark": generate_hex_palette(resolved[CONF_DARK_PRIMARY]),
+        },
+        "glass_tuning": tuning,
+        "last_generation": manager.stats[entry.entry_id].as_dict(),
+        "render": render,
+        "templates": templates,
+        "cache": {
+            "palette": palette_cache_info(),
+            "background": {
+                **analyzer.cache_info(),
+                # By option rather than URL, which is redacted
+                "entries": {key: analyzer.get_cached(resolved[key]) for key in (CONF_LIGHT_BG, CONF_DARK_BG)},
+            },
+        },
+    }
+
+
+def measure_profile(profiles, unused_cards=None, overrides=None):
+    """Return the render measurements and the template statistics of every output of profiles (see generate_profiles)."""
+    renders = profile_renders(profiles, unused_cards, overrides)
+    templates = {
+        output_filename: template_statistics(content_template) for _, content_template, output_filename, _, _ in renders
+    }
+    return measure_render(renders), templates
+
+
+def measure_render(renders):
+    """Render every output of profile_renders once under tracemalloc and time it."""
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+
+    durations = {}
+    try:
+        for _, _, output_filename, _, render in renders:
+            start = time.perf_counter()
+            render()
+            durations[output_filename] = round((time.perf_counter() - start) * 1000, 3)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    return {
+        "duration_ms": durations,
+        "memory_current_bytes": current - baseline,
+        "memory_peak_bytes": peak - baseline,
+    }
+
+
+def template_statistics(content_template):
+    """Return the size of a template and how many slots of each kind its compiled form has per mode."""
+    compiled = compile_template(content_template)
+    slots = None
+    if compiled is not None:
+        slots = {
+            mode: {
+                **{name: 0 for name in SLOT_NAMES.values()},
+                **{f"palette_{level}": 0 for level in DEFAULT_PALETTE},
+            }
+            for mode in MODES
+        }
+        for _, (mode, kind, arg) in compiled.slot_positions:
+            slots[mode][f"palette_{arg}" if kind == SLOT_PALETTE else SLOT_NAMES[kind]] += 1
+        for counts in slots.values():
+            counts["total"] = sum(counts.values())
+
+    return {
+        "characters": len(content_template),
+        "bytes": len(content_template.encode("utf-8")),
+        "lines": content_template.count("\n") + 1,
+        "slot_count": compiled.slot_count if compiled is not None else 0,
+        "slots": slots,
+    }
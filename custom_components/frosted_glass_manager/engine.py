@@ -0,0 +1,299 @@
+"""Single-pass template engine for the Frosted Glass themes.
+
+The reference renderer runs a chain of str.replace calls per mode, copying the
+whole template once per replacement. Here a template is parsed into its typed
+model (model.py) and every replaceable text of its tokens is located once
+(compile) and turned into a slot; rendering is a single join of the literal
+segments and the slot values.
+"""
+import re
+
+from .const import (
+    CONF_LIGHT_PRIMARY,
+    CONF_LIGHT_BG,
+    CONF_DARK_PRIMARY,
+    CONF_DARK_BG,
+    DEFAULT_LIGHT_RGB,
+    DEFAULT_DARK_RGB,
+    DEFAULT_LIGHT_BG_URL,
+    DEFAULT_DARK_BG_URL,
+    DEFAULT_PALETTE,
+    GLASS_TUNING_SLOTS,
+)
+from .model import PROPERTY_PATTERN, SPLIT_MARKER, template_cache, theme_model
+
+MODES = ("light", "dark")
+
+SLOT_PRIMARY = "primary"
+SLOT_BACKGROUND = "background"
+SLOT_TUNING = "tuning"
+SLOT_PALETTE = "palette"
+SLOT_THEME_NAME = "theme_name"
+
+# The theme name is the first top-level key of the template
+THEME_NAME_PATTERN = re.compile(r"^([^\s#][^:\n]*):[ \t]*$", re.M)
+
+
+def _model_defaults(model, mode):
+    """Return the (primary "r, g, b", background URL) of a mode of a model, falling back to the DEFAULT_* constants."""
+    primary, background = model.seeds.get(mode, (None, None)) if model is not None else (None, None)
+    return (
+        primary or (DEFAULT_LIGHT_RGB if mode == "light" else DEFAULT_DARK_RGB),
+        background or (DEFAULT_LIGHT_BG_URL if mode == "light" else DEFAULT_DARK_BG_URL),
+    )
+
+
+@template_cache
+def template_defaults(content_template):
+    """
+    Find the default primary color and background image URL of each mode of a template.
+
+    Returns {mode: (primary "r, g, b", background URL)}; what a mode does not
+    set falls back to the DEFAULT_* constants.
+    """
+    model = theme_model(content_template)
+    return {mode: _model_defaults(model, mode) for mode in MODES}
+
+
+def mode_slot_texts(mode, default_rgb=None, default_bg=None):
+    """Return {default template text: slot key} for one mode, see template_defaults."""
+    if default_rgb is None:
+        default_rgb = DEFAULT_LIGHT_RGB if mode == "light" else DEFAULT_DARK_RGB
+    if default_bg is None:
+        default_bg = DEFAULT_LIGHT_BG_URL if mode == "light" else DEFAULT_DARK_BG_URL
+
+    texts = {
+        default_rgb: (mode, SLOT_PRIMARY, None),
+        default_bg: (mode, SLOT_BACKGROUND, None),
+    }
+    for index, (old_text, _) in enumerate(GLASS_TUNING_SLOTS[mode]):
+        texts[old_text] = (mode, SLOT_TUNING, index)
+    for level, old_hex in DEFAULT_PALETTE.items():
+        texts[old_hex] = (mode, SLOT_PALETTE, level)
+    return texts
+
+
+@template_cache
+def _slot_matcher(mode, default_rgb=None, default_bg=None):
+    """Return (texts, pattern) of mode_slot_texts, shared: the texts identify the compiled tokens."""
+    texts = mode_slot_texts(mode, default_rgb, default_bg)
+    return texts, re.compile("|".join(re.escape(text) for text in sorted(texts, key=len, reverse=True)))
+
+
+class CompiledTemplate:
+    """A template split into literal segments and slots."""
+
+    __slots__ = ("pieces", "slot_positions", "defaults")
+
+    def __init__(self, pieces, slot_positions, defaults):
+        """Initialize from the compiled pieces."""
+        # Literal text with the default text at every slot position
+        self.pieces = pieces
+        # [(index into pieces, slot key)]
+        self.slot_positions = slot_positions
+        # {slot key: default template text}
+        self.defaults = defaults
+
+    @property
+    def slot_count(self):
+        """Number of slot occurrences in the template."""
+        return len(self.slot_positions)
+
+    def slot_values(self, resolved, light_palette, dark_palette, tuning=None, theme_name=None):
+        """Resolve the text of every slot from options, palettes, tuning and theme name."""
+        tuning = tuning or {}
+        palettes = {"light": light_palette, "dark": dark_palette}
+        primaries = {"light": resolved[CONF_LIGHT_PRIMARY], "dark": resolved[CONF_DARK_PRIMARY]}
+        backgrounds = {"light": resolved[CONF_LIGHT_BG], "dark": resolved[CONF_DARK_BG]}
+
+        values = {}
+        for key, default in self.defaults.items():
+            mode, kind, arg = key
+            if kind == SLOT_PRIMARY:
+                values[key] = primaries[mode]
+            elif kind == SLOT_BACKGROUND:
+                values[key] = backgrounds[mode]
+            elif kind == SLOT_THEME_NAME:
+                values[key] = theme_name or default
+            elif kind == SLOT_TUNING:
+                if mode in tuning:
+                    values[key] = GLASS_TUNING_SLOTS[mode][arg][1].format(**tuning[mode])
+                else:
+                    values[key] = default
+            else:
+                values[key] = palettes[mode].get(arg, default)
+        return values
+
+    def render(self, values):
+        """Join the template with the given slot values."""
+        pieces = self.pieces.copy()
+        for position, key in self.slot_positions:
+            pieces[position] = values[key]
+        return "".join(pieces)
+
+
+def _scan(text, matcher):
+    """Split text into literals (str) and slots ((slot key, default text))."""
+    texts, pattern = matcher
+    items = []
+    last = 0
+    for match in pattern.finditer(text):
+        if match.start() > last:
+            items.append(text[last:match.start()])
+        items.append((texts[match.group()], match.group()))
+        last = match.end()
+    if last < len(text):
+        items.append(text[last:])
+    return items
+
+
+def _token_items(token, text, matcher):
+    """Return the scanned items of a token, cached on it for the matcher of its mode."""
+    compiled = token.compiled
+    if compiled is None or compiled[0] is not matcher:
+        compiled = token.compiled = (matcher, _scan(text, matcher))
+    return compiled[1]
+
+
+def _assemble(item_lists):
+    """Build a CompiledTemplate from lists of items, joining adjacent literals into one piece."""
+    pieces = []
+    slot_positions = []
+    defaults = {}
+    literals = []
+    for items in item_lists:
+        for item in items:
+            if item.__class__ is str:
+                literals.append(item)
+                continue
+            if literals:
+                pieces.append("".join(literals))
+                literals.clear()
+            key, text = item
+            defaults[key] = text
+            slot_positions.append((len(pieces), key))
+            pieces.append(text)
+    if literals:
+        pieces.append("".join(literals))
+    return CompiledTemplate(pieces, slot_positions, defaults)
+
+
+def compile_model(model):
+    """
+    Compile a theme model into a CompiledTemplate.
+
+    The text before the dark mode is compiled with the light slot texts, the
+    rest with the dark ones. Scans are cached on the tokens and the result on
+    the model, so a changed copy only scans the tokens it replaced.
+    """
+    if model.compiled is not None:
+        return model.compiled
+
+    matchers = {mode: _slot_matcher(mode, *_model_defaults(model, mode)) for mode in MODES}
+    matcher = matchers["light"]
+    item_lists = []
+    for position, token in enumerate(model.preamble):
+        if position == model.name_line:
+            name = model.name
+            item_lists.append([(("light", SLOT_THEME_NAME, None), name)])
+            item_lists.append(_scan(token.text[len(name):], matcher))
+        else:
+            item_lists.append(_token_items(token, token.text, matcher))
+    for mode in model.modes.values():
+        if mode.name == "dark":
+            matcher = matchers["dark"]
+        item_lists.append((mode.header,))
+        item_lists.extend(_token_items(token, token.text, matcher) for token in mode.tokens)
+
+    model.compiled = _assemble(item_lists)
+    return model.compiled
+
+
+@template_cache
+def compile_template(content_template):
+    """
+    Compile a template into a CompiledTemplate, or None if it has no dark mode.
+
+    Compiled templates are cached by their text, so the scan is paid once.
+    """
+    model = theme_model(content_template)
+    return compile_model(model) if model is not None else None
+
+
+def compile_fragment(text, mode, mode_defaults=()):
+    """Compile a piece of one mode of a template (e.g. a CSS block) like that mode's part, see template_defaults."""
+    return _assemble([_scan(text, _slot_matcher(mode, *mode_defaults))])
+
+
+@template_cache
+def compile_variables(content_template):
+    """
+    Compile the theme variables that depend on the options.
+
+    Returns {mode: [(variable name, CompiledTemplate of its "name: value" line)]}
+    for every theme key of a mode containing a slot, or None if the template
+    has no dark mode. The slot keys match compile_template, so one set of slot
+    values renders both; see variable_value.
+    """
+    model = theme_model(content_template)
+    if model is None:
+        return None
+
+    variables = {}
+    for mode in MODES:
+        matcher = _slot_matcher(mode, *_model_defaults(model, mode))
+        variables[mode] = []
+        for key in model.modes[mode].keys():
+            # Glass tuning slots include the variable name, so the whole line is scanned
+            line = key.text.strip()
+            if matcher[1].search(line) is not None:
+                variables[mode].append((key.name, _assemble([_scan(line, matcher)])))
+    return variables
+
+
+@template_cache
+def compile_declarations(content_template, names):
+    """
+    Compile the declarations of the variables in names (a frozenset) for rendering in one go.
+
+    Returns {mode: (names, CompiledTemplate)}: rendering gives the "name: value"
+    lines in the order of names, one per line; see declaration_value. A
+    variable's line is that of the last custom property "--name: value;" where
+    card-mod CSS sets one (cards see that), else the theme key; None if the
+    template has no dark mode.
+    """
+    model = theme_model(content_template)
+    if model is None:
+        return None
+
+    declarations = {}
+    for mode in MODES:
+        theme_mode = model.modes[mode]
+        lines = {}
+        for key in theme_mode.keys():
+            if key.name in names:
+                lines[key.name] = (key.prefix + key.raw).strip()
+        for block in theme_mode.blocks():
+            for name, index in block.properties.items():
+                if name in names:
+                    match = PROPERTY_PATTERN.match(block.lines[index])
+                    lines[name] = (match.group(1) + match.group(3)).strip()
+        matcher = _slot_matcher(mode, *_model_defaults(model, mode))
+        declarations[mode] = (tuple(lines), _assemble([_scan("\n".join(lines.values()), matcher)]))
+    return declarations
+
+
+def declaration_value(line):
+    """Return the value of a rendered declaration line without quotes or !important."""
+    value = line.split(":", 1)[1].strip()
+    if value[:1] in "'\"" and value.find(value[0], 1) > 0:
+        return value[1:value.find(value[0], 1)]
+    return value.removesuffix("!important").strip()
+
+
+def variable_value(compiled_line, values):
+    """Render a compiled variable line and return its value without YAML quotes."""
+    value = compiled_line.render(values).split(":", 1)[1].strip()
+    if len(value) > 1 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
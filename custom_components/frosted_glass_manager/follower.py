@@ -0,0 +1,119 @@
+"""Follow the color of a light or the album art of a media player."""
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.network import NoURLAvailableError, get_url
+
+from .const import (
+    CONF_FOLLOW_ENTITY,
+    FOLLOW_COOLDOWN,
+    FOLLOW_MIN_DISTANCE,
+    FOLLOW_QUANTUM,
+)
+from .background import dominant_color
+from .presets import color_distance
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def quantize_rgb(rgb):
+    """Snap a color to the follow grid, returned as "r, g, b"."""
+    return ", ".join(str(min(255, round(int(c) / FOLLOW_QUANTUM) * FOLLOW_QUANTUM)) for c in rgb[:3])
+
+
+class ColorFollower:
+    """
+    Drives the primary color of a profile from an entity.
+
+    State changes only record the latest target. Renders go through a
+    debouncer: the first change applies at once, later ones within the
+    cooldown collapse into one trailing render. Colors are quantized and small
+    moves are ignored, so a color-looping light costs at most one render (and
+    one theme reload) per cooldown.
+    """
+
+    def __init__(self, hass: HomeAssistant, manager, entry: ConfigEntry):
+        """Initialize the follower."""
+        self.hass = hass
+        self.manager = manager
+        self.entry = entry
+        self.entity_id = entry.options[CONF_FOLLOW_ENTITY]
+        self.applied = None
+        self.updates = 0
+        self.skipped = 0
+        self._picture = None
+        self._unsub = None
+        self._debouncer = Debouncer(
+            hass, _LOGGER, cooldown=FOLLOW_COOLDOWN, immediate=True, function=self._async_apply
+        )
+
+    @callback
+    def async_start(self):
+        """Track the entity and pick up its current color."""
+        self._unsub = async_track_state_change_event(self.hass, [self.entity_id], self._async_state_changed)
+        self._async_state_changed()
+
+    @callback
+    def async_stop(self):
+        """Stop tracking the entity."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._debouncer.async_cancel()
+
+    @callback
+    def _async_state_changed(self, event=None):
+        state = self.hass.states.get(self.entity_id)
+        if state is None:
+            return
+        if state.domain == "media_player":
+            picture = state.attributes.get("entity_picture")
+            if not picture or picture == self._picture:
+                return
+        else:
+            rgb = state.attributes.get("rgb_color")
+            if not rgb or not self._worth_rendering(quantize_rgb(rgb)):
+                return
+        self.hass.async_create_task(self._debouncer.async_call())
+
+    def _worth_rendering(self, color):
+        if self.applied is not None and color_distance(color, self.applied) < FOLLOW_MIN_DISTANCE:
+            self.skipped += 1
+            return False
+        return True
+
+    async def _async_target_color(self):
+        """Return the quantized color the entity asks for now, or None."""
+        state = self.hass.states.get(self.entity_id)
+        if state is None:
+            return None
+        if state.domain != "media_player":
+            rgb = state.attributes.get("rgb_color")
+            return quantize_rgb(rgb) if rgb else None
+
+        picture = state.attributes.get("entity_picture")
+        if not picture or picture == self._picture:
+            return None
+        self._picture = picture
+        if picture.startswith("/"):
+            try:
+                picture = f"{get_url(self.hass, allow_external=False)}{picture}"
+            except NoURLAvailableError:
+                return None
+        data = await self.manager.analyzer.async_fetch(picture)
+        if not data:
+            return None
+        rgb = await self.hass.async_add_executor_job(dominant_color, data)
+        return quantize_rgb(rgb) if rgb else None
+
+    async def _async_apply(self):
+        """Render the profile with the latest target color (debounced)."""
+        color = await self._async_target_color()
+        if color is None or not self._worth_rendering(color):
+            return
+        self.applied = color
+        self.updates += 1
+        await self.manager.async_set_color_override(self.entry.entry_id, color)
@@ -0,0 +1,155 @@
+// Frosted Glass Theme Manager: frame-time telemetry.
+//
+// Loaded into the frontend while a profile has frame telemetry on. After a
+// dashboard loads, the frame intervals and long tasks of a few seconds are
+// sampled and reported once; the manager answers with the theme this browser
+// should switch to when automatic tier selection is on.
+
+const DOMAIN = "frosted_glass_manager";
+const SETTLE_MS = 1000;
+const SAMPLE_MS = 5000;
+// A dashboard is measured at most once per interval
+const MIN_INTERVAL_MS = 60000;
+const DEVICE_KEY = `${DOMAIN}.device_id`;
+// The theme this module selected, so it can follow the default theme's variant
+const AUTO_THEME_KEY = `${DOMAIN}.auto_theme`;
+
+let sampling = false;
+let lastSample = 0;
+
+const homeAssistant = () => document.querySelector("home-assistant");
+
+function deviceId() {
+  let id = localStorage.getItem(DEVICE_KEY);
+  if (!id) {
+    id = (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`).replace(/[^A-Za-z0-9_-]/g, "");
+    localStorage.setItem(DEVICE_KEY, id);
+  }
+  return id;
+}
+
+function deviceName() {
+  const ua = navigator.userAgent;
+  const platform =
+    [["iPad", "iPad"], ["iPhone", "iPhone"], ["Android", "Android"], ["Windows", "Windows"], ["Mac OS", "macOS"], ["Linux", "Linux"]]
+      .find(([token]) => ua.includes(token))?.[1] || "Browser";
+  const browser =
+    [["HomeAssistant", "Companion app"], ["Edg/", "Edge"], ["Firefox/", "Firefox"], ["Chrome/", "Chrome"], ["Safari/", "Safari"]]
+      .find(([token]) => ua.includes(token))?.[1] || "Browser";
+  return `${platform} ${browser}`;
+}
+
+function onDashboard(hass) {
+  const urlPath = location.pathname.split("/")[1];
+  return hass.panels?.[urlPath]?.component_name === "lovelace";
+}
+
+// Frame intervals and long tasks over SAMPLE_MS; null when the page was hidden meanwhile
+function sampleFrames() {
+  return new Promise((resolve) => {
+    const intervals = [];
+    let longTasks = 0;
+    let longTaskMs = 0;
+    let observer = null;
+    if (PerformanceObserver.supportedEntryTypes?.includes("longtask")) {
+      observer = new PerformanceObserver((list) => {
+        for (const entry of list.getEntries()) {
+          longTasks += 1;
+          longTaskMs += entry.duration;
+        }
+      });
+      observer.observe({ type: "longtask" });
+    }
+    let start = null;
+    let last = null;
+    const frame = (now) => {
+      if (document.hidden) {
+        observer?.disconnect();
+        resolve(null);
+        return;
+      }
+      if (start === null) {
+        start = now;
+      } else {
+        intervals.push(now - last);
+      }
+      last = now;
+      if (now - start < SAMPLE_MS) {
+        requestAnimationFrame(frame);
+        return;
+      }
+      observer?.disconnect();
+      const sorted = [...intervals].sort((a, b) => a - b);
+      const duration = now - start;
+      resolve({
+        fps: intervals.length ? (intervals.length * 1000) / duration : 0,
+        frame_p95_ms: sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * 0.95))] : 0,
+        frames: intervals.length,
+        duration_ms: duration,
+        long_tasks: longTasks,
+        long_task_ms: longTaskMs,
+      });
+    };
+    requestAnimationFrame(frame);
+  });
+}
+
+async function measure(force = false) {
+  const ha = homeAssistant();
+  const hass = ha?.hass;
+  if (!hass?.connection || sampling || document.hidden || !onDashboard(hass)) {
+    return;
+  }
+  if (!force && Date.now() - lastSample < MIN_INTERVAL_MS) {
+    return;
+  }
+  sampling = true;
+  lastSample = Date.now();
+  try {
+    await new Promise((resolve) => setTimeout(resolve, SETTLE_MS));
+    const sample = await sampleFrames();
+    if (!sample) {
+      return;
+    }
+    const selected = ha.hass.selectedTheme?.theme;
+    const theme = selected || ha.hass.themes?.default_theme || null;
+    const result = await ha.hass.connection.sendMessagePromise({
+      type: `${DOMAIN}/frame_report`,
+      device_id: deviceId(),
+      name: deviceName(),
+      theme,
+      default_theme: ha.hass.themes?.default_theme || null,
+      auto: Boolean(selected) && selected === localStorage.getItem(AUTO_THEME_KEY),
+      ...sample,
+    });
+    if (result?.theme && result.theme !== theme) {
+      localStorage.setItem(AUTO_THEME_KEY, result.theme);
+      ha.dispatchEvent(new CustomEvent("settheme", { detail: { theme: result.theme }, bubbles: true, composed: true }));
+    }
+  } catch (err) {
+    // Telemetry was turned off or the connection dropped: try again on the next dashboard
+  } finally {
+    sampling = false;
+  }
+}
+
+async function start() {
+  await customElements.whenDefined("home-assistant");
+  let hass = homeAssistant()?.hass;
+  while (!hass?.connection) {
+    await new Promise((resolve) => setTimeout(resolve, 500));
+    hass = homeAssistant()?.hass;
+  }
+  window.addEventListener("location-changed", () => measure());
+  document.addEventListener("visibilitychange", () => measure());
+  // New themes (e.g. a variant switch of the default theme): the selected tier is looked up again
+  hass.connection.subscribeEvents(() => {
+    const selected = homeAssistant()?.hass?.selectedTheme?.theme;
+    if (selected && selected === localStorage.getItem(AUTO_THEME_KEY)) {
+      measure(true);
+    }
+  }, "themes_updated");
+  measure();
+}
+
+start();
@@ -0,0 +1,514 @@
+"""Palette generation and theme rendering for the Frosted Glass Theme Manager."""
+from __future__ import annotations
+
+import os
+import time
+import logging
+import colorsys
+import functools
+import hashlib
+from typing import TYPE_CHECKING
+
+from .const import (
+    CONF_LIGHT_PRIMARY,
+    CONF_LIGHT_BG,
+    CONF_DARK_PRIMARY,
+    CONF_DARK_BG,
+    CONF_RESET,
+    CONF_PROFILE_NAME,
+    CONF_AUTO_SWITCH,
+    CONF_PRUNE_CARD_CSS,
+    CONF_EXTERNAL_CSS,
+    AUTO_SWITCH_OFF,
+    VARIANT_DAY,
+    TIME_VARIANTS,
+    DEFAULT_PROFILE_NAME,
+    DEFAULT_LIGHT_RGB,
+    DEFAULT_DARK_RGB,
+    DEFAULT_LIGHT_BG_URL,
+    DEFAULT_DARK_BG_URL,
+    DEFAULT_PALETTE,
+    GLASS_TUNING_SLOTS,
+    PLACEHOLDER_MARKER,
+    STYLESHEET_DIRNAME,
+    THEME_NAME_PREFIX,
+    TIER_FULL,
+)
+from .contrast import CONTRAST_VARIABLES, audit_contrast, contrast_failures
+from .engine import (
+    SPLIT_MARKER,
+    compile_declarations,
+    compile_template,
+    compile_variables,
+    variable_value,
+)
+from .overrides import apply_overrides
+from .prune import prune_card_rules
+from .stylesheets import (
+    STYLESHEET_PLACEHOLDER,
+    compile_stylesheet_template,
+    stylesheet_filename,
+    write_stylesheets,
+)
+from .templates import THEME_VARIANTS
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+def generate_hex_palette(rgb_str):
+    """
+    Generate a tonal palette (HEX strings) based on a single RGB string.
+    """
+    try:
+        parts = [int(x) for x in rgb_str.split(",")]
+        r, g, b = parts[0], parts[1], parts[2]
+    except (ValueError, IndexError):
+        r, g, b = 106, 116, 211
+
+    h, l, s = colorsys.rgb_to_hls(r / 255.0, g / 255.0, b / 255.0)
+
+    lightness_levels = {
+        "05": 0.05, "10": 0.10, "20": 0.20, "30": 0.30, "40": 0.40,
+        "50": l, "60": 0.60, "70": 0.70, "80": 0.80, "90": 0.90, "95": 0.96,
+    }
+
+    palette = {}
+    for level, target_l in lightness_levels.items():
+        new_r, new_g, new_b = colorsys.hls_to_rgb(h, target_l, s)
+        new_r = max(0, min(255, int(new_r * 255)))
+        new_g = max(0, min(255, int(new_g * 255)))
+        new_b = max(0, min(255, int(new_b * 255)))
+        palette[level] = f"#{new_r:02X}{new_g:02X}{new_b:02X}"
+
+    return palette
+
+# Palettes only depend on the seed color, so repeated generations reuse them
+_cached_hex_palette = functools.lru_cache(maxsize=32)(generate_hex_palette)
+
+def palette_cache_info():
+    """Return hit/miss counters and the size of the palette cache."""
+    info = _cached_hex_palette.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+
+def resolve_options(options):
+    """Resolve the effective primary colors and backgrounds from options."""
+    if options.get(CONF_RESET, False):
+        return {
+            CONF_LIGHT_PRIMARY: DEFAULT_LIGHT_RGB,
+            CONF_LIGHT_BG: DEFAULT_LIGHT_BG_URL,
+            CONF_DARK_PRIMARY: DEFAULT_DARK_RGB,
+            CONF_DARK_BG: DEFAULT_DARK_BG_URL,
+        }
+
+    def get_rgb_string(conf_key, default_val):
+        val = options.get(conf_key, default_val)
+        if isinstance(val, list) or isinstance(val, tuple):
+            return f"{val[0]}, {val[1]}, {val[2]}"
+        return val 
+
+    return {
+        CONF_LIGHT_PRIMARY: get_rgb_string(CONF_LIGHT_PRIMARY, DEFAULT_LIGHT_RGB),
+        CONF_LIGHT_BG: options.get(CONF_LIGHT_BG, DEFAULT_LIGHT_BG_URL),
+        CONF_DARK_PRIMARY: get_rgb_string(CONF_DARK_PRIMARY, DEFAULT_DARK_RGB),
+        CONF_DARK_BG: options.get(CONF_DARK_BG, DEFAULT_DARK_BG_URL),
+    }
+
+def get_profile_name(entry: ConfigEntry):
+    """Return the profile name of a config entry."""
+    return entry.data.get(CONF_PROFILE_NAME, DEFAULT_PROFILE_NAME)
+
+def profile_outputs(profile_name, tiers=None, prune=None, overrides=None):
+    """
+    Return (template, filename, theme name) for every output of a profile, optionally only some tiers.
+
+    prune is a set of selector tokens whose card-mod rules are removed from the
+    templates; the changes of overrides (a ThemeOverrides) are applied after.
+    """
+    outputs = []
+    for tier, content_template, suffix in THEME_VARIANTS:
+        if tiers is not None and tier not in tiers:
+            continue
+        theme_name = f"{THEME_NAME_PREFIX} {profile_name}{suffix}"
+        if prune:
+            content_template = prune_card_rules(content_template, prune)
+        if overrides is not None:
+            content_template = apply_overrides(content_template, overrides.changes(profile_name, tier))
+        outputs.append((content_template, f"{theme_name}.yaml", theme_name))
+    return outputs
+
+def profile_variants(profile_name, options):
+    """
+    Return [(variant, variant profile name, options)] for a profile.
+
+    The day variant is the profile itself; with automatic switching enabled the
+    dusk and night variants follow with their own seed color and background.
+    """
+    variants = [(VARIANT_DAY, profile_name, options)]
+    if options.get(CONF_RESET, False) or options.get(CONF_AUTO_SWITCH, AUTO_SWITCH_OFF) == AUTO_SWITCH_OFF:
+        return variants
+
+    for variant, (suffix, primary_key, background_key, default_rgb) in TIME_VARIANTS.items():
+        primary = options.get(primary_key, default_rgb)
+        variant_options = {**options, CONF_LIGHT_PRIMARY: primary, CONF_DARK_PRIMARY: primary}
+        if options.get(background_key):
+            variant_options[CONF_LIGHT_BG] = variant_options[CONF_DARK_BG] = options[background_key]
+        variants.append((variant, f"{profile_name}{suffix}", variant_options))
+    return variants
+
+def render_theme(content_template, output_filename, resolved, light_palette, dark_palette, tuning=None, theme_name=None):
+    """Render a single theme template with the compiled engine. Returns the YAML text or None."""
+    compiled = compile_template(content_template)
+    if compiled is None:
+        _LOGGER.error(f"Frosted Glass Manager: CRITICAL ERROR - Split marker '{SPLIT_MARKER}' not found in {output_filename}.")
+        return None
+    return compiled.render(compiled.slot_values(resolved, light_palette, dark_palette, tuning, theme_name))
+
+def render_theme_stylesheets(content_template, output_filename, resolved, light_palette, dark_palette, tuning=None, theme_name=None):
+    """
+    Render a theme whose card-mod CSS is imported from stylesheets.
+
+    Returns (YAML text, {stylesheet filename: CSS}), or (None, None).
+    """
+    compiled = compile_stylesheet_template(content_template)
+    if compiled is None:
+        _LOGGER.error(f"Frosted Glass Manager: CRITICAL ERROR - Split marker '{SPLIT_MARKER}' not found in {output_filename}.")
+        return None, None
+    theme, blocks = compiled
+    content = theme.render(theme.slot_values(resolved, light_palette, dark_palette, tuning, theme_name))
+    sheets = {}
+    for index, block in enumerate(blocks):
+        css = block.render(block.slot_values(resolved, light_palette, dark_palette, tuning))
+        filename = stylesheet_filename(css)
+        sheets[filename] = css
+        content = content.replace(STYLESHEET_PLACEHOLDER.format(index), filename, 1)
+    return content, sheets
+
+def preview_theme(options, tier=TIER_FULL, tuning=None, backdrops=None, changes=()):
+    """
+    Return the palettes, the option-dependent CSS variables and the contrast audit of a theme tier.
+
+    Nothing is written: palettes come from the cache and the variables are
+    rendered from the compiled template, so a preview costs well under a
+    millisecond once the template is compiled. backdrops are the mean colors
+    of the background images per mode, see audit_contrast; changes are user
+    overrides, see ThemeOverrides.changes.
+    """
+    content_template = apply_overrides(next(template for name, template, _ in THEME_VARIANTS if name == tier), changes)
+    compiled = compile_template(content_template)
+    variables = compile_variables(content_template)
+    resolved = resolve_options(options)
+    light_palette = _cached_hex_palette(resolved[CONF_LIGHT_PRIMARY])
+    dark_palette = _cached_hex_palette(resolved[CONF_DARK_PRIMARY])
+
+    preview = {
+        "resolved": resolved,
+        "palettes": {"light": dict(light_palette), "dark": dict(dark_palette)},
+        "variables": {"light": {}, "dark": {}},
+        "contrast": [],
+    }
+    if compiled is None:
+        return preview
+    values = compiled.slot_values(resolved, light_palette, dark_palette, tuning)
+    for mode, mode_variables in variables.items():
+        preview["variables"][mode] = {f"--{name}": variable_value(line, values) for name, line in mode_variables}
+    preview["contrast"] = audit_contrast(compile_declarations(content_template, CONTRAST_VARIABLES), values, backdrops)
+    return preview
+
+def audit_theme(options, tier=TIER_FULL, tuning=None, backdrops=None, changes=()):
+    """Return the contrast audit of a theme tier (see audit_contrast) without rendering it."""
+    content_template = apply_overrides(next(template for name, template, _ in THEME_VARIANTS if name == tier), changes)
+    compiled = compile_template(content_template)
+    if compiled is None:
+        return []
+    resolved = resolve_options(options)
+    values = compiled.slot_values(
+        resolved, _cached_hex_palette(resolved[CONF_LIGHT_PRIMARY]), _cached_hex_palette(resolved[CONF_DARK_PRIMARY]), tuning
+    )
+    return audit_contrast(compile_declarations(content_template, CONTRAST_VARIABLES), values, backdrops)
+
+def render_theme_reference(content_template, output_filename, resolved, light_palette, dark_palette, tuning=None):
+    """
+    Render a single theme template with the original replace chain.
+
+    Kept as the reference implementation for benchmarks/diff_engines.py.
+    """
+    tuning = tuning or {}
+    content = content_template
+
+    split_marker = "    dark:"
+    if split_marker not in content:
+        _LOGGER.error(f"Frosted Glass Manager: CRITICAL ERROR - Split marker '{split_marker}' not found in {output_filename}.")
+        return None
+
+    parts = content.split(split_marker)
+    if len(parts) < 2:
+        _LOGGER.error(f"Frosted Glass Manager: Parsing failed for {output_filename}.")
+        return None
+
+    light_part = parts[0]
+    dark_part = split_marker + "".join(parts[1:])
+
+    # --- REPLACE LIGHT ---
+    light_part = light_part.replace(DEFAULT_LIGHT_RGB, resolved[CONF_LIGHT_PRIMARY])
+    light_part = light_part.replace(DEFAULT_LIGHT_BG_URL, resolved[CONF_LIGHT_BG])
+    if "light" in tuning:
+        for old_text, new_format in GLASS_TUNING_SLOTS["light"]:
+            light_part = light_part.replace(old_text, new_format.format(**tuning["light"]))
+    for level, old_hex in DEFAULT_PALETTE.items():
+        new_hex = light_palette.get(level, old_hex)
+        light_part = light_part.replace(old_hex, new_hex)
+
+    # --- REPLACE DARK ---
+    dark_part = dark_part.replace(DEFAULT_DARK_RGB, resolved[CONF_DARK_PRIMARY])
+    dark_part = dark_part.replace(DEFAULT_DARK_BG_URL, resolved[CONF_DARK_BG])
+    if "dark" in tuning:
+        for old_text, new_format in GLASS_TUNING_SLOTS["dark"]:
+            dark_part = dark_part.replace(old_text, new_format.format(**tuning["dark"]))
+    for level, old_hex in DEFAULT_PALETTE.items():
+        new_hex = dark_palette.get(level, old_hex)
+        dark_part = dark_part.replace(old_hex, new_hex)
+
+    return light_part + dark_part
+
+def write_theme_file(hass: HomeAssistant, output_filename, content):
+    """Write a rendered theme into the themes folder. Returns bytes written or None."""
+    return write_theme_to(hass.config.path("themes"), output_filename, content)
+
+def write_theme_to(themes_dir, output_filename, content):
+    """Write a rendered theme into a directory. Returns bytes written or None."""
+    try:
+        if not os.path.isdir(themes_dir):
+            os.makedirs(themes_dir, exist_ok=True)
+
+        file_path = os.path.join(themes_dir, output_filename)
+        data = content if isinstance(content, bytes) else content.encode("utf-8")
+
+        with open(file_path, "wb") as f:
+            f.write(data)
+
+        _LOGGER.info(f"Frosted Glass theme successfully generated at {file_path}")
+        return len(data)
+
+    except Exception as e:
+        _LOGGER.error(f"Frosted Glass Manager: Error writing theme file {output_filename}: {e}")
+        return None
+
+def file_hash(data, bytes_written):
+    """Return the sha1 of a theme file's bytes, or None when it was not written (as the history names them)."""
+    return hashlib.sha1(data).hexdigest() if bytes_written is not None else None
+
+def remove_theme_files(hass: HomeAssistant, output_filenames):
+    """Delete generated themes that are no longer wanted. Returns the number removed."""
+    removed = 0
+    for output_filename in output_filenames:
+        try:
+            os.remove(os.path.join(hass.config.path("themes"), output_filename))
+            removed += 1
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            _LOGGER.warning(f"Frosted Glass Manager: Could not remove theme file {output_filename}: {e}")
+    return removed
+
+def generate_output(hass: HomeAssistant, content_template, output_filename, theme_name, resolved, light_palette, dark_palette, tuning=None, stylesheets_dir=None):
+    """
+    Render and write one theme file. Safe to run concurrently for different files.
+
+    With stylesheets_dir, the card-mod CSS is written there as stylesheets and
+    imported by the theme. Returns the render and write durations (seconds),
+    the bytes written, the sha1 of the file and the size of each stylesheet.
+    """
+    start = time.perf_counter()
+    sheets = None
+    if stylesheets_dir is None:
+        content = render_theme(content_template, output_filename, resolved, light_palette, dark_palette, tuning, theme_name)
+    else:
+        content, sheets = render_theme_stylesheets(
+            content_template, output_filename, resolved, light_palette, dark_palette, tuning, theme_name
+        )
+    render_done = time.perf_counter()
+
+    bytes_written = None
+    digest = None
+    if content is not None and (sheets is None or write_stylesheets(stylesheets_dir, sheets)):
+        data = content.encode("utf-8")
+        bytes_written = write_theme_file(hass, output_filename, data)
+        digest = file_hash(data, bytes_written)
+
+    return {
+        "render": render_done - start,
+        "write": time.perf_counter() - render_done,
+        "bytes_written": bytes_written,
+        "sha1": digest,
+        "stylesheet_bytes": (
+            {filename: len(css.encode("utf-8")) for filename, css in sheets.items()} if bytes_written is not None and sheets else {}
+        ),
+    }
+
+def placeholder_theme(theme_name, resolved):
+    """A minimal stand-in for a theme that is rendered once it is used."""
+    return (
+        f"{PLACEHOLDER_MARKER}, rendered when first used\n"
+        f"{theme_name}:\n"
+        f"  primary-color: 'rgb({resolved[CONF_LIGHT_PRIMARY]})'\n"
+    )
+
+def generate_placeholder(hass: HomeAssistant, output_filename, theme_name, resolved):
+    """Write a placeholder theme unless the file already holds it. Returns the same shape as generate_output."""
+    start = time.perf_counter()
+    data = placeholder_theme(theme_name, resolved).encode("utf-8")
+    try:
+        with open(os.path.join(hass.config.path("themes"), output_filename), "rb") as f:
+            current = f.read(len(data) + 1)
+    except OSError:
+        current = None
+    bytes_written = len(data) if current == data else write_theme_file(hass, output_filename, data)
+    return {
+        "render": 0.0,
+        "write": time.perf_counter() - start,
+        "bytes_written": bytes_written,
+        "sha1": file_hash(data, bytes_written),
+    }
+
+def _profile_prune(options, own_prune, unused_cards):
+    """Return the selector tokens whose card rules a profile drops: its own, else unused_cards when pruning is on."""
+    if own_prune:
+        return own_prune[0]
+    return unused_cards if options.get(CONF_PRUNE_CARD_CSS, False) else None
+
+def _render_inline(*args):
+    """render_theme shaped like render_theme_stylesheets."""
+    return render_theme(*args), {}
+
+def profile_renders(profiles, unused_cards=None, overrides=None):
+    """
+    Return (key, template, filename, theme name, render) for every output of several profiles.
+
+    profiles, unused_cards and overrides are as for generate_profiles; render()
+    renders the output the same way (pruned, with external stylesheets, with
+    overrides) and returns (YAML text, {stylesheet filename: CSS}) without
+    writing anything. Placeholders are left out, they only stand in for this
+    render.
+    """
+    renders = []
+    for key, (profile_name, options, tuning, *own_prune) in profiles.items():
+        resolved = resolve_options(options)
+        light_palette = _cached_hex_palette(resolved[CONF_LIGHT_PRIMARY])
+        dark_palette = _cached_hex_palette(resolved[CONF_DARK_PRIMARY])
+        render = render_theme_stylesheets if options.get(CONF_EXTERNAL_CSS, False) else _render_inline
+        prune = _profile_prune(options, own_prune, unused_cards)
+        for content_template, output_filename, theme_name in profile_outputs(profile_name, prune=prune, overrides=overrides):
+            job = functools.partial(
+                render, content_template, output_filename, resolved, light_palette, dark_palette, tuning, theme_name
+            )
+            renders.append((key, content_template, output_filename, theme_name, job))
+    return renders
+
+def generate_profiles(hass: HomeAssistant, profiles, executor=None, unused_cards=None, placeholders=None, overrides=None):
+    """
+    Generate the theme files of several profiles in one pass.
+
+    profiles maps a key to (profile name, options, tuning), optionally with the
+    selector tokens of the card rules to prune as fourth item. Palettes are
+    resolved first, then every output file is rendered and written, on
+    executor when given. Rendering holds the GIL, so the executor only
+    overlaps the writes and the cost grows linearly with the number of
+    files; what profiles share is the compiled templates and palettes. Profiles with card CSS pruning enabled and
+    no own tokens drop the rules of unused_cards; profiles with external
+    stylesheets import their card-mod CSS. Themes named in placeholders
+    get a placeholder instead. The changes of overrides (a ThemeOverrides)
+    are applied to the themes they concern. Returns {key: result} shaped like
+    generate_theme_file.
+    """
+    palette_seconds = {}
+    jobs = []
+    for key, (profile_name, options, tuning, *own_prune) in profiles.items():
+        resolved = resolve_options(options)
+        prune = _profile_prune(options, own_prune, unused_cards)
+        stylesheets_dir = hass.config.path(".storage", STYLESHEET_DIRNAME) if options.get(CONF_EXTERNAL_CSS, False) else None
+
+        start = time.perf_counter()
+        light_palette = _cached_hex_palette(resolved[CONF_LIGHT_PRIMARY])
+        dark_palette = _cached_hex_palette(resolved[CONF_DARK_PRIMARY])
+        palette_seconds[key] = time.perf_counter() - start
+
+        for content_template, output_filename, theme_name in profile_outputs(profile_name, prune=prune, overrides=overrides):
+            if placeholders and theme_name in placeholders:
+                job = functools.partial(generate_placeholder, hass, output_filename, theme_name, resolved)
+            else:
+                job = functools.partial(
+                    generate_output, hass, content_template, output_filename, theme_name,
+                    resolved, light_palette, dark_palette, tuning, stylesheets_dir,
+                )
+            jobs.append((key, output_filename, job))
+
+    run = executor.map if executor is not None else map
+    outputs = {key: {} for key in profiles}
+    for (key, output_filename, _), result in zip(jobs, run(lambda job: job[-1](), jobs)):
+        outputs[key][output_filename] = result
+
+    return {key: merge_output_results(palette_seconds[key], outputs[key]) for key in profiles}
+
+def generate_theme_file(hass: HomeAssistant, entry: ConfigEntry, tuning=None):
+    """
+    Generate both theme YAML files of a profile based on options.
+
+    Returns the duration of each stage (seconds) and the bytes written per file.
+    """
+    profiles = {entry.entry_id: (get_profile_name(entry), entry.options, tuning)}
+    return generate_profiles(hass, profiles)[entry.entry_id]
+
+def audit_profile(profile_name, options, tuning=None, backdrops=None, overrides=None):
+    """Return the contrast pairs of every tier of a profile below their minimum, each with its theme name, lowest first."""
+    failures = []
+    for (tier, _, _), (_, _, theme_name) in zip(THEME_VARIANTS, profile_outputs(profile_name)):
+        changes = overrides.changes(profile_name, tier) if overrides is not None else ()
+        failures.extend(
+            {"theme": theme_name, **finding}
+            for finding in contrast_failures(audit_theme(options, tier, tuning, backdrops, changes))
+        )
+    return sorted(failures, key=lambda finding: finding["ratio"])
+
+def merge_variant_results(results):
+    """Combine the results of all variants of a profile, day variant first."""
+    if len(results) == 1:
+        return results[0]
+    merged = {
+        "palette": sum(result["palette"] for result in results),
+        "render": sum(result["render"] for result in results),
+        "write": sum(result["write"] for result in results),
+        "bytes_written": {
+            output_filename: written for result in results for output_filename, written in result["bytes_written"].items()
+        },
+        "hashes": {output_filename: digest for result in results for output_filename, digest in result["hashes"].items()},
+        "stylesheet_bytes": {filename: size for result in results for filename, size in result["stylesheet_bytes"].items()},
+        "success": all(result["success"] for result in results),
+    }
+    if any("changed" in result for result in results):
+        merged["changed"] = sorted(filename for result in results for filename in result.get("changed", []))
+    # Dashboard themes are not audited: they share the colors of the day variant
+    if any("contrast" in result for result in results):
+        merged["contrast"] = sorted(
+            (finding for result in results for finding in result.get("contrast", [])), key=lambda finding: finding["ratio"]
+        )
+    return merged
+
+def merge_output_results(palette_seconds, outputs):
+    """Combine per-file results into the result of a whole profile."""
+    bytes_written = {
+        output_filename: result["bytes_written"] for output_filename, result in outputs.items()
+    }
+    return {
+        "palette": palette_seconds,
+        "render": sum(result["render"] for result in outputs.values()),
+        "write": sum(result["write"] for result in outputs.values()),
+        "bytes_written": bytes_written,
+        "hashes": {output_filename: result["sha1"] for output_filename, result in outputs.items()},
+        "stylesheet_bytes": {
+            filename: size for result in outputs.values() for filename, size in result.get("stylesheet_bytes", {}).items()
+        },
+        "success": None not in bytes_written.values(),
+    }
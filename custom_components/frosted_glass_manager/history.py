@@ -0,0 +1,140 @@
+"""Generation history: the last written themes of each profile, ready to restore.
+
+Every version stores the options it was generated from and the SHA-1 of each
+theme file. The files themselves are kept once per hash as zlib-compressed
+blobs, so versions that share files (e.g. an unchanged Lite theme) share
+storage. Restoring a version decompresses its blobs back into the themes
+folder: no palette, no render.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+
+from .generator import write_theme_to
+
+_LOGGER = logging.getLogger(__name__)
+
+BLOB_SUFFIX = ".z"
+
+
+class ThemeHistory:
+    """A ring buffer of generated versions per profile, stored under a directory."""
+
+    def __init__(self, path, size):
+        """Initialize the history stored at path, keeping size versions per profile."""
+        self.path = path
+        self.size = size
+        # entry_id -> [{"id", "time", "options", "files": {filename: sha1}}], oldest first
+        self._versions = {}
+
+    def _index_path(self, entry_id):
+        return os.path.join(self.path, f"{entry_id}.json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.path, "blobs", f"{digest}{BLOB_SUFFIX}")
+
+    def versions(self, entry_id):
+        """Return the versions of a profile, newest first. Runs in the executor on first use."""
+        if entry_id not in self._versions:
+            try:
+                with open(self._index_path(entry_id), encoding="utf-8") as f:
+                    self._versions[entry_id] = json.load(f)["versions"]
+            except (OSError, ValueError, KeyError):
+                self._versions[entry_id] = []
+        return list(reversed(self._versions[entry_id]))
+
+    def get(self, entry_id, version_id):
+        """Return one version of a profile, or None."""
+        return next((version for version in self.versions(entry_id) if version["id"] == version_id), None)
+
+    def record(self, entry_id, options, themes_dir, filenames):
+        """
+        Store the current theme files of a profile as a new version. Runs in the executor.
+
+        Returns the new version, or None if the files match the latest version.
+        """
+        versions = self.versions(entry_id)
+        files = {}
+        for filename in sorted(filenames):
+            try:
+                with open(os.path.join(themes_dir, filename), "rb") as f:
+                    data = f.read()
+            except OSError as err:
+                _LOGGER.warning(f"Frosted Glass Manager: Not kept in history, {filename} unreadable: {err}")
+                return None
+            digest = hashlib.sha1(data).hexdigest()
+            files[filename] = digest
+            blob_path = self._blob_path(digest)
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                with open(f"{blob_path}.tmp", "wb") as f:
+                    f.write(zlib.compress(data, 6))
+                os.replace(f"{blob_path}.tmp", blob_path)
+
+        if versions and versions[0]["files"] == files:
+            return None
+        version = {
+            "id": versions[0]["id"] + 1 if versions else 1,
+            "time": time.time(),
+            "options": dict(options),
+            "files": files,
+        }
+        self._versions[entry_id].append(version)
+        del self._versions[entry_id][:-self.size]
+        self._save(entry_id)
+        self._collect_blobs()
+        return version
+
+    def restore(self, entry_id, version_id, themes_dir):
+        """
+        Write the theme files of a version back. Runs in the executor.
+
+        Returns the version, or None if it is unknown or a file could not be restored.
+        """
+        version = self.get(entry_id, version_id)
+        if version is None:
+            return None
+        for filename, digest in version["files"].items():
+            try:
+                with open(self._blob_path(digest), "rb") as f:
+                    data = zlib.decompress(f.read())
+            except (OSError, zlib.error) as err:
+                _LOGGER.error(f"Frosted Glass Manager: Version {version_id} of {filename} is damaged: {err}")
+                return None
+            if write_theme_to(themes_dir, filename, data) is None:
+                return None
+        return version
+
+    def remove(self, entry_id):
+        """Forget the history of a removed profile. Runs in the executor."""
+        self._versions[entry_id] = []
+        try:
+            os.remove(self._index_path(entry_id))
+        except OSError:
+            pass
+        self._collect_blobs()
+
+    def _save(self, entry_id):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{self._index_path(entry_id)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"versions": self._versions[entry_id]}, f)
+        os.replace(tmp_path, self._index_path(entry_id))
+
+    def _collect_blobs(self):
+        """Delete blobs no version refers to anymore."""
+        if not os.path.isdir(self.path):
+            return
+        referenced = set()
+        for name in os.listdir(self.path):
+            if name.endswith(".json"):
+                referenced.update(
+                    digest for version in self.versions(name[:-5]) for digest in version["files"].values()
+                )
+        blobs = os.path.join(self.path, "blobs")
+        for name in os.listdir(blobs) if os.path.isdir(blobs) else ():
+            if name.endswith(BLOB_SUFFIX) and name[:-len(BLOB_SUFFIX)] not in referenced:
+                os.remove(os.path.join(blobs, name))
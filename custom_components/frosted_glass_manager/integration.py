@@ -0,0 +1,154 @@
+"""Home Assistant setup of the Frosted Glass Theme Manager."""
+import logging
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+
+from .const import (
+    DOMAIN,
+    SERVICE_PROFILE_GENERATION,
+    ATTR_ITERATIONS,
+    ATTR_TRACE_MEMORY,
+    ATTR_TOP,
+    SERVICE_ROLLBACK,
+    ATTR_ENTRY_ID,
+    ATTR_VERSION,
+    STYLESHEET_DIRNAME,
+)
+from .manager import ThemeManager
+from .profiling import profile_generation
+from .views import StylesheetView, TelemetryModuleView
+from .websocket import async_register_websocket_commands
+
+_LOGGER = logging.getLogger(__name__)
+
+PLATFORMS = [Platform.SENSOR]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+PROFILE_GENERATION_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_ITERATIONS, default=20): vol.All(vol.Coerce(int), vol.Range(min=1, max=1000)),
+        vol.Optional(ATTR_TRACE_MEMORY, default=False): cv.boolean,
+        vol.Optional(ATTR_TOP, default=15): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+    }
+)
+
+ROLLBACK_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_VERSION): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
+
+async def async_setup(hass: HomeAssistant, config) -> bool:
+    """Create the shared theme manager and register the services."""
+    manager = ThemeManager(hass)
+    await manager.async_setup()
+    hass.data[DOMAIN] = manager
+
+    def _call_entry(call: ServiceCall):
+        """Return the loaded profile a service call is for; entry_id may be left out when there is only one."""
+        entry_id = call.data.get(ATTR_ENTRY_ID)
+        if entry_id is None:
+            if not manager.entries:
+                raise HomeAssistantError("Frosted Glass Manager is not set up.")
+            if len(manager.entries) > 1:
+                raise HomeAssistantError("Frosted Glass Manager: several profiles are loaded, pick one with entry_id.")
+            entry_id = next(iter(manager.entries))
+        if entry_id not in manager.entries:
+            raise HomeAssistantError("Frosted Glass Manager: profile not loaded.")
+        return manager.entries[entry_id]
+
+    async def async_profile_generation(call: ServiceCall):
+        """Profile rendering the themes of a profile on this instance, without writing them."""
+        entry = _call_entry(call)
+        # On the manager's worker, so it does not run alongside a pass
+        return await manager.async_run_job(
+            profile_generation,
+            hass.config.path(),
+            manager.rendered_profiles(entry),
+            manager.unused_cards,
+            manager.theme_overrides,
+            call.data[ATTR_ITERATIONS],
+            call.data[ATTR_TRACE_MEMORY],
+            call.data[ATTR_TOP],
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE_GENERATION,
+        async_profile_generation,
+        schema=PROFILE_GENERATION_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def async_rollback(call: ServiceCall):
+        """Restore an earlier generated version of a profile without rendering."""
+        entry_id = _call_entry(call).entry_id
+        version = await manager.async_restore(entry_id, call.data.get(ATTR_VERSION))
+        if version is None:
+            raise HomeAssistantError("Frosted Glass Manager: no such version in the history.")
+        versions = await manager.async_run_job(manager.history.versions, entry_id)
+        return {
+            "restored": version["id"],
+            "options": version["options"],
+            "versions": [{"id": item["id"], "time": item["time"]} for item in versions],
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_ROLLBACK,
+        async_rollback,
+        schema=ROLLBACK_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    async_register_websocket_commands(hass)
+    hass.http.register_view(StylesheetView(hass.config.path(".storage", STYLESHEET_DIRNAME)))
+    hass.http.register_view(TelemetryModuleView())
+    return True
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up a Frosted Glass profile from a config entry."""
+    manager = hass.data[DOMAIN]
+    manager.async_add_profile(entry)
+
+    entry.async_on_unload(entry.add_update_listener(update_listener))
+    await manager.async_generate_on_setup(entry)
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    manager.async_schedule_background_analysis([entry.entry_id])
+    manager.async_update_switcher(entry)
+    manager.async_update_follower(entry)
+    manager.async_update_telemetry()
+    return True
+
+async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
+    """Handle options update."""
+    manager = hass.data[DOMAIN]
+    manager.async_update_follower(entry)
+    # A restored version is already written and reloaded
+    if not manager.async_take_restored(entry):
+        await manager.async_generate([entry.entry_id], reload=True)
+        manager.async_schedule_background_analysis([entry.entry_id])
+    manager.async_update_switcher(entry)
+    manager.async_update_telemetry()
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Unload a config entry."""
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        hass.data[DOMAIN].async_remove_profile(entry.entry_id)
+    return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Drop the history and output record of a deleted profile."""
+    manager = hass.data.get(DOMAIN)
+    if manager is not None:
+        await manager.async_run_job(manager.history.remove, entry.entry_id)
+        await manager.async_run_job(manager.outputs.discard, entry.entry_id)
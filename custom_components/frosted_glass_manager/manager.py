@@ -0,0 +1,919 @@
+"""Shared state and the render pass for all Frosted Glass profiles."""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from homeassistant.components.frontend import add_extra_js_url, remove_extra_js_url
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_CALL_SERVICE, EVENT_HOMEASSISTANT_STARTED, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+from .const import (
+    DOMAIN,
+    CONF_LIGHT_BG,
+    CONF_DARK_BG,
+    CONF_AUTO_TUNE,
+    CONF_AUTO_SWITCH,
+    CONF_AUTO_TIER,
+    CONF_DASHBOARD_THEMES,
+    CONF_ON_DEMAND,
+    CONF_FOLLOW_ENTITY,
+    CONF_FRAME_TELEMETRY,
+    CONF_LIGHT_PRIMARY,
+    CONF_DARK_PRIMARY,
+    CONF_PRUNE_CARD_CSS,
+    CONF_RESET,
+    CONF_TARGET_FPS,
+    CONF_WAIT_FOR_THEMES,
+    AUTO_SWITCH_OFF,
+    DATA_DEFAULT_THEME,
+    DATA_DEFAULT_DARK_THEME,
+    DEFAULT_TARGET_FPS,
+    HISTORY_DIRNAME,
+    HISTORY_SIZE,
+    EVENT_LOVELACE_UPDATED,
+    EVENT_THEME_APPLIED,
+    EVENT_THEMES_UPDATED,
+    OUTPUT_MANIFEST_FILENAME,
+    OVERRIDES_DEBOUNCE,
+    OVERRIDES_FILENAME,
+    PASS_WORKERS,
+    RENDER_WORKERS,
+    STYLESHEET_DIRNAME,
+    SIGNAL_DEVICE_ADDED,
+    SIGNAL_DEVICE_UPDATED,
+    SIGNAL_STATS_UPDATED,
+    TELEMETRY_URL,
+    TIER_FULL,
+    USAGE_SCAN_INTERVAL,
+)
+from .background import BackgroundAnalyzer
+from .dashboards import DashboardIndex, dashboard_profile_name
+from .follower import ColorFollower
+from .history import ThemeHistory
+from .model import set_template_cache_size
+from .outputs import OutputManifest, outputs_key
+from .overrides import ThemeOverrides
+from .generator import (
+    audit_profile,
+    generate_profiles,
+    get_profile_name,
+    merge_variant_results,
+    palette_cache_info,
+    profile_outputs,
+    profile_variants,
+    remove_theme_files,
+    resolve_options,
+)
+from .prune import set_prune_cache_size, unused_card_tokens
+from .stats import GenerationStats
+from .stylesheets import missing_stylesheets, remove_unused_stylesheets
+from .switcher import VariantSwitcher
+from .telemetry import FrameTelemetry, module_version
+from .templates import THEME_VARIANTS
+from .usage import themes_in_use
+from .watcher import FileWatcher
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ThemeManager:
+    """
+    Renders every loaded profile (config entry).
+
+    Generation requests that arrive together are coalesced into one pass: all
+    their output files are rendered and written on a shared thread pool (the
+    writes overlap; rendering holds the GIL, so a pass grows linearly with the
+    number of files), and the frontend is asked to reload themes once at the
+    end. Passes and file
+    scans run on the manager's own worker thread, never on Home Assistant's
+    shared executor. Each pass is traced from the first request to the
+    reloaded themes reaching the frontend, and every profile it wrote is
+    announced with a theme_applied event.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the manager."""
+        self.hass = hass
+        self.analyzer = BackgroundAnalyzer(hass)
+        # entry_id -> ConfigEntry / GenerationStats of the loaded profiles
+        self.entries = {}
+        self.stats = {}
+        # entry_id -> VariantSwitcher of profiles with automatic switching
+        self.switchers = {}
+        # entry_id -> ColorFollower / followed "r, g, b" of profiles following an entity
+        self.followers = {}
+        self.overrides = {}
+        # Selector tokens of custom cards found missing in the last pass that prunes card CSS
+        self.unused_cards = None
+        # Storage-mode dashboards and, per profile, the dashboards with a theme of their own
+        self.dashboards = DashboardIndex(hass.config.path())
+        self.dashboard_themes = {}
+        # On-demand rendering: themes found in use, placeholder theme name -> entry_id,
+        # and placeholders selected through frontend.set_theme
+        self.themes_in_use = None
+        self.placeholders = {}
+        self._requested = set()
+        self._unsub_usage = None
+        # Generated versions per profile, and options just restored from it (entry_id -> options)
+        self.history = ThemeHistory(hass.config.path(".storage", HISTORY_DIRNAME), HISTORY_SIZE)
+        self._restored = {}
+        # Themes on disk known to be current, and how each profile was handled at setup
+        self.outputs = OutputManifest(hass.config.path(".storage", OUTPUT_MANIFEST_FILENAME))
+        self.startup = {}
+        self._deferred = set()
+        # User overrides merged into the themes, reloaded when inotify reports a change
+        self.theme_overrides = ThemeOverrides(hass.config.path("themes", OVERRIDES_FILENAME))
+        self.overrides_watcher = None
+        self._unsub_overrides = None
+        # Apply tracing: sha1 of the files last written per profile (entry_id -> {filename: sha1}),
+        # when each pending profile was first requested, and when the frontend last reloaded themes
+        self.file_hashes = {}
+        self._requested_at = {}
+        self._themes_updated = None
+        # Frame timings per browser, and the URL the telemetry module is loaded from while enabled
+        self.telemetry = FrameTelemetry(hass)
+        self._telemetry_version = None
+        self._telemetry_url = None
+        self.passes = 0
+        self._worker = None
+        self._executor = None
+        self._pending = {}
+        self._reload = False
+        self._waiters = []
+        self._pass_task = None
+
+    async def async_setup(self):
+        """Load the background cache, overrides and browsers and release resources on shutdown."""
+        await self.analyzer.async_load()
+        await self.telemetry.async_load()
+        self._telemetry_version = await self.async_run_job(module_version)
+        await self.async_run_job(self._load_overrides)
+        self.overrides_watcher = FileWatcher(
+            self.hass.loop, os.path.dirname(self.theme_overrides.path), {OVERRIDES_FILENAME}, self._async_overrides_touched
+        )
+        if not self.overrides_watcher.start():
+            _LOGGER.info(f"Frosted Glass Manager: Changes to {OVERRIDES_FILENAME} are picked up after a restart")
+        self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_shutdown)
+        self.hass.bus.async_listen(EVENT_LOVELACE_UPDATED, self._async_lovelace_updated)
+        self.hass.bus.async_listen(EVENT_CALL_SERVICE, self._async_service_called)
+        self.hass.bus.async_listen(EVENT_THEMES_UPDATED, self._async_themes_updated)
+        self._unsub_usage = async_track_time_interval(
+            self.hass, self._async_rescan_usage, timedelta(seconds=USAGE_SCAN_INTERVAL)
+        )
+        if not self.hass.is_running:
+            self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, self._async_started)
+
+    async def async_run_job(self, target, *args):
+        """Run target on the manager's worker thread and return its result."""
+        if self._worker is None:
+            self._worker = ThreadPoolExecutor(max_workers=PASS_WORKERS, thread_name_prefix=f"{DOMAIN}_worker")
+        return await self.hass.loop.run_in_executor(self._worker, target, *args)
+
+    async def _async_started(self, event=None):
+        """Run the passes put off during startup."""
+        deferred = [entry_id for entry_id in self._deferred if entry_id in self.entries]
+        self._deferred = set()
+        if deferred:
+            await self.async_generate(deferred, reload=True)
+
+    @callback
+    def _async_shutdown(self, event=None):
+        if self._unsub_usage is not None:
+            self._unsub_usage()
+            self._unsub_usage = None
+        if self._unsub_overrides is not None:
+            self._unsub_overrides()
+            self._unsub_overrides = None
+        if self.overrides_watcher is not None:
+            self.overrides_watcher.stop()
+        for executor in (self._executor, self._worker):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._executor = None
+        self._worker = None
+
+    @callback
+    def async_add_profile(self, entry: ConfigEntry):
+        """Start tracking a loaded profile."""
+        self.entries[entry.entry_id] = entry
+        self.stats[entry.entry_id] = GenerationStats()
+
+    @callback
+    def async_remove_profile(self, entry_id):
+        """Stop tracking an unloaded profile."""
+        self.entries.pop(entry_id, None)
+        self.stats.pop(entry_id, None)
+        self.startup.pop(entry_id, None)
+        self._deferred.discard(entry_id)
+        self._pending.pop(entry_id, None)
+        self._requested_at.pop(entry_id, None)
+        self.file_hashes.pop(entry_id, None)
+        switcher = self.switchers.pop(entry_id, None)
+        if switcher is not None:
+            switcher.async_stop()
+        follower = self.followers.pop(entry_id, None)
+        if follower is not None:
+            follower.async_stop()
+        self.overrides.pop(entry_id, None)
+        self.dashboard_themes.pop(entry_id, None)
+        self.placeholders = {name: owner for name, owner in self.placeholders.items() if owner != entry_id}
+        self.async_update_telemetry()
+
+    @callback
+    def async_update_switcher(self, entry: ConfigEntry):
+        """(Re)start the time-of-day switching of a profile after its options changed."""
+        old = self.switchers.pop(entry.entry_id, None)
+        if old is not None:
+            old.async_stop()
+        if entry.options.get(CONF_RESET, False) or entry.options.get(CONF_AUTO_SWITCH, AUTO_SWITCH_OFF) == AUTO_SWITCH_OFF:
+            return
+        switcher = VariantSwitcher(self.hass, entry)
+        if old is not None:
+            # Re-rendered themes are reloaded anyway, only switch if the variant changes
+            switcher.active = old.active
+        switcher.async_start()
+        self.switchers[entry.entry_id] = switcher
+
+    @callback
+    def async_update_follower(self, entry: ConfigEntry):
+        """(Re)start following an entity's color after the options changed."""
+        entity_id = None if entry.options.get(CONF_RESET, False) else entry.options.get(CONF_FOLLOW_ENTITY)
+        old = self.followers.get(entry.entry_id)
+        if old is not None and old.entity_id == entity_id:
+            return
+        if old is not None:
+            old.async_stop()
+            del self.followers[entry.entry_id]
+        self.overrides.pop(entry.entry_id, None)
+        if entity_id:
+            follower = ColorFollower(self.hass, self, entry)
+            self.followers[entry.entry_id] = follower
+            follower.async_start()
+
+    async def async_set_color_override(self, entry_id, color):
+        """Use color ("r, g, b") as the primary color of a profile until the options change."""
+        if entry_id not in self.entries:
+            return
+        self.overrides[entry_id] = color
+        await self.async_generate([entry_id], reload=True)
+
+    def profile_options(self, entry: ConfigEntry):
+        """Return the options of a profile with the followed color applied."""
+        color = self.overrides.get(entry.entry_id)
+        if color is None:
+            return entry.options
+        return {**entry.options, CONF_LIGHT_PRIMARY: color, CONF_DARK_PRIMARY: color}
+
+    def get_glass_tuning(self, entry: ConfigEntry, options=None):
+        """Return the glass tuning per mode from cached background analysis."""
+        if not (options if options is not None else entry.options).get(CONF_AUTO_TUNE, False):
+            return None
+        resolved = resolve_options(options if options is not None else entry.options)
+        return self.analyzer.get_tuning(resolved[CONF_LIGHT_BG], resolved[CONF_DARK_BG])
+
+    def _variant_tunings(self, entry: ConfigEntry):
+        return [
+            self.get_glass_tuning(entry, options)
+            for _, _, options in profile_variants(get_profile_name(entry), entry.options)
+        ]
+
+    def _profile_overrides(self, entry: ConfigEntry, dashboards=False, options=None):
+        """Return {theme profile name: {tier: changes}} of the user overrides of a profile's variants (and dashboard themes)."""
+        options = entry.options if options is None else options
+        names = [variant_name for _, variant_name, _ in profile_variants(get_profile_name(entry), options)]
+        if dashboards:
+            names.extend(
+                dashboard_profile_name(get_profile_name(entry), url_path)
+                for url_path in self.dashboard_themes.get(entry.entry_id, ())
+            )
+        found = {}
+        for name in names:
+            changes = self.theme_overrides.profile_changes(name)
+            if changes:
+                found[name] = changes
+        return found
+
+    def _variant_profiles(self, entry: ConfigEntry, options=None):
+        """Return {variant: (profile name, options, tuning)} of the themes a profile renders, optionally from other options."""
+        options = self.profile_options(entry) if options is None else options
+        return {
+            variant: (variant_name, variant_options, self.get_glass_tuning(entry, variant_options))
+            for variant, variant_name, variant_options in profile_variants(get_profile_name(entry), options)
+        }
+
+    def rendered_profiles(self, entry: ConfigEntry):
+        """Return the profiles (see generate_profiles) of every theme an entry renders: its variants and dashboard themes."""
+        profiles = {
+            (entry.entry_id, variant): profile for variant, profile in self._variant_profiles(entry).items()
+        }
+        if entry.options.get(CONF_DASHBOARD_THEMES, False):
+            options = self.profile_options(entry)
+            tuning = self.get_glass_tuning(entry, options)
+            for url_path in sorted(self.dashboard_themes.get(entry.entry_id, ())):
+                if url_path in self.dashboards.tokens:
+                    profiles[(entry.entry_id, f"dashboard/{url_path}")] = (
+                        dashboard_profile_name(get_profile_name(entry), url_path),
+                        options,
+                        tuning,
+                        self.dashboards.tokens[url_path],
+                    )
+        return profiles
+
+    # ==========================================================================
+    # STARTUP
+    # ==========================================================================
+    async def async_generate_on_setup(self, entry: ConfigEntry):
+        """
+        Generate a profile that is being set up, unless its themes on disk are valid.
+
+        While Home Assistant starts, the pass is put off until it has started;
+        setup only waits for it when the profile has no valid themes and waits
+        for them. Returns how the profile was handled.
+        """
+        key = outputs_key(list(self._variant_profiles(entry).values()), self._profile_overrides(entry))
+        valid = await self.async_run_job(self.outputs.is_valid, entry.entry_id, key, self.hass.config.path("themes"))
+        # Installed cards, dashboards and themes in use may have changed while Home Assistant was down
+        scans = any(entry.options.get(option, False) for option in (CONF_PRUNE_CARD_CSS, CONF_DASHBOARD_THEMES, CONF_ON_DEMAND))
+        if valid and not scans:
+            handled = "valid"
+        elif self.hass.is_running or (not valid and entry.options.get(CONF_WAIT_FOR_THEMES, False)):
+            handled = "rendered"
+            await self.async_generate([entry.entry_id])
+        else:
+            handled = "deferred"
+            self._deferred.add(entry.entry_id)
+        self.startup[entry.entry_id] = handled
+        return handled
+
+    # ==========================================================================
+    # RENDER PASS
+    # ==========================================================================
+    async def async_generate(self, entry_ids, reload=False, dashboards_only=False):
+        """
+        Generate the themes of the given profiles and wait for the pass.
+
+        With dashboards_only, only dashboard themes whose dashboard changed are
+        rendered. Returns {entry_id: result} of the pass that rendered them.
+        """
+        future = self.hass.loop.create_future()
+        now = time.perf_counter()
+        for entry_id in entry_ids:
+            # entry_id -> whether the whole profile is rendered
+            self._pending[entry_id] = self._pending.get(entry_id, False) or not dashboards_only
+            self._requested_at.setdefault(entry_id, now)
+        self._reload = self._reload or reload
+        self._waiters.append(future)
+        if self._pass_task is None:
+            self._pass_task = self.hass.async_create_task(self._async_run_passes())
+        return await future
+
+    async def _async_run_passes(self):
+        """Run passes until no profile is pending."""
+        try:
+            # Let callers scheduled in the same loop iteration join this pass
+            await asyncio.sleep(0)
+            while self._pending:
+                pending, self._pending = self._pending, {}
+                requested, self._requested_at = self._requested_at, {}
+                reload, self._reload = self._reload, False
+                waiters, self._waiters = self._waiters, []
+                try:
+                    start = time.perf_counter()
+                    results = await self._async_render(pending)
+                    spans = {"pass": time.perf_counter() - start}
+                    if reload and results:
+                        spans.update(await self.async_reload_themes(list(results)))
+                except Exception as err:  # pylint: disable=broad-except
+                    for waiter in waiters:
+                        waiter.set_exception(err)
+                    continue
+                end = time.perf_counter()
+                for entry_id, result in results.items():
+                    queued = start - requested.get(entry_id, start)
+                    durations = {
+                        "queue": queued,
+                        # Summed over the files, whose writes overlap on the pool within the pass
+                        "palette": result["palette"],
+                        "render": result["render"],
+                        "write": result["write"],
+                        **spans,
+                        "total": end - start + queued,
+                    }
+                    self._async_applied(entry_id, durations, result["changed"], result["hashes"])
+                for waiter in waiters:
+                    waiter.set_result(results)
+        finally:
+            self._pass_task = None
+
+    async def _async_render(self, pending):
+        """
+        Render and write the outputs of the pending profiles, then record statistics.
+
+        pending maps entry_id to True for the whole profile or False for its
+        changed dashboard themes only. Dashboard themes of every profile that has
+        them are brought up to date in the same pass.
+        """
+        profiles = {}
+        keys = {}
+        backdrops = {}
+        dashboard_profiles = {}
+        names = {entry_id: get_profile_name(entry) for entry_id, entry in self.entries.items()}
+        for entry_id, full in pending.items():
+            entry = self.entries.get(entry_id)
+            if entry is None or not full:
+                continue
+            variants = self._variant_profiles(entry)
+            keys[entry_id] = outputs_key(list(variants.values()), self._profile_overrides(entry))
+            for variant, profile in variants.items():
+                profiles[(entry_id, variant)] = profile
+                resolved = resolve_options(profile[1])
+                backdrops[(entry_id, variant)] = self.analyzer.get_backdrops(resolved[CONF_LIGHT_BG], resolved[CONF_DARK_BG])
+        for entry_id, entry in self.entries.items():
+            if entry.options.get(CONF_DASHBOARD_THEMES, False):
+                # Dashboard themes are specializations of the day variant
+                options = self.profile_options(entry)
+                dashboard_profiles[entry_id] = (options, self.get_glass_tuning(entry, options), pending.get(entry_id, False))
+        if not profiles and not dashboard_profiles and not self.dashboard_themes:
+            return {}
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix=DOMAIN)
+        # Profiles rendered from their own options are kept in the history
+        record = {
+            entry_id: dict(self.entries[entry_id].options)
+            for entry_id, full in pending.items()
+            if full and entry_id in self.entries and entry_id not in self.overrides
+        }
+        start = time.perf_counter()
+        variant_results = await self.async_run_job(
+            self._generate, profiles, dashboard_profiles, names, self._eager_themes(), record, keys, backdrops
+        )
+        wall = time.perf_counter() - start
+        self.passes += 1
+
+        grouped = {}
+        for (entry_id, _), result in variant_results.items():
+            grouped.setdefault(entry_id, []).append(result)
+        results = {entry_id: merge_variant_results(group) for entry_id, group in grouped.items()}
+        for entry_id, result in results.items():
+            if not pending.get(entry_id, False) and entry_id in self.stats:
+                # Only some dashboard themes were written, keep the sizes of the others
+                result["bytes_written"] = {**self.stats[entry_id].bytes_written, **result["bytes_written"]}
+                result["stylesheet_bytes"] = {**self.stats[entry_id].stylesheet_bytes, **result["stylesheet_bytes"]}
+
+        cache = {
+            "palette": palette_cache_info(),
+            "background": self.analyzer.cache_info(),
+        }
+        for entry_id, result in results.items():
+            stats = self.stats.get(entry_id)
+            if stats is None:
+                continue
+            stats.record(result, cache, wall)
+            if not result["success"]:
+                _LOGGER.warning(f"Frosted Glass Manager: Some themes of profile {names[entry_id]} were not written.")
+            async_dispatcher_send(self.hass, f"{SIGNAL_STATS_UPDATED}_{entry_id}")
+        return results
+
+    def _generate(self, profiles, dashboard_profiles, names, eager, record, keys, backdrops):
+        """Look up installed cards and dashboards as needed, then generate. Runs on the worker."""
+        if any(options.get(CONF_PRUNE_CARD_CSS, False) for _, options, *_ in profiles.values()):
+            # Cheap (one small file and two folder listings), so cards installed since are picked up
+            self.unused_cards = unused_card_tokens(self.hass.config.path())
+
+        changed = set()
+        if dashboard_profiles:
+            changed, _ = self.dashboards.scan()
+        # Every tier pruned with the unused cards and with the tokens of each dashboard,
+        # and compiled with the overrides of each profile
+        set_prune_cache_size((len(self.dashboards.tokens) + 1) * len(THEME_VARIANTS))
+        set_template_cache_size((len(self.dashboards.tokens) + 1) * len(THEME_VARIANTS) * len(self.entries))
+        dashboard_themes = {}
+        stale = []
+        for entry_id, (options, tuning, full) in dashboard_profiles.items():
+            rendered = self.dashboard_themes.get(entry_id, set())
+            for url_path, tokens in self.dashboards.tokens.items():
+                if full or url_path in changed or url_path not in rendered:
+                    profiles[(entry_id, f"dashboard/{url_path}")] = (
+                        dashboard_profile_name(names[entry_id], url_path), options, tuning, tokens
+                    )
+            dashboard_themes[entry_id] = set(self.dashboards.tokens)
+        # Themes of deleted dashboards and of profiles that turned dashboard themes off
+        for entry_id, rendered in self.dashboard_themes.items():
+            if entry_id in names:
+                for url_path in rendered - dashboard_themes.get(entry_id, set()):
+                    stale.extend(
+                        output_filename
+                        for _, output_filename, _ in profile_outputs(dashboard_profile_name(names[entry_id], url_path))
+                    )
+        self.dashboard_themes = dashboard_themes
+        if stale:
+            remove_theme_files(self.hass, stale)
+
+        if not profiles:
+            return {}
+
+        placeholders = {}
+        on_demand = [key for key, (_, options, *_) in profiles.items() if options.get(CONF_ON_DEMAND, False)]
+        if on_demand:
+            self.themes_in_use = themes_in_use(self.hass.config.path()) | eager | self._requested
+            for key in on_demand:
+                for _, _, theme_name in profile_outputs(profiles[key][0]):
+                    if theme_name not in self.themes_in_use:
+                        placeholders[theme_name] = key[0]
+        # The themes of this pass replace their earlier placeholders
+        written = {theme_name for profile in profiles.values() for _, _, theme_name in profile_outputs(profile[0])}
+        self.placeholders = {
+            **{name: entry_id for name, entry_id in self.placeholders.items() if name not in written},
+            **placeholders,
+        }
+        results = generate_profiles(
+            self.hass, profiles, self._executor, self.unused_cards, set(placeholders), self.theme_overrides
+        )
+        for key, variant_backdrops in backdrops.items():
+            # Cheap next to the render (under a millisecond per tier), so every pass is audited
+            profile_name, options, tuning = profiles[key][:3]
+            results[key]["contrast"] = audit_profile(profile_name, options, tuning, variant_backdrops, self.theme_overrides)
+        for (entry_id, _), result in results.items():
+            result["changed"] = self._note_hashes(entry_id, result["hashes"])
+        self._record_outputs(results, keys)
+        self._record_history(results, record, placeholders)
+        remove_unused_stylesheets(self.hass.config.path(".storage", STYLESHEET_DIRNAME), self.hass.config.path("themes"))
+        return results
+
+    def _record_outputs(self, results, keys):
+        """Note the files of completely written profiles as valid. Runs on the worker."""
+        for entry_id, key in keys.items():
+            files = {}
+            hashes = {}
+            for (result_entry_id, variant), result in results.items():
+                if result_entry_id == entry_id and not variant.startswith("dashboard/"):
+                    files.update(result["bytes_written"])
+                    hashes.update(result["hashes"])
+            if files and None not in files.values():
+                self.outputs.record(entry_id, key, files, hashes)
+            else:
+                self.outputs.discard(entry_id)
+
+    def _note_hashes(self, entry_id, hashes):
+        """Remember the sha1 of files just written; returns those whose content changed, sorted. Runs on the worker."""
+        known = self.file_hashes.get(entry_id)
+        if known is None:
+            # Themes left valid from before a restart are not reported as changed
+            known = self.file_hashes[entry_id] = dict(self.outputs.hashes(entry_id))
+        changed = sorted(
+            filename for filename, digest in hashes.items() if digest is not None and known.get(filename) != digest
+        )
+        known.update((filename, digest) for filename, digest in hashes.items() if digest is not None)
+        return changed
+
+    def _record_history(self, results, record, placeholders):
+        """
+        Keep the files of profiles whose options changed since their latest version. Runs on the worker.
+
+        Only the rendered themes of the variants are kept: dashboard themes
+        follow the dashboards, and placeholders are rendered when used.
+        """
+        placeholder_files = {f"{theme_name}.yaml" for theme_name in placeholders}
+        for entry_id, options in record.items():
+            latest = self.history.versions(entry_id)[:1]
+            if latest and latest[0]["options"] == options:
+                continue
+            filenames = [
+                output_filename
+                for (result_entry_id, variant), result in results.items()
+                if result_entry_id == entry_id and not variant.startswith("dashboard/")
+                for output_filename, written in result["bytes_written"].items()
+                if written is not None and output_filename not in placeholder_files
+            ]
+            if not filenames:
+                continue
+            try:
+                self.history.record(entry_id, options, self.hass.config.path("themes"), filenames)
+            except OSError as err:
+                _LOGGER.warning(f"Frosted Glass Manager: Could not update the history: {err}")
+
+    def _eager_themes(self):
+        """Themes that are always rendered: the default themes and the variants switched to automatically."""
+        themes = {self.hass.data.get(DATA_DEFAULT_THEME), self.hass.data.get(DATA_DEFAULT_DARK_THEME)}
+        for entry in self.entries.values():
+            if entry.options.get(CONF_AUTO_SWITCH, AUTO_SWITCH_OFF) != AUTO_SWITCH_OFF:
+                for _, variant_name, _ in profile_variants(get_profile_name(entry), entry.options):
+                    themes.add(profile_outputs(variant_name, [TIER_FULL])[0][2])
+        themes.discard(None)
+        return themes
+
+    @callback
+    def _async_use_themes(self, theme_names):
+        """Render the placeholder themes among theme_names, which were just found in use."""
+        theme_names = {name for name in theme_names if name in self.placeholders}
+        if not theme_names:
+            return
+        self._requested |= theme_names
+        entry_ids = {self.placeholders[name] for name in theme_names}
+        _LOGGER.debug(f"Frosted Glass Manager: Rendering themes now in use: {', '.join(sorted(theme_names))}")
+        self.hass.async_create_task(self.async_generate(list(entry_ids), reload=True))
+
+    @callback
+    def _async_service_called(self, event):
+        """Render a placeholder theme as soon as frontend.set_theme selects it."""
+        if event.data.get("domain") != "frontend" or event.data.get("service") != "set_theme":
+            return
+        name = (event.data.get("service_data") or {}).get("name")
+        if name:
+            self._async_use_themes({name})
+
+    async def _async_rescan_usage(self, now=None):
+        """Look for placeholder themes picked in user data, dashboards or automations since the last pass."""
+        if not self.placeholders:
+            return
+        used = await self.async_run_job(themes_in_use, self.hass.config.path())
+        self._async_use_themes(used)
+
+    @callback
+    def _async_lovelace_updated(self, event):
+        """Bring dashboard themes up to date after a dashboard was saved."""
+        entry_ids = [
+            entry_id for entry_id, entry in self.entries.items() if entry.options.get(CONF_DASHBOARD_THEMES, False)
+        ]
+        if entry_ids:
+            self.hass.async_create_task(self.async_generate(entry_ids, reload=True, dashboards_only=True))
+
+    async def async_restore(self, entry_id, version_id=None, update_options=True):
+        """
+        Put the theme files of an earlier version back and reload themes.
+
+        Defaults to the version before the latest one. The options of the
+        version become the profile's options without a new render, unless
+        stylesheets it imports are gone. Returns the restored version, or None.
+        """
+        entry = self.entries.get(entry_id)
+        if entry is None:
+            return None
+        if version_id is None:
+            versions = await self.async_run_job(self.history.versions, entry_id)
+            if len(versions) < 2:
+                return None
+            version_id = versions[1]["id"]
+        start = time.perf_counter()
+        version = await self.async_run_job(
+            self.history.restore, entry_id, version_id, self.hass.config.path("themes")
+        )
+        if version is None:
+            return None
+        durations = {"write": time.perf_counter() - start}
+
+        self.overrides.pop(entry_id, None)
+        # Stylesheets the version imports may have been cleaned up since: render it instead
+        render = await self.async_run_job(
+            missing_stylesheets,
+            self.hass.config.path(".storage", STYLESHEET_DIRNAME),
+            self.hass.config.path("themes"),
+            list(version["files"]),
+        )
+        if dict(entry.options) != version["options"]:
+            if not render:
+                # The update listener skips the render for these options
+                self._restored[entry_id] = version["options"]
+            if update_options:
+                self.hass.config_entries.async_update_entry(entry, options=version["options"])
+        elif render:
+            await self.async_generate([entry_id], reload=True)
+        if not render:
+            # The restored themes are those of the version's options: no render at the next startup
+            key = outputs_key(
+                list(self._variant_profiles(entry, version["options"]).values()),
+                self._profile_overrides(entry, options=version["options"]),
+            )
+            await self.async_run_job(self._record_restored, entry_id, key, version["files"])
+            durations.update(await self.async_reload_themes([entry_id]))
+            durations["total"] = time.perf_counter() - start
+            changed = await self.async_run_job(self._note_hashes, entry_id, version["files"])
+            self._async_applied(entry_id, durations, changed, version["files"])
+        return version
+
+    def _record_restored(self, entry_id, key, hashes):
+        """Note the files of a restored version as the valid themes of key. Runs on the worker."""
+        themes_dir = self.hass.config.path("themes")
+        try:
+            files = {filename: os.path.getsize(os.path.join(themes_dir, filename)) for filename in hashes}
+        except OSError:
+            self.outputs.discard(entry_id)
+            return
+        self.outputs.record(entry_id, key, files, dict(hashes))
+
+    @callback
+    def async_take_restored(self, entry: ConfigEntry):
+        """Return whether the options of entry were just restored from the history (and need no render)."""
+        return self._restored.pop(entry.entry_id, None) == dict(entry.options)
+
+    async def async_reload_themes(self, entry_ids):
+        """
+        Ask the frontend to reload themes once, counting it for every profile.
+
+        Returns the seconds until the reload_themes service completed and until
+        the frontend announced the new themes (themes_updated, on which
+        browsers refetch them), None if it did not.
+        """
+        start = time.perf_counter()
+        await self.hass.services.async_call("frontend", "reload_themes", {}, blocking=True)
+        spans = {
+            "reload": time.perf_counter() - start,
+            "frontend": (
+                self._themes_updated - start
+                if self._themes_updated is not None and self._themes_updated >= start
+                else None
+            ),
+        }
+
+        for entry_id in entry_ids:
+            stats = self.stats.get(entry_id)
+            if stats is not None:
+                stats.reload_calls += 1
+                async_dispatcher_send(self.hass, f"{SIGNAL_STATS_UPDATED}_{entry_id}")
+        return spans
+
+    @callback
+    def _async_themes_updated(self, event):
+        """Note when the frontend replaced its themes, and make the switches that waited for them."""
+        self._themes_updated = time.perf_counter()
+        for switcher in self.switchers.values():
+            switcher.async_update()
+
+    @callback
+    def _async_applied(self, entry_id, durations, changed, hashes):
+        """
+        Record the apply latency of a profile and fire theme_applied.
+
+        durations are seconds per span, including the total from the request;
+        changed the files whose content changed and hashes the sha1 of every
+        file written.
+        """
+        entry = self.entries.get(entry_id)
+        if entry is None:
+            return
+        durations_ms = {
+            name: round(seconds * 1000, 3) if seconds is not None else None for name, seconds in durations.items()
+        }
+        stats = self.stats.get(entry_id)
+        if stats is not None:
+            stats.record_apply(durations_ms)
+            async_dispatcher_send(self.hass, f"{SIGNAL_STATS_UPDATED}_{entry_id}")
+        self.hass.bus.async_fire(
+            EVENT_THEME_APPLIED,
+            {
+                "entry_id": entry_id,
+                "profile": get_profile_name(entry),
+                "changed_files": changed,
+                "hashes": {filename: digest for filename, digest in hashes.items() if digest is not None},
+                "reloaded": "reload" in durations,
+                "visible": durations.get("frontend") is not None,
+                "durations_ms": durations_ms,
+            },
+        )
+
+    # ==========================================================================
+    # USER OVERRIDES
+    # ==========================================================================
+    def _load_overrides(self):
+        """Read the overrides file, creating the themes folder to watch. Runs on the worker."""
+        os.makedirs(os.path.dirname(self.theme_overrides.path), exist_ok=True)
+        return self.theme_overrides.load()
+
+    @callback
+    def _async_overrides_touched(self):
+        """Reload the overrides once the file has been quiet for a moment."""
+        if self._unsub_overrides is not None:
+            self._unsub_overrides()
+        self._unsub_overrides = async_call_later(self.hass, OVERRIDES_DEBOUNCE, self._async_reload_overrides)
+
+    async def _async_reload_overrides(self, now=None):
+        """Read the changed overrides file and regenerate the profiles whose themes it changes."""
+        self._unsub_overrides = None
+        before = {entry_id: self._profile_overrides(entry, True) for entry_id, entry in self.entries.items()}
+        if not await self.async_run_job(self.theme_overrides.load):
+            return
+        changed = [
+            entry_id
+            for entry_id, entry in self.entries.items()
+            if self._profile_overrides(entry, True) != before.get(entry_id)
+        ]
+        if changed:
+            _LOGGER.debug(f"Frosted Glass Manager: {OVERRIDES_FILENAME} changed, regenerating {len(changed)} profile(s)")
+            await self.async_generate(changed, reload=True)
+
+    # ==========================================================================
+    # FRAME TELEMETRY
+    # ==========================================================================
+    @callback
+    def async_telemetry_enabled(self):
+        """Whether any profile has frame telemetry on."""
+        return any(entry.options.get(CONF_FRAME_TELEMETRY, False) for entry in self.entries.values())
+
+    @callback
+    def async_update_telemetry(self):
+        """Load the telemetry module into the frontend while any profile has frame telemetry on."""
+        wanted = self.async_telemetry_enabled()
+        if wanted == (self._telemetry_url is not None):
+            return
+        if wanted:
+            # Pages opened from now on load it
+            self._telemetry_url = f"{TELEMETRY_URL}?v={self._telemetry_version}"
+            add_extra_js_url(self.hass, self._telemetry_url)
+        else:
+            remove_extra_js_url(self.hass, self._telemetry_url)
+            self._telemetry_url = None
+
+    def theme_tier(self, theme_name):
+        """Return (entry_id, variant name, tier) of one of the profiles' themes, or None."""
+        for entry_id, entry in self.entries.items():
+            for _, variant_name, _ in profile_variants(get_profile_name(entry), entry.options):
+                for (tier, _, _), (_, _, name) in zip(THEME_VARIANTS, profile_outputs(variant_name)):
+                    if name == theme_name:
+                        return entry_id, variant_name, tier
+        return None
+
+    @callback
+    def async_frame_report(self, report):
+        """
+        Record the frame timings of a browser; returns the theme it should switch to, or None.
+
+        Only called while frame telemetry is on (see async_telemetry_enabled).
+
+        A browser belongs to the profile whose theme it shows, or keeps the
+        profile it reported to before; its sensors are added there the first
+        time (the sensor platform skips a browser that already has them). With
+        automatic tier selection, the browser is moved to the tier picked for
+        it (see FrameTelemetry.assign_tier) of the variant it shows, or of the
+        default theme's variant when its theme was picked automatically.
+        """
+        enabled = [entry_id for entry_id, entry in self.entries.items() if entry.options.get(CONF_FRAME_TELEMETRY, False)]
+        device_id = report["device_id"]
+        shown = self.theme_tier(report["theme"]) if report["theme"] else None
+        known = self.telemetry.devices.get(device_id)
+        if shown is not None and shown[0] in enabled:
+            entry_id = shown[0]
+        elif known is not None and known["entry_id"] in enabled:
+            entry_id = known["entry_id"]
+        else:
+            entry_id = enabled[0]
+        added = known is None or known["entry_id"] != entry_id
+        self.telemetry.record(device_id, entry_id, report, shown[2] if shown is not None else None)
+
+        theme = None
+        entry = self.entries.get(shown[0]) if shown is not None else None
+        if entry is not None and entry.options.get(CONF_AUTO_TIER, False):
+            tier = self.telemetry.assign_tier(device_id, shown[2], entry.options.get(CONF_TARGET_FPS, DEFAULT_TARGET_FPS))
+            base = self.theme_tier(report["default_theme"]) if report["auto"] and report["default_theme"] else None
+            variant_name = base[1] if base is not None and base[0] == shown[0] else shown[1]
+            theme = profile_outputs(variant_name, [tier])[0][2]
+            if theme == report["theme"]:
+                theme = None
+            else:
+                _LOGGER.debug(f"Frosted Glass Manager: Switching {report['name']} ({device_id}) to {theme}")
+
+        if added:
+            async_dispatcher_send(self.hass, f"{SIGNAL_DEVICE_ADDED}_{entry_id}", device_id)
+        async_dispatcher_send(self.hass, f"{SIGNAL_DEVICE_UPDATED}_{device_id}")
+        return theme
+
+    # ==========================================================================
+    # BACKGROUND ANALYSIS
+    # ==========================================================================
+    @callback
+    def async_schedule_background_analysis(self, entry_ids):
+        """Analyze uncached backgrounds in the background, never blocking setup."""
+        old_tuning = {}
+        missing = set()
+        for entry_id in entry_ids:
+            entry = self.entries.get(entry_id)
+            if entry is None or not entry.options.get(CONF_AUTO_TUNE, False):
+                continue
+            for _, _, options in profile_variants(get_profile_name(entry), entry.options):
+                resolved = resolve_options(options)
+                for url in (resolved[CONF_LIGHT_BG], resolved[CONF_DARK_BG]):
+                    if self.analyzer.lookup(url) is None:
+                        missing.add(url)
+            old_tuning[entry_id] = self._variant_tunings(entry)
+
+        if missing:
+            self.hass.async_create_task(self._async_analyze_backgrounds(missing, old_tuning))
+
+    async def _async_analyze_backgrounds(self, urls, old_tuning):
+        """Analyze backgrounds and regenerate the profiles whose tuning changed."""
+        for url in urls:
+            await self.analyzer.async_analyze(url)
+
+        changed = [
+            entry_id
+            for entry_id, tuning in old_tuning.items()
+            if entry_id in self.entries and self._variant_tunings(self.entries[entry_id]) != tuning
+        ]
+        if changed:
+            await self.async_generate(changed, reload=True)
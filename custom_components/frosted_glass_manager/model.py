@@ -0,0 +1,467 @@
+"""Typed model of a theme template: modes, theme keys and card-mod CSS blocks.
+
+A template is parsed once into the tokens of each mode: plain theme keys
+("name: value" lines), CSS blocks (block scalars such as card-mod-card) and
+trivia (comments and blank lines, kept verbatim), so emitting an unchanged
+model gives the template back byte for byte. Keys are looked up by name and
+replaced in place in constant time; copies share all unchanged tokens. The
+engine compiles a model into slots (engine.compile_model), so rendering stays
+a single join.
+"""
+import functools
+import re
+import threading
+from collections import OrderedDict
+
+from .const import TEMPLATE_CACHE_MIN_SIZE
+
+SPLIT_MARKER = "    dark:"
+
+# "    light:" / "    dark:"
+MODE_PATTERN = re.compile(r"^    ([A-Za-z0-9_-]+):[ \t]*$")
+# "      name: value  # comment"; value and comment are split by _split_value
+KEY_PATTERN = re.compile(r"^( {6}([A-Za-z0-9_-]+):[ \t]*)(.*?)([ \t]*)$")
+# The top-level key naming the theme
+NAME_PATTERN = re.compile(r"^([^\s#][^:\n]*):[ \t]*$")
+# A single-line CSS custom property ("--name: value;") inside a block
+PROPERTY_PATTERN = re.compile(r"^([ \t]*--([A-Za-z0-9_-]+):[ \t]*)([^;\n]*)(;.*)$")
+# The seed color and background image a template ships with
+PRIMARY_COLOR_KEY = "primary-color"
+PRIMARY_RGB_PATTERN = re.compile(r"rgb\((\d{1,3}, *\d{1,3}, *\d{1,3})\)")
+BACKGROUND_IMAGE_KEY = "background-image"
+BACKGROUND_URL_PATTERN = re.compile(r"url\(['\"]?([^'\")\s]+)")
+# Unquoted YAML that needs quotes
+YAML_SPECIAL_PATTERN = re.compile(r"^[\s\-?:,\[\]{}#&*!|>'\"%@`]|: | #|\s$")
+
+
+def _split_value(rest):
+    """Split the text after "name:" into (value, trailing comment) like YAML does."""
+    if rest[:1] in "'\"":
+        end = rest.find(rest[0], 1)
+        if rest[0] == "'":
+            # '' is an escaped quote inside a single-quoted scalar
+            while end != -1 and rest[end + 1:end + 2] == "'":
+                end = rest.find("'", end + 2)
+        if end != -1:
+            return rest[:end + 1], rest[end + 1:]
+    match = re.search(r"[ \t]+#", rest)
+    if match is None:
+        return rest, ""
+    return rest[:match.start()], rest[match.start():]
+
+
+def yaml_scalar(value, quote=""):
+    """Format a value as a YAML scalar, in the given quote style when it has one or needs one."""
+    if not quote and (not value or YAML_SPECIAL_PATTERN.search(value)):
+        quote = "'"
+    if quote == "'":
+        return "'" + value.replace("'", "''") + "'"
+    if quote == '"':
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return value
+
+
+class Trivia:
+    """Lines kept verbatim: comments, blank lines, anything the model does not know."""
+
+    __slots__ = ("text", "compiled")
+
+    def __init__(self, text):
+        """Initialize from the source lines."""
+        self.text = text
+        # Set by engine.compile_model
+        self.compiled = None
+
+    def terminated(self):
+        """Return the token ending with a line break, e.g. to add a token after it."""
+        return self if self.text.endswith("\n") else Trivia(self.text + "\n")
+
+
+class ThemeKey:
+    """A single-line theme variable: prefix ("      name: "), value as written, suffix (comment, newline)."""
+
+    __slots__ = ("name", "prefix", "raw", "suffix", "compiled")
+
+    def __init__(self, name, prefix, raw, suffix):
+        """Initialize from the parts of the source line."""
+        self.name = name
+        self.prefix = prefix
+        self.raw = raw
+        self.suffix = suffix
+        self.compiled = None
+
+    @property
+    def text(self):
+        """The line as emitted."""
+        return f"{self.prefix}{self.raw}{self.suffix}"
+
+    @property
+    def quote(self):
+        """The quote character of the value, or ""."""
+        return self.raw[0] if self.raw[:1] in "'\"" and len(self.raw) > 1 and self.raw[-1] == self.raw[0] else ""
+
+    @property
+    def value(self):
+        """The value without YAML quotes."""
+        quote = self.quote
+        if quote == "'":
+            return self.raw[1:-1].replace("''", "'")
+        if quote == '"':
+            return self.raw[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+        return self.raw
+
+    def with_value(self, value):
+        """Return a copy of the key set to value, quoted like the original."""
+        suffix = self.suffix if self.suffix.endswith("\n") else self.suffix + "\n"
+        return ThemeKey(self.name, self.prefix, yaml_scalar(value, self.quote), suffix)
+
+    def terminated(self):
+        """Return the token ending with a line break, e.g. to add a token after it."""
+        return self if self.suffix.endswith("\n") else ThemeKey(self.name, self.prefix, self.raw, self.suffix + "\n")
+
+
+class CssBlock:
+    """A block scalar of CSS: its key line and body lines, with the custom properties it sets."""
+
+    __slots__ = ("name", "header", "lines", "properties", "compiled")
+
+    def __init__(self, name, header, lines):
+        """Initialize from the key line and the body lines."""
+        self.name = name
+        self.header = header
+        self.lines = lines
+        # name -> index into lines of the last "--name: value;" declaration
+        self.properties = {}
+        for index, line in enumerate(lines):
+            match = PROPERTY_PATTERN.match(line)
+            if match is not None:
+                self.properties[match.group(2)] = index
+        self.compiled = None
+
+    @property
+    def text(self):
+        """The block as emitted."""
+        return self.header + "".join(self.lines)
+
+    @property
+    def css(self):
+        """The body lines."""
+        return "".join(self.lines)
+
+    def property(self, name):
+        """Return the value of a custom property (as written, with !important), or None."""
+        index = self.properties.get(name)
+        if index is None:
+            return None
+        return PROPERTY_PATTERN.match(self.lines[index]).group(3).strip()
+
+    def with_property(self, name, value):
+        """Return a copy of the block with a custom property set, or None if the block does not declare it."""
+        index = self.properties.get(name)
+        if index is None:
+            return None
+        match = PROPERTY_PATTERN.match(self.lines[index])
+        lines = self.lines.copy()
+        lines[index] = f"{match.group(1)}{value}{match.group(4)}"
+        return CssBlock(self.name, self.header, lines)
+
+    def with_lines(self, lines):
+        """Return a copy of the block with another body."""
+        return CssBlock(self.name, self.header, lines)
+
+    def terminated(self):
+        """Return the token ending with a line break, e.g. to add a token after it."""
+        if not self.lines:
+            return self if self.header.endswith("\n") else CssBlock(self.name, self.header + "\n", [])
+        return self if self.lines[-1].endswith("\n") else self.with_lines(self.lines[:-1] + [self.lines[-1] + "\n"])
+
+
+class ThemeMode:
+    """The tokens of one mode in template order, with keys and blocks by name."""
+
+    __slots__ = ("name", "header", "tokens", "index")
+
+    def __init__(self, name, header, tokens, index=None):
+        """Initialize from the mode's header line and tokens."""
+        self.name = name
+        self.header = header
+        self.tokens = tokens
+        # name -> position in tokens of the last key or block of that name (YAML keeps the last)
+        if index is None:
+            index = {token.name: position for position, token in enumerate(tokens) if not isinstance(token, Trivia)}
+        self.index = index
+
+    def get(self, name):
+        """Return the key or block of a name, or None."""
+        position = self.index.get(name)
+        return None if position is None else self.tokens[position]
+
+    def keys(self):
+        """Iterate over the plain theme keys."""
+        return (token for token in self.tokens if isinstance(token, ThemeKey))
+
+    def blocks(self):
+        """Iterate over the CSS blocks."""
+        return (token for token in self.tokens if isinstance(token, CssBlock))
+
+    def copy(self):
+        """Return a copy sharing the tokens."""
+        return ThemeMode(self.name, self.header, self.tokens.copy(), self.index.copy())
+
+    def append(self, token):
+        """Add a token at the end of the mode."""
+        if self.tokens:
+            self.tokens[-1] = self.tokens[-1].terminated()
+        if not isinstance(token, Trivia):
+            self.index[token.name] = len(self.tokens)
+        self.tokens.append(token)
+
+
+class ThemeModel:
+    """A theme template: the text before the modes (with the theme name key) and its modes."""
+
+    __slots__ = ("preamble", "name", "name_line", "modes", "seeds", "compiled")
+
+    def __init__(self, preamble, name, name_line, modes, seeds=None):
+        """Initialize from the parsed parts."""
+        # Trivia before the theme name line, and between it and the first mode
+        self.preamble = preamble
+        self.name = name
+        # Index into preamble of the theme name line
+        self.name_line = name_line
+        # mode name -> ThemeMode, in template order
+        self.modes = modes
+        # mode -> (primary "r, g, b", background URL) the template ships with, None where it sets none.
+        # Fixed at parse time: a changed key does not move the slots of the copies.
+        self.seeds = seeds if seeds is not None else {mode: self._find_seeds(mode) for mode in modes}
+        # Set by engine.compile_model, cleared by every change
+        self.compiled = None
+
+    def get(self, mode, name):
+        """Return the key or block of a mode, or None."""
+        return self.modes[mode].get(name) if mode in self.modes else None
+
+    def value(self, mode, name):
+        """Return the unquoted value of a theme key, or None."""
+        token = self.get(mode, name)
+        return token.value if isinstance(token, ThemeKey) else None
+
+    def css_property(self, mode, name):
+        """Return the value of the last custom property of that name in a mode's CSS blocks, or None."""
+        value = None
+        for block in self.modes[mode].blocks():
+            found = block.property(name)
+            if found is not None:
+                value = found
+        return value
+
+    def set(self, mode, name, value):
+        """Set a theme key of a mode, appending it when the mode has none of that name."""
+        theme_mode = self.modes[mode]
+        position = theme_mode.index.get(name)
+        if position is not None and isinstance(theme_mode.tokens[position], ThemeKey):
+            theme_mode.tokens[position] = theme_mode.tokens[position].with_value(value)
+        else:
+            theme_mode.append(ThemeKey(name, f"      {name}: ", yaml_scalar(value), "\n"))
+        self.compiled = None
+
+    def replace(self, mode, token):
+        """Put a token (e.g. a changed block) in the place of the one of the same name, or add it at the end of the mode."""
+        theme_mode = self.modes[mode]
+        position = theme_mode.index.get(token.name)
+        if position is None:
+            theme_mode.append(token)
+        else:
+            theme_mode.tokens[position] = token
+        self.compiled = None
+
+    def copy(self):
+        """Return a copy to change, sharing all tokens until they are replaced."""
+        return ThemeModel(
+            self.preamble,
+            self.name,
+            self.name_line,
+            {name: mode.copy() for name, mode in self.modes.items()},
+            self.seeds,
+        )
+
+    def _find_seeds(self, mode):
+        primary = self.value(mode, PRIMARY_COLOR_KEY)
+        background = self.value(mode, BACKGROUND_IMAGE_KEY)
+        primary_match = PRIMARY_RGB_PATTERN.search(primary) if primary else None
+        background_match = BACKGROUND_URL_PATTERN.search(background) if background else None
+        return (
+            primary_match.group(1) if primary_match else None,
+            background_match.group(1) if background_match else None,
+        )
+
+    def emit(self):
+        """Return the template text of the model."""
+        parts = [token.text for token in self.preamble]
+        for mode in self.modes.values():
+            parts.append(mode.header)
+            parts.extend(token.text for token in mode.tokens)
+        return "".join(parts)
+
+
+def _block_end(lines, start, indent):
+    """Return the index after the body of a block scalar whose key is indented by indent."""
+    end = start
+    last = start
+    while end < len(lines):
+        line = lines[end]
+        if line.strip():
+            if len(line) - len(line.lstrip(" ")) <= indent:
+                break
+            last = end + 1
+        end += 1
+    # Blank lines before the next key belong to the trivia after the block
+    return last
+
+
+def parse_theme(content_template):
+    """Parse a template into a ThemeModel, or None if it has no dark mode."""
+    lines = content_template.splitlines(True)
+    preamble = []
+    name = None
+    name_line = None
+    modes = {}
+    tokens = None
+    trivia = []
+
+    def flush():
+        if trivia:
+            (preamble if tokens is None else tokens).append(Trivia("".join(trivia)))
+            trivia.clear()
+
+    position = 0
+    while position < len(lines):
+        line = lines[position]
+        stripped = line.rstrip("\r\n")
+        mode_match = MODE_PATTERN.match(stripped)
+        if mode_match is not None and name is not None:
+            flush()
+            tokens = []
+            modes[mode_match.group(1)] = (line, tokens)
+            position += 1
+            continue
+        if tokens is None:
+            name_match = NAME_PATTERN.match(stripped) if name is None else None
+            if name_match is not None:
+                flush()
+                name = name_match.group(1)
+                name_line = len(preamble)
+                preamble.append(Trivia(line))
+            else:
+                trivia.append(line)
+            position += 1
+            continue
+        key_match = KEY_PATTERN.match(stripped)
+        if key_match is None or not key_match.group(3) or key_match.group(3)[0] == "#":
+            trivia.append(line)
+            position += 1
+            continue
+        flush()
+        raw, comment = _split_value(key_match.group(3))
+        if raw[:1] in "|>":
+            end = _block_end(lines, position + 1, 6)
+            tokens.append(CssBlock(key_match.group(2), line, lines[position + 1:end]))
+            position = end
+            continue
+        tokens.append(ThemeKey(key_match.group(2), key_match.group(1), raw, comment + key_match.group(4) + line[len(stripped):]))
+        position += 1
+    flush()
+
+    if "dark" not in modes or SPLIT_MARKER not in content_template:
+        return None
+    return ThemeModel(
+        preamble, name, name_line, {mode: ThemeMode(mode, header, tokens) for mode, (header, tokens) in modes.items()}
+    )
+
+
+class TemplateCache:
+    """
+    Results of a function of template text, least recently used first.
+
+    Unlike functools.lru_cache the size follows the number of templates a pass
+    renders, see set_template_cache_size; scale is the results kept per
+    template (e.g. a template and its changed copy).
+    """
+
+    def __init__(self, function, scale=1):
+        """Wrap function."""
+        functools.update_wrapper(self, function)
+        self._function = function
+        self._scale = scale
+        self._size = TEMPLATE_CACHE_MIN_SIZE * scale
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        """Return the cached result of function(*args), calling it on a miss."""
+        with self._lock:
+            if args in self._results:
+                self._results.move_to_end(args)
+                return self._results[args]
+        result = self._function(*args)
+        self.put(args, result)
+        return result
+
+    def __contains__(self, args):
+        with self._lock:
+            return args in self._results
+
+    def put(self, args, result):
+        """Cache result as that of function(*args)."""
+        with self._lock:
+            self._results[args] = result
+            self._results.move_to_end(args)
+            while len(self._results) > self._size:
+                self._results.popitem(last=False)
+
+    def resize(self, templates):
+        """Keep the results of up to templates templates."""
+        with self._lock:
+            self._size = max(templates, TEMPLATE_CACHE_MIN_SIZE) * self._scale
+            while len(self._results) > self._size:
+                self._results.popitem(last=False)
+
+
+_template_caches = []
+
+
+def template_cache(function=None, *, scale=1):
+    """Decorate a function of template text with a TemplateCache."""
+    if function is None:
+        return functools.partial(template_cache, scale=scale)
+    cache = TemplateCache(function, scale)
+    _template_caches.append(cache)
+    return cache
+
+
+def set_template_cache_size(templates):
+    """Size every template cache for up to templates templates, e.g. the distinct templates of one pass."""
+    for cache in _template_caches:
+        cache.resize(templates)
+
+
+# Models by template text: parsed templates and changed copies (see derive_template)
+_models = template_cache(parse_theme, scale=2)
+
+
+def theme_model(content_template):
+    """Return the parsed model of a template, cached by its text. Copy it before changing it."""
+    return _models(content_template)
+
+
+def derive_template(model):
+    """
+    Return the text of a changed copy of a model, caching the copy as the model of that text.
+
+    Compiling the text then only scans the tokens that were changed: the
+    others keep the scans of the model the copy was made from.
+    """
+    content_template = model.emit()
+    if (content_template,) not in _models:
+        _models.put((content_template,), model)
+    return content_template
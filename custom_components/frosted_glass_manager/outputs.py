@@ -0,0 +1,101 @@
+"""Which generated theme files on disk are still valid.
+
+After every pass the manager records, per profile, a key of what the themes
+were rendered from (templates, palette code, options, tuning and overrides) and the size
+and sha1 of each file written. At startup a profile whose key is unchanged and whose
+files are all present at their recorded sizes needs no render: checking costs
+one stat per file.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+
+from .generator import generate_hex_palette
+from .templates import THEME_VARIANTS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def _code_fingerprint():
+    """Identify the templates and palette code themes are rendered with."""
+    digest = hashlib.sha1()
+    for tier, content_template, suffix in THEME_VARIANTS:
+        digest.update(f"{tier}\0{suffix}\0".encode())
+        digest.update(content_template.encode("utf-8"))
+    digest.update(json.dumps(generate_hex_palette("106, 116, 211")).encode())
+    return digest.hexdigest()
+
+
+def outputs_key(variants, overrides=None):
+    """
+    Return the key of the themes rendered for variants, a list of (profile name, options, tuning).
+
+    overrides are the user overrides of the variants, see ThemeOverrides.profile_changes.
+    """
+    digest = hashlib.sha1(_code_fingerprint().encode())
+    variants = [[profile_name, dict(options), tuning] for profile_name, options, tuning in variants]
+    digest.update(json.dumps(variants, sort_keys=True, default=repr).encode())
+    if overrides:
+        digest.update(json.dumps(overrides, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class OutputManifest:
+    """The key, file sizes and hashes of the last complete render of each profile, stored in one file."""
+
+    def __init__(self, path):
+        """Initialize the manifest stored at path."""
+        self.path = path
+        # entry_id -> {"key": outputs_key, "files": {filename: size}, "hashes": {filename: sha1}}
+        self._profiles = None
+
+    def _load(self):
+        if self._profiles is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._profiles = json.load(f)["profiles"]
+            except (OSError, ValueError, KeyError):
+                self._profiles = {}
+        return self._profiles
+
+    def is_valid(self, entry_id, key, themes_dir):
+        """Return whether the files of the profile's last render match key and are intact. Runs in the executor."""
+        recorded = self._load().get(entry_id)
+        if recorded is None or recorded["key"] != key or not recorded["files"]:
+            return False
+        for filename, size in recorded["files"].items():
+            try:
+                if os.path.getsize(os.path.join(themes_dir, filename)) != size:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def hashes(self, entry_id):
+        """Return {filename: sha1} of the profile's last complete render. Runs in the executor on first use."""
+        return self._load().get(entry_id, {}).get("hashes", {})
+
+    def record(self, entry_id, key, files, hashes):
+        """Store the key, {filename: size} and {filename: sha1} of a complete render of a profile. Runs in the executor."""
+        profiles = self._load()
+        entry = {"key": key, "files": files, "hashes": hashes}
+        if profiles.get(entry_id) != entry:
+            profiles[entry_id] = entry
+            self._save()
+
+    def discard(self, entry_id):
+        """Forget the files of a profile, e.g. after some were not written. Runs in the executor."""
+        if self._load().pop(entry_id, None) is not None:
+            self._save()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"profiles": self._profiles}, f)
+            os.replace(f"{self.path}.tmp", self.path)
+        except OSError as err:
+            _LOGGER.warning(f"Frosted Glass Manager: Could not save the output manifest: {err}")
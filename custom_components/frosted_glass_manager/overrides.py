@@ -0,0 +1,168 @@
+"""User overrides merged into the generated themes: themes/frosted_overrides.yaml.
+
+The file is a list of rules, so Home Assistant's !include_dir_merge_named
+(which only merges mappings) does not load it as themes:
+
+    - light:
+        primary-text-color: "#1B1B1F"
+      dark:
+        card-mod-card: |
+          ha-card { border-width: 2px; }
+    - profiles: [Custom]
+      tiers: [lite]
+      dark:
+        ha-card-border-radius: 12px
+
+A rule applies to every theme unless it names profiles (theme variants and
+dashboard themes have names of their own) or tiers. A value sets a theme key;
+CSS for a card-mod block is appended to it, or added as a new block. Rules
+apply in order. The changes are applied to a copy of the template's model,
+so compiling the result only scans the changed tokens.
+"""
+import json
+import logging
+import os
+
+from .model import CssBlock, derive_template, template_cache, theme_model
+from .templates import THEME_VARIANTS
+
+_LOGGER = logging.getLogger(__name__)
+
+OVERRIDE_MODES = ("light", "dark")
+RULE_FILTERS = ("profiles", "tiers")
+
+
+def _names(value):
+    """Return a rule filter as a frozenset, or None to match everything."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    return frozenset(str(item) for item in value)
+
+
+def parse_overrides(text):
+    """
+    Parse the text of an overrides file into rules.
+
+    Returns ([(profiles, tiers, changes)], [error]); profiles and tiers are
+    frozensets or None, changes a tuple of (mode, name, value). Invalid rules
+    and values are left out and reported; rules are None when the whole file
+    is unusable.
+    """
+    import yaml  # PyYAML, shipped with Home Assistant; the renderer CLI does not need it
+
+    try:
+        data = yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    except yaml.YAMLError as err:
+        return None, [f"not valid YAML: {err}"]
+    if data is None:
+        return [], []
+    if not isinstance(data, list):
+        return None, ["must be a list of rules (Home Assistant would load a mapping as themes)"]
+
+    rules = []
+    errors = []
+    for number, rule in enumerate(data, 1):
+        if not isinstance(rule, dict):
+            errors.append(f"rule {number} is not a mapping")
+            continue
+        unknown = set(rule) - set(OVERRIDE_MODES) - set(RULE_FILTERS)
+        if unknown:
+            errors.append(f"rule {number}: unknown keys {', '.join(sorted(map(str, unknown)))}")
+        changes = []
+        for mode in OVERRIDE_MODES:
+            keys = rule.get(mode) or {}
+            if not isinstance(keys, dict):
+                errors.append(f"rule {number}: {mode} is not a mapping")
+                continue
+            for name, value in keys.items():
+                if isinstance(value, (dict, list)) or value is None:
+                    errors.append(f"rule {number}: {mode}.{name} is not a single value")
+                    continue
+                # Numbers and booleans as YAML writes them
+                changes.append((mode, str(name), value if isinstance(value, str) else json.dumps(value)))
+        try:
+            rules.append((_names(rule.get("profiles")), _names(rule.get("tiers")), tuple(changes)))
+        except TypeError:
+            errors.append(f"rule {number}: profiles and tiers are names or lists of names")
+    return rules, errors
+
+
+class ThemeOverrides:
+    """The rules of the overrides file, reloaded when it changes."""
+
+    def __init__(self, path):
+        """Initialize the overrides read from path."""
+        self.path = path
+        self.rules = []
+        self.errors = []
+
+    def load(self):
+        """Read the file again; a missing file has no rules. Returns whether the rules changed. Runs in the executor."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            text = ""
+        except OSError as err:
+            _LOGGER.warning(f"Frosted Glass Manager: Could not read {self.path}: {err}")
+            return False
+        rules, self.errors = parse_overrides(text)
+        for error in self.errors:
+            _LOGGER.warning(f"Frosted Glass Manager: {os.path.basename(self.path)}: {error}")
+        if rules is None:
+            # Likely saved halfway: the themes keep the last usable rules
+            return False
+        changed = rules != self.rules
+        self.rules = rules
+        return changed
+
+    def changes(self, profile_name, tier):
+        """Return the (mode, name, value) changes of a theme, in order."""
+        return tuple(
+            change
+            for profiles, tiers, changes in self.rules
+            if (profiles is None or profile_name in profiles) and (tiers is None or tier in tiers)
+            for change in changes
+        )
+
+    def profile_changes(self, profile_name):
+        """Return {tier: changes} of the tiers of a profile that have any."""
+        found = {}
+        for tier, _, _ in THEME_VARIANTS:
+            changes = self.changes(profile_name, tier)
+            if changes:
+                found[tier] = changes
+        return found
+
+
+def _append_css(block, css):
+    """Return a copy of a CSS block with css added at the end, indented like its body."""
+    lines = block.lines.copy()
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    body = next((line for line in lines if line.strip()), None)
+    indent = body[: len(body) - len(body.lstrip(" "))] if body else " " * (len(block.header) - len(block.header.lstrip(" ")) + 2)
+    lines.extend(f"{indent}{line}\n" if line.strip() else "\n" for line in css.rstrip("\n").split("\n"))
+    return block.with_lines(lines)
+
+
+@template_cache(scale=2)
+def apply_overrides(content_template, changes):
+    """Return the template with changes applied (see ThemeOverrides.changes); the template itself when there are none."""
+    model = theme_model(content_template) if changes else None
+    if model is None:
+        return content_template
+    model = model.copy()
+    for mode, name, value in changes:
+        if mode not in model.modes:
+            continue
+        token = model.get(mode, name)
+        if isinstance(token, CssBlock):
+            model.replace(mode, _append_css(token, value))
+        elif "\n" in value.strip("\n"):
+            model.replace(mode, _append_css(CssBlock(name, f"      {name}: |\n", []), value))
+        else:
+            model.set(mode, name, value)
+    return derive_template(model)
@@ -0,0 +1,61 @@
+"""Preset color schemes for the Frosted Glass themes.
+
+Curated and hue-stepped seed colors, each with a light- and a dark-mode seed.
+A preset only picks the colors of a profile, whose themes are then rendered
+like any other.
+"""
+import colorsys
+
+from .const import PRESET_CURATED, PRESET_HUE_STEPS
+
+
+def _rgb(value):
+    return f"{value[0]}, {value[1]}, {value[2]}"
+
+
+def _hue_presets():
+    """Seeds for every hue step: a deeper tone for light mode, a brighter one for dark mode."""
+    presets = []
+    for step in range(PRESET_HUE_STEPS):
+        hue = step * 360 // PRESET_HUE_STEPS
+        light = colorsys.hls_to_rgb(hue / 360, 0.45, 0.6)
+        dark = colorsys.hls_to_rgb(hue / 360, 0.65, 0.6)
+        presets.append(
+            {
+                "id": f"hue_{hue:03d}",
+                "name": f"Hue {hue}°",
+                "light": _rgb([round(c * 255) for c in light]),
+                "dark": _rgb([round(c * 255) for c in dark]),
+            }
+        )
+    return presets
+
+
+# [{"id", "name", "light": "r, g, b", "dark": "r, g, b"}]
+PRESETS = [
+    {"id": name.lower().replace(" ", "_"), "name": name, "light": _rgb(light), "dark": _rgb(dark)}
+    for name, (light, dark) in PRESET_CURATED.items()
+] + _hue_presets()
+
+PRESETS_BY_ID = {preset["id"]: preset for preset in PRESETS}
+
+
+def color_distance(a, b):
+    """Perceptually weighted RGB distance ("redmean") between two "r, g, b" strings."""
+    r1, g1, b1 = (int(x) for x in a.split(","))
+    r2, g2, b2 = (int(x) for x in b.split(","))
+    mean_r = (r1 + r2) / 2
+    return (
+        (2 + mean_r / 256) * (r1 - r2) ** 2
+        + 4 * (g1 - g2) ** 2
+        + (2 + (255 - mean_r) / 256) * (b1 - b2) ** 2
+    ) ** 0.5
+
+
+def closest_preset(light_rgb, dark_rgb=None):
+    """Return the preset closest to the given seed colors ("r, g, b")."""
+    dark_rgb = dark_rgb or light_rgb
+    return min(
+        PRESETS,
+        key=lambda preset: color_distance(preset["light"], light_rgb) + color_distance(preset["dark"], dark_rgb),
+    )
@@ -0,0 +1,108 @@
+"""On-demand profiling of theme rendering."""
+import cProfile
+import logging
+import os
+import pstats
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .generator import profile_renders
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def profile_generation(config_dir, profiles, unused_cards, overrides, iterations, trace_memory, top):
+    """
+    Render every output of profiles repeatedly under cProfile (and optionally tracemalloc).
+
+    profiles, unused_cards and overrides are as for generate_profiles, so the
+    themes are rendered like in a pass (pruned, with external stylesheets and
+    overrides) but nothing is written to the themes folder. Writes a .prof
+    file and, with tracemalloc, a top-N allocation report into config_dir and
+    returns a JSON-friendly summary.
+    """
+    stamp = dt_util.now().strftime("%Y%m%d-%H%M%S")
+    # Created here, so two runs in the same second never share a file
+    fd, prof_path = tempfile.mkstemp(prefix=f"{DOMAIN}_{stamp}_", suffix=".prof", dir=config_dir)
+    os.close(fd)
+    alloc_path = f"{prof_path.removesuffix('.prof')}_allocations.txt"
+
+    started_tracing = False
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+    if trace_memory:
+        tracemalloc.reset_peak()
+
+    profiler = cProfile.Profile()
+    durations = []
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            profiler.enable()
+            for _, _, _, _, render in profile_renders(profiles, unused_cards, overrides):
+                render()
+            profiler.disable()
+            durations.append((time.perf_counter() - start) * 1000)
+
+        memory = None
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__),)
+            )
+            allocations = snapshot.statistics("lineno")[:top]
+            with open(alloc_path, "w", encoding="utf-8") as f:
+                f.write(f"Frosted Glass Manager allocation report ({iterations} runs)\n")
+                f.write(f"current={current} peak={peak}\n\n")
+                for stat in allocations:
+                    f.write(f"{stat}\n")
+            memory = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "report": alloc_path,
+                "top": [
+                    {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                    for stat in allocations
+                ],
+            }
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    profiler.dump_stats(prof_path)
+    _LOGGER.info(f"Frosted Glass Manager: Profile written to {prof_path}")
+
+    return {
+        "iterations": iterations,
+        "outputs": sorted(output_filename for _, _, output_filename, _, _ in profile_renders(profiles, unused_cards, overrides)),
+        "duration_ms": {
+            "mean": round(statistics.fmean(durations), 3),
+            "median": round(statistics.median(durations), 3),
+            "min": round(min(durations), 3),
+            "max": round(max(durations), 3),
+        },
+        "profile": prof_path,
+        "top_functions": _top_functions(profiler, top),
+        "memory": memory,
+    }
+
+
+def _top_functions(profiler, top):
+    """Return the top-N functions by cumulative time."""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "total_ms": round(total_time * 1000, 3),
+            "cumulative_ms": round(cumulative_time * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, total_time, cumulative_time, _) in rows
+    ]
@@ -0,0 +1,141 @@
+"""Drop card-mod rules for custom cards that are not installed.
+
+card-mod injects the card-mod-card CSS into the shadow root of every card, so
+every rule is parsed once per card on each dashboard render. Rules that only
+target custom cards (Mushroom, Bubble Card) are dead weight when the card is
+not installed. Home Assistant's own cards can always appear and are kept.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from .const import CUSTOM_CARD_RULES, LOVELACE_RESOURCES_STORAGE, PRUNE_CACHE_MIN_SIZE
+
+_LOGGER = logging.getLogger(__name__)
+
+# (template digest, tokens) -> pruned template, least recently used first
+_pruned = OrderedDict()
+_pruned_lock = threading.Lock()
+_pruned_size = PRUNE_CACHE_MIN_SIZE
+
+
+def installed_card_sources(config_dir):
+    """Return the lower-cased Lovelace resource URLs and www/ folder and file names."""
+    sources = []
+    try:
+        with open(os.path.join(config_dir, ".storage", LOVELACE_RESOURCES_STORAGE), encoding="utf-8") as f:
+            items = json.load(f).get("data", {}).get("items", [])
+        sources.extend(str(item.get("url", "")).lower() for item in items)
+    except (OSError, ValueError, AttributeError) as err:
+        _LOGGER.debug(f"Frosted Glass Manager: No Lovelace resources read: {err}")
+
+    # www/<card> and HACS' www/community/<card>
+    www = os.path.join(config_dir, "www")
+    for folder in (www, os.path.join(www, "community")):
+        try:
+            sources.extend(name.lower() for name in os.listdir(folder))
+        except OSError:
+            continue
+    return sources
+
+
+def unused_card_tokens(config_dir):
+    """Return the selector tokens of every custom card that is not installed."""
+    sources = installed_card_sources(config_dir)
+    return frozenset(
+        token
+        for card, tokens in CUSTOM_CARD_RULES.items()
+        if not any(card in source for source in sources)
+        for token in tokens
+    )
+
+
+def _code(line):
+    """A CSS line without a trailing comment."""
+    return line.split("/*", 1)[0].rstrip()
+
+
+@functools.lru_cache(maxsize=16)
+def _template_digest(content_template):
+    return hashlib.sha1(content_template.encode("utf-8")).digest()
+
+
+def set_prune_cache_size(size):
+    """Keep up to size pruned templates, e.g. one per tier for every set of tokens in use (each dashboard theme)."""
+    global _pruned_size
+    with _pruned_lock:
+        _pruned_size = max(size, PRUNE_CACHE_MIN_SIZE)
+        while len(_pruned) > _pruned_size:
+            _pruned.popitem(last=False)
+
+
+def prune_card_rules(content_template, tokens):
+    """
+    Remove the CSS rules whose selectors all contain one of tokens.
+
+    Selectors of a rule that only partly match are dropped from its selector
+    list; a comment line right above a removed rule goes with it. Cached by
+    the digest of the template and tokens, so the pruned template is also
+    compiled only once; see set_prune_cache_size.
+    """
+    if not tokens:
+        return content_template
+
+    key = (_template_digest(content_template), tokens)
+    with _pruned_lock:
+        pruned = _pruned.get(key)
+        if pruned is not None:
+            _pruned.move_to_end(key)
+            return pruned
+    pruned = _prune(content_template, tokens)
+    with _pruned_lock:
+        _pruned[key] = pruned
+        while len(_pruned) > _pruned_size:
+            _pruned.popitem(last=False)
+    return pruned
+
+
+def _prune(content_template, tokens):
+    """Uncached prune_card_rules."""
+    lines = content_template.split("\n")
+    out = []
+    index = 0
+    while index < len(lines):
+        end = index
+        while end < len(lines) and _code(lines[end]).endswith(","):
+            end += 1
+        if end == len(lines) or not _code(lines[end]).endswith("{"):
+            out.append(lines[index])
+            index += 1
+            continue
+
+        selector_lines = lines[index:end + 1]
+        selectors = [_code(line).rstrip(",{").strip() for line in selector_lines]
+        keep = [selector for selector in selectors if not any(token in selector for token in tokens)]
+        if len(keep) == len(selectors):
+            out.extend(selector_lines)
+            index = end + 1
+            continue
+
+        # Skip to the closing brace of the rule
+        depth = 0
+        close = end
+        for close in range(end, len(lines)):
+            code = _code(lines[close])
+            depth += code.count("{") - code.count("}")
+            if depth <= 0:
+                break
+
+        if keep:
+            indent = selector_lines[0][: len(selector_lines[0]) - len(selector_lines[0].lstrip())]
+            out.extend(f"{indent}{selector}," for selector in keep[:-1])
+            out.append(f"{indent}{keep[-1]} {{")
+            out.extend(lines[end + 1:close + 1])
+        elif out and out[-1].strip().startswith("/*") and _code(out[-1]).strip() == "":
+            out.pop()
+        index = close + 1
+    return "\n".join(out)
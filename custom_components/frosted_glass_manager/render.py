@@ -0,0 +1,244 @@
+"""Render Frosted Glass themes outside Home Assistant.
+
+Renders the theme YAML for one variant given on the command line, or for every
+variant of a JSON/CSV batch file. Large batches are spread across a process
+pool. Home Assistant is not imported.
+
+Usage (from the custom_components directory):
+
+    python -m frosted_glass_manager.render --name Kitchen --light-primary "#C81E28" -o themes
+    python -m frosted_glass_manager.render --batch variants.csv --workers 8 --check --no-write
+
+A batch is a JSON list of objects (or {"variants": [...]}) or a CSV file with
+a header row. Recognized fields: name, light_primary, dark_primary,
+light_background, dark_background and tiers ("full", "lite", "all" or
+several separated by "+"). Colors are "R, G, B" or "#RRGGBB".
+"""
+import argparse
+import concurrent.futures
+import csv
+import functools
+import json
+import os
+import re
+import sys
+import time
+
+from .const import (
+    CONF_LIGHT_PRIMARY,
+    CONF_LIGHT_BG,
+    CONF_DARK_PRIMARY,
+    CONF_DARK_BG,
+    DEFAULT_PROFILE_NAME,
+    PROFILE_NAME_PATTERN,
+)
+from .engine import SPLIT_MARKER
+from .generator import (
+    generate_hex_palette,
+    profile_outputs,
+    render_theme,
+    resolve_options,
+    write_theme_to,
+)
+from .templates import THEME_VARIANTS
+
+TIERS = tuple(tier for tier, _, _ in THEME_VARIANTS)
+
+# Variant field -> option key
+VARIANT_FIELDS = {
+    "light_primary": CONF_LIGHT_PRIMARY,
+    "dark_primary": CONF_DARK_PRIMARY,
+    "light_background": CONF_LIGHT_BG,
+    "dark_background": CONF_DARK_BG,
+}
+
+# Below this many variants a process pool costs more than it saves
+POOL_THRESHOLD = 8
+
+
+def parse_color(value):
+    """Parse "R, G, B", "#RRGGBB" or a 3-item list into [r, g, b]."""
+    if isinstance(value, (list, tuple)):
+        parts = list(value)
+    elif isinstance(value, str) and re.fullmatch(r"#?[0-9a-fA-F]{6}", value.strip()):
+        text = value.strip().lstrip("#")
+        parts = [int(text[i:i + 2], 16) for i in (0, 2, 4)]
+    else:
+        parts = str(value).split(",")
+    try:
+        rgb = [int(str(part).strip()) for part in parts]
+    except ValueError:
+        rgb = []
+    if len(rgb) != 3 or not all(0 <= c <= 255 for c in rgb):
+        raise ValueError(f"invalid color {value!r}")
+    return rgb
+
+
+def parse_tiers(value):
+    """Parse a tier list ("full", "lite", "all", "full+lite" or a list)."""
+    if value in (None, "", "all"):
+        return list(TIERS)
+    tiers = value if isinstance(value, (list, tuple)) else re.split(r"[+\s,;]+", str(value).strip())
+    tiers = [tier.lower() for tier in tiers if tier]
+    unknown = [tier for tier in tiers if tier not in TIERS]
+    if unknown or not tiers:
+        raise ValueError(f"invalid tiers {value!r}, expected {', '.join(TIERS)} or all")
+    return tiers
+
+
+def parse_variant(raw, index=0):
+    """Validate one variant and return it normalized."""
+    name = " ".join(str(raw.get("name") or DEFAULT_PROFILE_NAME).split())
+    if not re.match(PROFILE_NAME_PATTERN, name):
+        raise ValueError(f"variant {index + 1}: invalid name {name!r}")
+
+    variant = {"name": name, "tiers": None, "options": {}}
+    try:
+        variant["tiers"] = parse_tiers(raw.get("tiers"))
+        for field, option in VARIANT_FIELDS.items():
+            value = raw.get(field)
+            if value in (None, ""):
+                continue
+            variant["options"][option] = parse_color(value) if field.endswith("_primary") else str(value)
+    except ValueError as err:
+        raise ValueError(f"variant {index + 1} ({name}): {err}") from err
+    return variant
+
+
+def load_batch(path):
+    """Read the raw variants of a JSON or CSV batch file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            return list(csv.DictReader(f))
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("variants", [])
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of variants")
+    return data
+
+
+def check_theme(content, theme_name):
+    """Return the problems found in a rendered theme."""
+    import yaml  # PyYAML, only needed for --check
+
+    try:
+        themes = yaml.load(content, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    except yaml.YAMLError as err:
+        return [f"not valid YAML: {err}"]
+    if not isinstance(themes, dict) or list(themes) != [theme_name]:
+        return [f"expected a single theme named {theme_name!r}"]
+    modes = (themes[theme_name] or {}).get("modes") or {}
+    return [f"mode {mode!r} missing" for mode in ("light", "dark") if not isinstance(modes.get(mode), dict)]
+
+
+def render_variant(variant, output_dir=None, check=False):
+    """Render one variant and write it into output_dir. Runs in a worker process."""
+    resolved = resolve_options(variant["options"])
+    light_palette = generate_hex_palette(resolved[CONF_LIGHT_PRIMARY])
+    dark_palette = generate_hex_palette(resolved[CONF_DARK_PRIMARY])
+
+    result = {"name": variant["name"], "files": {}, "errors": []}
+    for content_template, output_filename, theme_name in profile_outputs(variant["name"], variant["tiers"]):
+        content = render_theme(content_template, output_filename, resolved, light_palette, dark_palette, None, theme_name)
+        if content is None:
+            result["errors"].append(f"{output_filename}: split marker {SPLIT_MARKER!r} not found")
+            continue
+        if check:
+            result["errors"].extend(f"{output_filename}: {problem}" for problem in check_theme(content, theme_name))
+
+        if output_dir is None:
+            written = len(content.encode("utf-8"))
+        else:
+            written = write_theme_to(output_dir, output_filename, content)
+            if written is None:
+                result["errors"].append(f"{output_filename}: could not be written")
+        result["files"][output_filename] = written
+    return result
+
+
+def render_variants(variants, output_dir=None, check=False, workers=None):
+    """Render all variants, on a process pool for large batches."""
+    job = functools.partial(render_variant, output_dir=output_dir, check=check)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(variants) < POOL_THRESHOLD:
+        return [job(variant) for variant in variants]
+
+    chunksize = max(1, len(variants) // (workers * 4))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(job, variants, chunksize=chunksize))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m frosted_glass_manager.render",
+        description=__doc__.splitlines()[0],
+    )
+    parser.add_argument("--batch", help="JSON or CSV file with one variant per entry/row")
+    parser.add_argument("--name", help=f"profile name (default {DEFAULT_PROFILE_NAME})")
+    parser.add_argument("--light-primary", help="light mode seed color")
+    parser.add_argument("--dark-primary", help="dark mode seed color")
+    parser.add_argument("--light-background", help="light mode background URL")
+    parser.add_argument("--dark-background", help="dark mode background URL")
+    parser.add_argument("--tiers", default="all", help="full, lite, all or full+lite (default all)")
+    parser.add_argument("-o", "--output-dir", default="themes", help="where to write the YAML files (default ./themes)")
+    parser.add_argument("--no-write", action="store_true", help="render only, do not write files")
+    parser.add_argument("--check", action="store_true", help="parse every rendered theme with PyYAML")
+    parser.add_argument("--workers", type=int, help="worker processes for batches (default: CPU count)")
+    parser.add_argument("--json", dest="json_path", help="also write a JSON report to this file")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the summary and errors")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        if args.batch:
+            raw_variants = load_batch(args.batch)
+        else:
+            raw_variants = [
+                {
+                    "name": args.name,
+                    "light_primary": args.light_primary,
+                    "dark_primary": args.dark_primary,
+                    "light_background": args.light_background,
+                    "dark_background": args.dark_background,
+                    "tiers": args.tiers,
+                }
+            ]
+        variants = [parse_variant(raw, index) for index, raw in enumerate(raw_variants)]
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+
+    if args.check:
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            parser.error("--check needs PyYAML (pip install pyyaml)")
+
+    output_dir = None if args.no_write else args.output_dir
+    start = time.perf_counter()
+    results = render_variants(variants, output_dir, args.check, args.workers)
+    elapsed = time.perf_counter() - start
+
+    failed = [result for result in results if result["errors"]]
+    for result in results:
+        if not args.quiet:
+            files = ", ".join(f"{filename} ({size} B)" for filename, size in result["files"].items())
+            print(f"{result['name']}: {files}")
+        for error in result["errors"]:
+            print(f"ERROR {result['name']}: {error}", file=sys.stderr)
+
+    files = sum(len(result["files"]) for result in results)
+    print(f"{len(results)} variants, {files} themes in {elapsed:.2f} s, {len(failed)} failed")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"elapsed_s": round(elapsed, 3), "results": results}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
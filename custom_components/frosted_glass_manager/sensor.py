@@ -0,0 +1,317 @@
+"""Diagnostic sensors for the Frosted Glass Theme Manager."""
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import slugify
+
+from .const import (
+    CONTRAST_REPORTED,
+    DOMAIN,
+    SIGNAL_DEVICE_ADDED,
+    SIGNAL_DEVICE_UPDATED,
+    SIGNAL_STATS_UPDATED,
+)
+from .generator import get_profile_name, profile_outputs, profile_variants
+
+
+def _duration(key, name, icon="mdi:timer-outline"):
+    return SensorEntityDescription(
+        key=key,
+        name=name,
+        icon=icon,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    )
+
+
+def _counter(key, name, icon):
+    return SensorEntityDescription(
+        key=key,
+        name=name,
+        icon=icon,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    )
+
+
+# (description, value from GenerationStats, extra attributes from GenerationStats)
+SENSORS = (
+    (_duration("generation_duration", "Generation duration"), lambda s: s.total_ms, None),
+    (_duration("palette_duration", "Palette duration", "mdi:palette"), lambda s: s.palette_ms, None),
+    (_duration("render_duration", "Render duration", "mdi:file-code-outline"), lambda s: s.render_ms, None),
+    (_duration("write_duration", "Write duration", "mdi:content-save-outline"), lambda s: s.write_ms, None),
+    (
+        _duration("apply_duration", "Apply latency", "mdi:timer-check-outline"),
+        lambda s: s.apply_ms.get("total"),
+        lambda s: {name: value for name, value in s.apply_ms.items() if name != "total"},
+    ),
+    (
+        _counter("cache_hits", "Cache hits", "mdi:database-check-outline"),
+        lambda s: s.cache_total("hits"),
+        lambda s: {name: info["hits"] for name, info in s.cache.items()},
+    ),
+    (
+        _counter("cache_misses", "Cache misses", "mdi:database-remove-outline"),
+        lambda s: s.cache_total("misses"),
+        lambda s: {name: info["misses"] for name, info in s.cache.items()},
+    ),
+    (_counter("reload_calls", "Theme reloads", "mdi:reload"), lambda s: s.reload_calls, None),
+    (
+        SensorEntityDescription(
+            key="bytes_stylesheets",
+            name="Stylesheets size",
+            icon="mdi:language-css3",
+            device_class=SensorDeviceClass.DATA_SIZE,
+            native_unit_of_measurement=UnitOfInformation.BYTES,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+        ),
+        lambda s: sum(s.stylesheet_bytes.values()) if s.stylesheet_bytes else None,
+        lambda s: dict(s.stylesheet_bytes),
+    ),
+    (
+        SensorEntityDescription(
+            key="low_contrast_pairs",
+            name="Low-contrast pairs",
+            icon="mdi:contrast-box",
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+        ),
+        lambda s: len(s.contrast),
+        lambda s: {"lowest": s.contrast[:CONTRAST_REPORTED]},
+    ),
+    (
+        SensorEntityDescription(
+            key="last_generation",
+            name="Last successful generation",
+            icon="mdi:clock-check-outline",
+            device_class=SensorDeviceClass.TIMESTAMP,
+            entity_category=EntityCategory.DIAGNOSTIC,
+        ),
+        lambda s: s.last_success,
+        None,
+    ),
+)
+
+
+# Per browser reporting frame timings: (description, value from its telemetry record)
+DEVICE_SENSORS = (
+    (
+        SensorEntityDescription(
+            key="frame_rate",
+            name="Frame rate",
+            icon="mdi:speedometer",
+            native_unit_of_measurement="fps",
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            suggested_display_precision=1,
+        ),
+        lambda d: d["fps"],
+    ),
+    (_duration("frame_time_p95", "Frame time (95th percentile)", "mdi:timer-sand"), lambda d: d["frame_p95_ms"]),
+    (_duration("long_task_time", "Long task time", "mdi:timer-alert-outline"), lambda d: d["long_task_ms"]),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up the diagnostic sensors."""
+    stats = hass.data[DOMAIN].stats[entry.entry_id]
+
+    entities = [
+        FrostedGlassStatsSensor(entry, stats, description, value_fn, attr_fn)
+        for description, value_fn, attr_fn in SENSORS
+    ]
+    async_add_entities(entities)
+
+    # One size sensor per written theme file: the variants' tiers and the dashboard themes
+    sized = set()
+
+    @callback
+    def async_add_bytes_sensors(output_filenames):
+        """Add the size sensors of theme files that have none yet."""
+        new = [output_filename for output_filename in output_filenames if output_filename not in sized]
+        sized.update(new)
+        if new:
+            async_add_entities(
+                FrostedGlassBytesSensor(entry, stats, output_filename, output_filename.removesuffix(".yaml"))
+                for output_filename in new
+            )
+
+    async_add_bytes_sensors(
+        [
+            output_filename
+            for _, variant_name, _ in profile_variants(get_profile_name(entry), entry.options)
+            for _, output_filename, _ in profile_outputs(variant_name)
+        ]
+        + list(stats.bytes_written)
+    )
+
+    @callback
+    def async_stats_updated():
+        """Add size sensors for theme files written for the first time (e.g. a new dashboard)."""
+        async_add_bytes_sensors(list(stats.bytes_written))
+
+    entry.async_on_unload(async_dispatcher_connect(hass, f"{SIGNAL_STATS_UPDATED}_{entry.entry_id}", async_stats_updated))
+
+    telemetry = hass.data[DOMAIN].telemetry
+    # Browsers with sensors here: one that comes back from another profile keeps them
+    measured = set()
+
+    @callback
+    def async_add_device(device_id):
+        """Add the sensors of a browser that reported to this profile, unless it has them."""
+        if device_id in measured:
+            return
+        measured.add(device_id)
+        async_add_entities(
+            FrostedGlassDeviceSensor(entry, telemetry, device_id, description, value_fn)
+            for description, value_fn in DEVICE_SENSORS
+        )
+
+    for device_id, device in list(telemetry.devices.items()):
+        if device["entry_id"] == entry.entry_id:
+            async_add_device(device_id)
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, f"{SIGNAL_DEVICE_ADDED}_{entry.entry_id}", async_add_device)
+    )
+
+
+class FrostedGlassStatsSensor(SensorEntity):
+    """A sensor reporting one generation statistic."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(self, entry, stats, description, value_fn, attr_fn=None):
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._entry = entry
+        self._stats = stats
+        self._value_fn = value_fn
+        self._attr_fn = attr_fn
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+            manufacturer="Frosted Glass",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    @property
+    def native_value(self):
+        """Return the current value."""
+        return self._value_fn(self._stats)
+
+    @property
+    def extra_state_attributes(self):
+        """Return per-cache breakdowns where available."""
+        if self._attr_fn is None:
+            return None
+        return self._attr_fn(self._stats)
+
+    async def async_added_to_hass(self):
+        """Subscribe to statistics updates."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, f"{SIGNAL_STATS_UPDATED}_{self._entry.entry_id}", self._async_stats_updated
+            )
+        )
+
+    @callback
+    def _async_stats_updated(self):
+        self.async_write_ha_state()
+
+
+class FrostedGlassBytesSensor(FrostedGlassStatsSensor):
+    """Bytes written for one generated theme file."""
+
+    def __init__(self, entry, stats, output_filename, theme_name):
+        """Initialize the sensor."""
+        description = SensorEntityDescription(
+            key=f"bytes_{slugify(theme_name)}",
+            name=f"{theme_name} size",
+            icon="mdi:file-document-outline",
+            device_class=SensorDeviceClass.DATA_SIZE,
+            native_unit_of_measurement=UnitOfInformation.BYTES,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+        )
+        super().__init__(entry, stats, description, lambda s: s.bytes_written.get(output_filename))
+
+
+class FrostedGlassDeviceSensor(SensorEntity):
+    """Frame timings of one browser, from its last telemetry report."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(self, entry, telemetry, device_id, description, value_fn):
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._entry = entry
+        self._telemetry = telemetry
+        self._device_id = device_id
+        self._value_fn = value_fn
+        self._attr_unique_id = f"{entry.entry_id}_{device_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"{entry.entry_id}_{device_id}")},
+            name=telemetry.devices[device_id]["name"],
+            manufacturer="Frosted Glass",
+            model="Browser",
+            via_device=(DOMAIN, entry.entry_id),
+        )
+
+    @property
+    def _device(self):
+        device = self._telemetry.devices.get(self._device_id)
+        # A browser that reports to another profile now, or was dropped, is no longer measured here
+        return device if device is not None and device["entry_id"] == self._entry.entry_id else None
+
+    @property
+    def available(self):
+        """Return whether the browser still reports to this profile."""
+        return self._device is not None
+
+    @property
+    def native_value(self):
+        """Return the value of the last report."""
+        device = self._device
+        return round(self._value_fn(device), 3) if device is not None else None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the theme and tiers of the last report."""
+        device = self._device
+        if device is None:
+            return None
+        return {
+            "theme": device["theme"],
+            "tier": device["tier"],
+            "assigned_tier": device["assigned_tier"],
+            "frames": device["frames"],
+            "long_tasks": device["long_tasks"],
+            "reports": device["reports"],
+        }
+
+    async def async_added_to_hass(self):
+        """Subscribe to the browser's reports."""
+        self.async_on_remove(
+            async_dispatcher_connect(self.hass, f"{SIGNAL_DEVICE_UPDATED}_{self._device_id}", self._async_device_updated)
+        )
+
+    @callback
+    def _async_device_updated(self):
+        self.async_write_ha_state()
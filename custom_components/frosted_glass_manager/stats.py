@@ -0,0 +1,68 @@
+"""Performance counters for the Frosted Glass Theme Manager."""
+from homeassistant.util import dt as dt_util
+
+
+class GenerationStats:
+    """Timings and counters of the last theme generation."""
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.palette_ms = None
+        self.render_ms = None
+        self.write_ms = None
+        self.total_ms = None
+        self.bytes_written = {}
+        self.stylesheet_bytes = {}
+        self.cache = {}
+        self.generations = 0
+        self.reload_calls = 0
+        self.last_success = None
+        self.contrast = []
+        # Spans (ms) of the last apply, from the request to the themes reaching the frontend
+        self.apply_ms = {}
+
+    def record(self, result, cache, wall_seconds):
+        """
+        Record the result of a generate_profiles run and the wall time of its pass.
+
+        Palette, render and write times are summed over the files, whose
+        writes overlap on a thread pool, so they may add up to more than the
+        wall time.
+        """
+        self.palette_ms = round(result["palette"] * 1000, 3)
+        self.render_ms = round(result["render"] * 1000, 3)
+        self.write_ms = round(result["write"] * 1000, 3)
+        self.total_ms = round(wall_seconds * 1000, 3)
+        self.bytes_written = dict(result["bytes_written"])
+        self.stylesheet_bytes = dict(result.get("stylesheet_bytes", {}))
+        self.cache = cache
+        if "contrast" in result:
+            self.contrast = result["contrast"]
+        self.generations += 1
+        if result["success"]:
+            self.last_success = dt_util.utcnow()
+
+    def record_apply(self, durations_ms):
+        """Record the spans of the last apply (see ThemeManager._async_applied)."""
+        self.apply_ms = dict(durations_ms)
+
+    def cache_total(self, field):
+        """Sum a counter (hits/misses) over all caches."""
+        return sum(info[field] for info in self.cache.values())
+
+    def as_dict(self):
+        """Return the statistics as a JSON-friendly dict."""
+        return {
+            "palette_ms": self.palette_ms,
+            "render_ms": self.render_ms,
+            "write_ms": self.write_ms,
+            "total_ms": self.total_ms,
+            "bytes_written": self.bytes_written,
+            "stylesheet_bytes": self.stylesheet_bytes,
+            "cache": self.cache,
+            "generations": self.generations,
+            "reload_calls": self.reload_calls,
+            "contrast": self.contrast,
+            "apply_ms": self.apply_ms,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+        }
@@ -0,0 +1,194 @@
+"""Card-mod CSS served as static, content-hashed stylesheets.
+
+The card-mod-card and card-mod-root blocks are most of a theme. In stylesheet
+mode each block is written once as <sha1>.css (with precompressed .gz and,
+when brotli is installed, .br siblings) and the theme only keeps an @import of
+its URL. Browsers cache the files for good: a changed block gets a new name.
+The blocks are cut out of the template's model once and rendered on their own.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+from .const import STYLESHEET_KEYS, STYLESHEET_RETENTION, STYLESHEET_URL, THEME_NAME_PREFIX
+from .engine import compile_fragment, compile_model, template_defaults
+from .model import CssBlock, template_cache, theme_model
+
+_LOGGER = logging.getLogger(__name__)
+
+# Indentation of the non-blank lines, each searched from the newline before it
+BLOCK_INDENT_PATTERN = re.compile(r"\n( *)[^ \n]")
+STYLESHEET_NAME_PATTERN = re.compile(r"^[0-9a-f]{16}\.css$")
+# Stands in for the name of a template's nth stylesheet until its CSS is rendered
+STYLESHEET_PLACEHOLDER = "<stylesheet {}>"
+IMPORT_PATTERN = re.compile(re.escape(STYLESHEET_URL) + r"/([0-9a-f]{16}\.css)")
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+
+def _brotli_compress(data):
+    """Return data compressed with brotli, or None when brotli is not installed."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def _dedent(block):
+    block = "\n" + block
+    depth = min((len(indent) for indent in BLOCK_INDENT_PATTERN.findall(block)), default=0)
+    return block.replace("\n" + " " * depth, "\n").strip("\n") + "\n"
+
+
+def split_model(model):
+    """
+    Cut the card-mod blocks out of a theme model.
+
+    Returns a copy of the model with an @import of STYLESHEET_PLACEHOLDER
+    (formatted with the block's index) as the body of each block, and
+    [(mode, CSS template)]. The copy shares all other tokens.
+    """
+    model = model.copy()
+    blocks = []
+    for mode in model.modes.values():
+        for position, block in enumerate(mode.tokens):
+            if not isinstance(block, CssBlock) or block.name not in STYLESHEET_KEYS:
+                continue
+            if block.header.split(":", 1)[1].strip() != "|":
+                continue
+            # Trailing whitespace is not part of the CSS
+            blocks.append((mode.name, _dedent(block.css.rstrip() + "\n")))
+            indent = block.header[: len(block.header) - len(block.header.lstrip(" "))]
+            url = f"{STYLESHEET_URL}/{STYLESHEET_PLACEHOLDER.format(len(blocks) - 1)}"
+            # By position: the copy is not compiled yet, and a mode may repeat a key
+            mode.tokens[position] = block.with_lines([f"{indent}  @import url(\"{url}\");\n"])
+    return model, blocks
+
+
+@template_cache
+def compile_stylesheet_template(content_template):
+    """
+    Compile a template in stylesheet mode: (theme, [CSS of each card-mod block]).
+
+    The blocks are compiled like the mode they belong to, so rendering them
+    gives the same CSS the inline theme has; the theme's other tokens reuse
+    the scans of the inline theme. None if the template has no dark mode.
+    """
+    model = theme_model(content_template)
+    if model is None:
+        return None
+    theme, blocks = split_model(model)
+    mode_defaults = template_defaults(content_template)
+    return compile_model(theme), [compile_fragment(text, mode, mode_defaults[mode]) for mode, text in blocks]
+
+
+def stylesheet_filename(css):
+    """Name a stylesheet after its content."""
+    return f"{hashlib.sha1(css.encode('utf-8')).hexdigest()[:16]}.css"
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_stylesheets(directory, sheets):
+    """
+    Write stylesheets that do not exist yet, with their compressed siblings.
+
+    A stylesheet's name is its content hash, so an existing file is current;
+    its modification time is refreshed to keep it from being cleaned up.
+    Returns True when all of them are in place.
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        for filename, css in sheets.items():
+            path = os.path.join(directory, filename)
+            if os.path.exists(path):
+                os.utime(path)
+                continue
+            data = css.encode("utf-8")
+            _write_atomic(f"{path}.gz", gzip.compress(data, 9, mtime=0))
+            compressed = _brotli_compress(data)
+            if compressed is not None:
+                _write_atomic(f"{path}.br", compressed)
+            # Written last: its presence means the siblings are complete
+            _write_atomic(path, data)
+    except OSError as err:
+        _LOGGER.error(f"Frosted Glass Manager: Error writing stylesheets: {err}")
+        return False
+    return True
+
+
+def referenced_stylesheets(themes_dir):
+    """Return the stylesheet names imported by the Frosted Glass theme files."""
+    referenced = set()
+    try:
+        names = os.listdir(themes_dir)
+    except OSError:
+        return referenced
+    for name in names:
+        if name.startswith(THEME_NAME_PREFIX) and name.endswith(".yaml"):
+            try:
+                with open(os.path.join(themes_dir, name), encoding="utf-8") as f:
+                    referenced.update(IMPORT_PATTERN.findall(f.read()))
+            except OSError:
+                continue
+    return referenced
+
+
+def missing_stylesheets(directory, themes_dir, filenames):
+    """Return whether a theme among filenames imports a stylesheet that is gone."""
+    for name in filenames:
+        try:
+            with open(os.path.join(themes_dir, name), encoding="utf-8") as f:
+                imported = IMPORT_PATTERN.findall(f.read())
+        except OSError:
+            continue
+        if any(not os.path.exists(os.path.join(directory, sheet)) for sheet in imported):
+            return True
+    return False
+
+
+def remove_unused_stylesheets(directory, themes_dir):
+    """
+    Delete stylesheets no theme imports that were last used before the retention period.
+
+    Clients still on an older theme and restored versions keep working in the
+    meantime. Returns the number removed.
+    """
+    cutoff = time.time() - STYLESHEET_RETENTION
+    try:
+        expired = [
+            name
+            for name in os.listdir(directory)
+            if STYLESHEET_NAME_PATTERN.match(name) and os.path.getmtime(os.path.join(directory, name)) < cutoff
+        ]
+    except OSError:
+        return 0
+    if not expired:
+        return 0
+    # Themes are only read when a stylesheet is old enough to go
+    referenced = referenced_stylesheets(themes_dir)
+    removed = 0
+    for name in expired:
+        path = os.path.join(directory, name)
+        try:
+            if name in referenced:
+                # Still in use: not looked at again for another retention period
+                os.utime(path)
+                continue
+            os.remove(path)
+            for suffix in COMPRESSED_SUFFIXES:
+                if os.path.exists(f"{path}{suffix}"):
+                    os.remove(f"{path}{suffix}")
+            removed += 1
+        except OSError as err:
+            _LOGGER.warning(f"Frosted Glass Manager: Could not remove stylesheet {name}: {err}")
+    return removed
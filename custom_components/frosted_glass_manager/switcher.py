@@ -0,0 +1,151 @@
+"""Switch between the pre-rendered time-of-day variants of a profile."""
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_track_state_change_event, async_track_time_change
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_AUTO_SWITCH,
+    CONF_DAY_START,
+    CONF_DUSK_START,
+    CONF_NIGHT_START,
+    AUTO_SWITCH_SUN,
+    DATA_THEMES,
+    DEFAULT_DAY_START,
+    DEFAULT_DUSK_START,
+    DEFAULT_NIGHT_START,
+    SUN_ENTITY_ID,
+    SUN_DUSK_ELEVATION,
+    SUN_NIGHT_ELEVATION,
+    TIER_FULL,
+    VARIANT_DAY,
+    VARIANT_DUSK,
+    VARIANT_NIGHT,
+)
+from .generator import get_profile_name, profile_outputs, profile_variants
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class VariantSwitcher:
+    """
+    Makes the active variant of a profile the default theme.
+
+    The variants are rendered with the profile, so a switch is a single
+    frontend.set_theme call: no render, no disk I/O and no reload_themes.
+    A switch that could not be made (e.g. before the pass writing the variant
+    ran) is made once themes are reloaded, see async_update.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+        """Initialize the switcher."""
+        self.hass = hass
+        self.entry = entry
+        self.mode = entry.options.get(CONF_AUTO_SWITCH)
+        self.active = None
+        # The variant being switched to while frontend.set_theme runs
+        self._switching = None
+        self.switches = 0
+        self._unsubs = []
+
+    @callback
+    def async_start(self):
+        """Follow the sun or the schedule and apply the current variant."""
+        if self.mode == AUTO_SWITCH_SUN:
+            self._unsubs.append(async_track_state_change_event(self.hass, [SUN_ENTITY_ID], self._async_changed))
+        else:
+            for start in self._schedule():
+                self._unsubs.append(
+                    async_track_time_change(
+                        self.hass, self._async_changed, hour=start[0].hour, minute=start[0].minute, second=start[0].second
+                    )
+                )
+        self.hass.async_create_task(self.async_apply(self.current_variant()))
+
+    @callback
+    def async_stop(self):
+        """Stop following the sun or the schedule."""
+        while self._unsubs:
+            self._unsubs.pop()()
+
+    def _schedule(self):
+        """Return [(start time, variant)] sorted by time."""
+        starts = []
+        for key, default, variant in (
+            (CONF_DAY_START, DEFAULT_DAY_START, VARIANT_DAY),
+            (CONF_DUSK_START, DEFAULT_DUSK_START, VARIANT_DUSK),
+            (CONF_NIGHT_START, DEFAULT_NIGHT_START, VARIANT_NIGHT),
+        ):
+            start = dt_util.parse_time(str(self.entry.options.get(key, default))) or dt_util.parse_time(default)
+            starts.append((start, variant))
+        return sorted(starts, key=lambda item: item[0])
+
+    def current_variant(self):
+        """Return the variant that should be active now."""
+        if self.mode == AUTO_SWITCH_SUN:
+            state = self.hass.states.get(SUN_ENTITY_ID)
+            if state is None:
+                return VARIANT_DAY
+            elevation = state.attributes.get("elevation")
+            if elevation is None:
+                return VARIANT_DAY if state.state == "above_horizon" else VARIANT_NIGHT
+            if elevation >= SUN_DUSK_ELEVATION:
+                return VARIANT_DAY
+            return VARIANT_DUSK if elevation > SUN_NIGHT_ELEVATION else VARIANT_NIGHT
+
+        schedule = self._schedule()
+        now = dt_util.now().time()
+        # Before the first start of the day the last variant of yesterday is still active
+        active = schedule[-1][1]
+        for start, variant in schedule:
+            if now >= start:
+                active = variant
+        return active
+
+    def theme_name(self, variant):
+        """Return the name of the full theme of a variant."""
+        for name_variant, variant_name, _ in profile_variants(get_profile_name(self.entry), self.entry.options):
+            if name_variant == variant:
+                return profile_outputs(variant_name, [TIER_FULL])[0][2]
+        return None
+
+    @callback
+    def async_update(self):
+        """Switch to the current variant unless it is active, e.g. after the sun moved or themes were reloaded."""
+        variant = self.current_variant()
+        if variant not in (self.active, self._switching):
+            self.hass.async_create_task(self.async_apply(variant))
+
+    @callback
+    def _async_changed(self, *args):
+        self.async_update()
+
+    async def async_apply(self, variant):
+        """
+        Make a variant the default theme of light and dark mode, unless it already is.
+
+        The variant only becomes active once the frontend switched to it; a
+        theme the frontend has not loaded yet is left for async_update.
+        """
+        theme_name = self.theme_name(variant)
+        if variant in (self.active, self._switching) or theme_name is None:
+            return
+        if theme_name not in self.hass.data.get(DATA_THEMES, {}):
+            _LOGGER.debug(f"Frosted Glass Manager: {theme_name} is not loaded yet, switching once it is")
+            return
+        _LOGGER.debug(f"Frosted Glass Manager: Switching to {theme_name}")
+        self._switching = variant
+        try:
+            await self.hass.services.async_call(
+                "frontend", "set_theme", {"name": theme_name, "name_dark": theme_name}, blocking=True
+            )
+        except HomeAssistantError as err:
+            _LOGGER.warning(f"Frosted Glass Manager: Could not switch to {theme_name}: {err}")
+            return
+        finally:
+            self._switching = None
+        self.active = variant
+        self.switches += 1
@@ -0,0 +1,109 @@
+"""Frame timings reported by the browsers showing the themes, and the tier each browser gets.
+
+The frontend module (frontend/frame-telemetry.js) samples requestAnimationFrame
+intervals and long tasks for a few seconds after a dashboard loads and sends
+one summary per sample. Tiers are ordered as in THEME_VARIANTS, richest
+(Full) first. A browser that stays below the target frame rate for
+TIER_DOWNGRADE_REPORTS reports in a row moves down one tier; one that meets
+it on a richer tier than assigned moves back up. So each browser ends up on
+the richest tier that meets the target, or on the cheapest one.
+"""
+import hashlib
+import os
+import time
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    FRONTEND_DIRNAME,
+    TELEMETRY_MAX_DEVICES,
+    TELEMETRY_MODULE,
+    TELEMETRY_STORAGE_KEY,
+    TELEMETRY_STORAGE_VERSION,
+    TIER_DOWNGRADE_REPORTS,
+)
+from .templates import THEME_VARIANTS
+
+MODULE_PATH = os.path.join(os.path.dirname(__file__), FRONTEND_DIRNAME, TELEMETRY_MODULE)
+# Fields of a report kept per browser
+REPORT_FIELDS = ("fps", "frame_p95_ms", "frames", "duration_ms", "long_tasks", "long_task_ms")
+
+
+def module_version():
+    """Return a short hash of the frontend module, appended to its URL so browsers fetch a changed module."""
+    with open(MODULE_PATH, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def tier_order():
+    """Return the tiers, richest first."""
+    return [tier for tier, _, _ in THEME_VARIANTS]
+
+
+def next_tier(tier):
+    """Return the tier after tier, or None for the cheapest."""
+    tiers = tier_order()
+    position = tiers.index(tier) + 1
+    return tiers[position] if position < len(tiers) else None
+
+
+class FrameTelemetry:
+    """The browsers that reported frame timings, kept in storage."""
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize empty telemetry."""
+        self._store = Store(hass, TELEMETRY_STORAGE_VERSION, TELEMETRY_STORAGE_KEY)
+        # device_id -> {"name", "entry_id", "theme", "tier", "assigned_tier", "slow", "reports", "time", *REPORT_FIELDS}
+        self.devices = {}
+
+    async def async_load(self):
+        """Load the known browsers from storage."""
+        data = await self._store.async_load()
+        if isinstance(data, dict):
+            self.devices = data
+
+    def record(self, device_id, entry_id, report, tier):
+        """Store a report of a browser; tier is that of the theme it showed, None if not ours. Returns the browser."""
+        device = self.devices.pop(device_id, None) or {"assigned_tier": None, "slow": 0, "reports": 0}
+        device.update({field: report[field] for field in REPORT_FIELDS})
+        device.update(
+            name=report["name"],
+            entry_id=entry_id,
+            theme=report["theme"],
+            tier=tier,
+            reports=device["reports"] + 1,
+            time=time.time(),
+        )
+        # Most recent last, so the oldest are dropped first
+        self.devices[device_id] = device
+        while len(self.devices) > TELEMETRY_MAX_DEVICES:
+            del self.devices[next(iter(self.devices))]
+        self._store.async_delay_save(lambda: self.devices, 10)
+        return device
+
+    def assign_tier(self, device_id, tier, target_fps):
+        """Return the tier a browser should use after its report on tier, updating its assigned tier."""
+        device = self.devices[device_id]
+        tiers = tier_order()
+        # None as well when the tier's template was removed
+        assigned = device["assigned_tier"] if device["assigned_tier"] in tiers else None
+        richer = assigned is not None and tiers.index(tier) < tiers.index(assigned)
+        if device["fps"] >= target_fps:
+            device["slow"] = 0
+            if assigned is None or richer:
+                assigned = tier
+            # A cheaper tier than assigned was picked by hand: it stays
+            choice = tier
+        elif richer:
+            # Known to be too slow here (e.g. after the default theme changed)
+            device["slow"] = 0
+            choice = assigned
+        else:
+            device["slow"] += 1
+            choice = tier
+            if device["slow"] >= TIER_DOWNGRADE_REPORTS and next_tier(tier) is not None:
+                device["slow"] = 0
+                assigned = choice = next_tier(tier)
+        device["assigned_tier"] = assigned
+        return choice
@@ -0,0 +1,46 @@
+"""Registry of the theme templates.
+
+Every tier is an upstream Frosted Glass theme file under templates/, stored as
+released (the top-level key is replaced by the theme name when rendering):
+full.yaml is the Full theme and any other <tier>.yaml adds a tier whose themes
+are named "... <Tier>". The engine finds the replaceable texts on its own (the
+default primary color and background image of each mode, the DEFAULT_PALETTE
+hexes and the glass tuning texts), so a new upstream release is a file update
+and a new tier a new file. Templates are read once on import and compiled once
+per content.
+"""
+import os
+
+from .const import DEFAULT_PROFILE_NAME, TEMPLATE_DIRNAME, THEME_NAME_PREFIX, TIER_FULL
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), TEMPLATE_DIRNAME)
+TEMPLATE_SUFFIX = ".yaml"
+
+
+def tier_suffix(tier):
+    """Return the theme name suffix of a tier: none for Full, " Lite" for lite and so on."""
+    if tier == TIER_FULL:
+        return ""
+    return " " + tier.replace("_", " ").title()
+
+
+def load_templates(directory=TEMPLATE_DIR):
+    """Return (tier, template, theme name suffix) of every template file in directory, Full first."""
+    tiers = sorted(
+        (name[:-len(TEMPLATE_SUFFIX)] for name in os.listdir(directory) if name.endswith(TEMPLATE_SUFFIX)),
+        key=lambda tier: (tier != TIER_FULL, tier),
+    )
+    variants = []
+    for tier in tiers:
+        with open(os.path.join(directory, f"{tier}{TEMPLATE_SUFFIX}"), encoding="utf-8") as f:
+            variants.append((tier, f.read(), tier_suffix(tier)))
+    return tuple(variants)
+
+
+# (tier, template, theme name suffix)
+THEME_VARIANTS = load_templates()
+# The outputs of the default profile: (template, filename)
+THEME_OUTPUTS = tuple(
+    (content_template, f"{THEME_NAME_PREFIX} {DEFAULT_PROFILE_NAME}{suffix}.yaml")
+    for _, content_template, suffix in THEME_VARIANTS
+)
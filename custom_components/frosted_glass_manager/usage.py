@@ -0,0 +1,36 @@
+"""Find the Frosted Glass themes that are in use.
+
+A theme counts as used when its name appears in synced frontend user data, in
+a dashboard (view themes), or in automations, scripts and scenes
+(frontend.set_theme). The files are not parsed: every "Frosted Glass ..."
+string is collected, which also works for YAML with custom tags.
+"""
+import glob
+import logging
+import os
+import re
+
+from .const import THEME_NAME_PREFIX, THEME_USAGE_SOURCES
+
+_LOGGER = logging.getLogger(__name__)
+
+# The name runs up to a quote, line end or YAML/JSON delimiter
+THEME_REFERENCE_PATTERN = re.compile(re.escape(THEME_NAME_PREFIX) + r"[^'\"\n\r,{}\[\]#]*")
+
+
+def referenced_themes(text):
+    """Return every Frosted Glass theme name mentioned in text."""
+    return {match.group().strip() for match in THEME_REFERENCE_PATTERN.finditer(text)}
+
+
+def themes_in_use(config_dir):
+    """Return the Frosted Glass theme names referenced by the usage sources. Runs in the executor."""
+    used = set()
+    for pattern in THEME_USAGE_SOURCES:
+        for path in glob.glob(os.path.join(config_dir, pattern)):
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    used |= referenced_themes(f.read())
+            except OSError as err:
+                _LOGGER.debug(f"Frosted Glass Manager: Could not read {path}: {err}")
+    return used
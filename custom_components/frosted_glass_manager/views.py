@@ -0,0 +1,55 @@
+"""HTTP views of the Frosted Glass Theme Manager."""
+import os
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+
+from .const import DOMAIN, STYLESHEET_URL, TELEMETRY_URL
+from .stylesheets import STYLESHEET_NAME_PATTERN
+from .telemetry import MODULE_PATH
+
+# A stylesheet's name is its content hash, so it never changes
+IMMUTABLE_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+class StylesheetView(HomeAssistantView):
+    """
+    Serve the card-mod stylesheets of themes in stylesheet mode.
+
+    No authentication: themes and their CSS are public to the frontend
+    anyway. aiohttp answers with the precompressed .br or .gz sibling when
+    the browser accepts it.
+    """
+
+    url = f"{STYLESHEET_URL}/{{filename}}"
+    name = f"api:{DOMAIN}:stylesheet"
+    requires_auth = False
+
+    def __init__(self, directory):
+        """Initialize the view serving stylesheets from directory."""
+        self.directory = directory
+
+    async def get(self, request: web.Request, filename: str) -> web.StreamResponse:
+        """Return a stylesheet."""
+        if not STYLESHEET_NAME_PATTERN.match(filename):
+            raise web.HTTPNotFound()
+        # FileResponse does its file I/O in the executor and answers 404 for a missing file
+        return web.FileResponse(os.path.join(self.directory, filename), headers=IMMUTABLE_CACHE_HEADERS)
+
+
+class TelemetryModuleView(HomeAssistantView):
+    """
+    Serve the frame telemetry module to the frontend.
+
+    The frontend loads it with the module's hash as query string, so a
+    changed module has a new URL and the cached one can be kept for good.
+    """
+
+    url = TELEMETRY_URL
+    name = f"api:{DOMAIN}:telemetry"
+    requires_auth = False
+
+    async def get(self, request: web.Request) -> web.StreamResponse:
+        """Return the module."""
+        return web.FileResponse(MODULE_PATH, headers=IMMUTABLE_CACHE_HEADERS)
@@ -0,0 +1,117 @@
+"""Watch files of a directory with inotify, without polling.
+
+The directory is watched rather than the files: editors often save by writing
+a new file and renaming it over the old one, and a watched file may not
+exist yet. The inotify descriptor is read by the event loop when the kernel
+has events, so an idle watch costs nothing. Linux only; elsewhere start()
+returns False.
+"""
+import ctypes
+import logging
+import os
+import struct
+
+_LOGGER = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+# The watch is gone: the directory was deleted or moved
+WATCH_GONE = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+# struct inotify_event: wd, mask, cookie, len, then len bytes of NUL-padded name
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+def _libc():
+    """Return libc with the inotify calls, or None when they are not available."""
+    try:
+        # The C library the interpreter is linked against (glibc or musl); no library search
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def parse_events(data):
+    """Return [(mask, name)] of a buffer read from an inotify descriptor."""
+    events = []
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", "surrogateescape")
+        offset += length
+        events.append((mask, name))
+    return events
+
+
+class FileWatcher:
+    """Calls back on the event loop when one of the given files of a directory is written, replaced or deleted."""
+
+    def __init__(self, loop, directory, filenames, callback):
+        """Initialize the watch; callback is called without arguments, on the loop."""
+        self.loop = loop
+        self.directory = directory
+        self.filenames = frozenset(filenames)
+        self.callback = callback
+        self._fd = None
+
+    @property
+    def active(self):
+        """Whether the directory is being watched."""
+        return self._fd is not None
+
+    def start(self):
+        """Start watching. Returns False when inotify is unavailable or the directory cannot be watched."""
+        libc = _libc()
+        if libc is None:
+            return False
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            _LOGGER.warning(f"Frosted Glass Manager: inotify unavailable: {os.strerror(ctypes.get_errno())}")
+            return False
+        if libc.inotify_add_watch(fd, os.fsencode(self.directory), WATCH_MASK) < 0:
+            _LOGGER.warning(f"Frosted Glass Manager: Cannot watch {self.directory}: {os.strerror(ctypes.get_errno())}")
+            os.close(fd)
+            return False
+        self._fd = fd
+        self.loop.add_reader(fd, self._read)
+        return True
+
+    def stop(self):
+        """Stop watching."""
+        if self._fd is None:
+            return
+        self.loop.remove_reader(self._fd)
+        os.close(self._fd)
+        self._fd = None
+
+    def _read(self):
+        """Read the pending events and call back once if a watched file is among them."""
+        try:
+            data = os.read(self._fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as err:
+            _LOGGER.warning(f"Frosted Glass Manager: Stopped watching {self.directory}: {err}")
+            self.stop()
+            return
+        events = parse_events(data)
+        # Events were dropped: any file may have changed
+        touched = any(mask & IN_Q_OVERFLOW or name in self.filenames for mask, name in events)
+        if any(mask & WATCH_GONE for mask, _ in events):
+            _LOGGER.warning(f"Frosted Glass Manager: {self.directory} was removed, changes are no longer picked up")
+            self.stop()
+            touched = True
+        if touched:
+            self.callback()
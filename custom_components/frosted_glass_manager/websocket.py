@@ -0,0 +1,116 @@
+"""Websocket commands of the Frosted Glass Theme Manager."""
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    DOMAIN,
+    CONF_LIGHT_PRIMARY,
+    CONF_LIGHT_BG,
+    CONF_DARK_PRIMARY,
+    CONF_DARK_BG,
+    DEVICE_ID_PATTERN,
+    TIER_FULL,
+)
+from .generator import get_profile_name, preview_theme, profile_outputs, resolve_options
+from .templates import THEME_VARIANTS
+
+RGB_SCHEMA = vol.Any(
+    vol.All([vol.All(vol.Coerce(int), vol.Range(min=0, max=255))], vol.Length(min=3, max=3)),
+    vol.Match(r"^\s*\d{1,3}\s*,\s*\d{1,3}\s*,\s*\d{1,3}\s*$"),
+)
+
+PREVIEW_OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_LIGHT_PRIMARY): RGB_SCHEMA,
+        vol.Optional(CONF_LIGHT_BG): str,
+        vol.Optional(CONF_DARK_PRIMARY): RGB_SCHEMA,
+        vol.Optional(CONF_DARK_BG): str,
+    }
+)
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant):
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, websocket_preview)
+    websocket_api.async_register_command(hass, websocket_frame_report)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/preview",
+        vol.Optional("entry_id"): str,
+        vol.Optional("options", default={}): PREVIEW_OPTIONS_SCHEMA,
+        vol.Optional("tier", default=TIER_FULL): vol.In([tier for tier, _, _ in THEME_VARIANTS]),
+    }
+)
+@websocket_api.async_response
+async def websocket_preview(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg):
+    """
+    Return the palettes, CSS variables and contrast audit candidate options would produce.
+
+    The options are layered over those of the given profile. Nothing is
+    written and themes are not reloaded; the frontend applies the variables to
+    its own document only. Saving the options generates the themes as usual.
+    The preview runs on the manager's worker: the first one after a template
+    or overrides change compiles the template.
+    """
+    manager = hass.data[DOMAIN]
+    options = msg["options"]
+    tuning = None
+    theme_name = None
+    profile_name = None
+    if "entry_id" in msg:
+        entry = manager.entries.get(msg["entry_id"])
+        if entry is None:
+            connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Profile not loaded")
+            return
+        options = {**manager.profile_options(entry), **options}
+        # Only cached analysis is used, a preview never fetches a background
+        tuning = manager.get_glass_tuning(entry, options)
+        profile_name = get_profile_name(entry)
+        theme_name = profile_outputs(profile_name, [msg["tier"]])[0][2]
+    # Contrast is judged against the analyzed background images when cached
+    resolved = resolve_options(options)
+    backdrops = manager.analyzer.get_backdrops(resolved[CONF_LIGHT_BG], resolved[CONF_DARK_BG])
+
+    changes = manager.theme_overrides.changes(profile_name, msg["tier"])
+    preview = await manager.async_run_job(preview_theme, options, msg["tier"], tuning, backdrops, changes)
+    connection.send_result(msg["id"], {"theme": theme_name, **preview})
+
+
+DURATION_SCHEMA = vol.All(vol.Coerce(float), vol.Range(min=0))
+COUNT_SCHEMA = vol.All(vol.Coerce(int), vol.Range(min=0))
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/frame_report",
+        vol.Required("device_id"): vol.All(str, vol.Match(DEVICE_ID_PATTERN)),
+        vol.Required("name"): vol.All(str, vol.Length(max=64)),
+        vol.Required("theme"): vol.Any(None, vol.All(str, vol.Length(max=255))),
+        vol.Optional("default_theme", default=None): vol.Any(None, vol.All(str, vol.Length(max=255))),
+        vol.Optional("auto", default=False): bool,
+        vol.Required("fps"): vol.All(vol.Coerce(float), vol.Range(min=0, max=1000)),
+        vol.Required("frame_p95_ms"): DURATION_SCHEMA,
+        vol.Required("frames"): COUNT_SCHEMA,
+        vol.Required("duration_ms"): DURATION_SCHEMA,
+        vol.Required("long_tasks"): COUNT_SCHEMA,
+        vol.Required("long_task_ms"): DURATION_SCHEMA,
+    }
+)
+@callback
+def websocket_frame_report(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg):
+    """
+    Record the frame timings the telemetry module measured in a browser.
+
+    The result names the theme the browser should switch to when automatic
+    tier selection picked another tier for it, else None.
+    """
+    manager = hass.data[DOMAIN]
+    if not manager.async_telemetry_enabled():
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Frame telemetry is off")
+        return
+    connection.send_result(msg["id"], {"theme": manager.async_frame_report(msg)})